@@ -0,0 +1,227 @@
+"""
+Cache tier: instrumented backends and memoization helpers.
+
+Two aliases are configured in settings:
+
+* ``default`` - shared between workers (file system or Redis), used for data
+  that must agree across processes and for namespace versions;
+* ``local`` - per-process memory cache for hot, read-mostly data.
+
+Entries written through :func:`memoize` / :func:`cached` belong to a
+namespace. Invalidating a namespace bumps its version in the shared cache, so
+stale entries in every worker's local cache become unreachable: at once in
+the worker that bumped it, within ``LOCAL_CACHE_VERSION_TIMEOUT`` in others.
+"""
+from __future__ import annotations
+
+import functools
+import time
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache as DjangoFileBasedCache
+from django.core.cache.backends.locmem import LocMemCache as DjangoLocMemCache
+from django.core.cache.backends.redis import RedisCache as DjangoRedisCache
+
+from prometheus_client import Counter
+
+CACHE_HITS = Counter('fintrack_cache_hits_total', 'Cache lookups that found a value', ['cache'])
+CACHE_MISSES = Counter('fintrack_cache_misses_total', 'Cache lookups that found nothing', ['cache'])
+CACHE_EVICTIONS = Counter(
+    'fintrack_cache_evictions_total',
+    'Entries removed by the backend to stay under MAX_ENTRIES',
+    ['cache'],
+)
+
+FRAGMENT_HITS = Counter('fintrack_fragment_cache_hits_total', 'Rendered fragments served from cache', ['fragment'])
+FRAGMENT_MISSES = Counter('fintrack_fragment_cache_misses_total', 'Rendered fragments that had to be rendered', ['fragment'])
+
+VERSION_ALIAS = 'default'
+LOCAL_ALIAS = 'local'
+
+_MISSING = object()
+
+
+class MetricsCacheMixin:
+    """Counts hits and misses per cache alias.
+
+    The alias label comes from the ``METRICS_NAME`` key of the ``CACHES``
+    entry, because Django does not pass the alias to the backend.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.metrics_name = params.get('METRICS_NAME', 'default')
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        if value is _MISSING:
+            CACHE_MISSES.labels(self.metrics_name).inc()
+            return default
+        CACHE_HITS.labels(self.metrics_name).inc()
+        return value
+
+
+class LocMemCache(MetricsCacheMixin, DjangoLocMemCache):
+    def _cull(self):
+        before = len(self._cache)
+        super()._cull()
+        CACHE_EVICTIONS.labels(self.metrics_name).inc(max(before - len(self._cache), 0))
+
+
+class FileBasedCache(MetricsCacheMixin, DjangoFileBasedCache):
+    """Counts evictions as culling deletes files.
+
+    Listing the directory before and after Django's ``_cull`` would add two
+    more scans to every ``set``; its own listing is the only one.
+    """
+
+    _culling = False
+
+    def _cull(self):
+        self._culling = True
+        try:
+            super()._cull()
+        finally:
+            self._culling = False
+
+    def _delete(self, fname):
+        deleted = super()._delete(fname)
+        if deleted and self._culling:
+            CACHE_EVICTIONS.labels(self.metrics_name).inc()
+        return deleted
+
+
+class RedisCache(MetricsCacheMixin, DjangoRedisCache):
+    """Redis evicts on the server side, so only hits and misses are counted here."""
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version=version)
+        CACHE_HITS.labels(self.metrics_name).inc(len(found))
+        CACHE_MISSES.labels(self.metrics_name).inc(len(keys) - len(found))
+        return found
+
+
+def _version_key(namespace: str) -> str:
+    return f'nsversion:{namespace}'
+
+
+def _fresh_version() -> int:
+    # Millisecond timestamps keep versions increasing even if the version key
+    # itself was evicted, so old entries can never become reachable again.
+    return int(time.time() * 1000)
+
+
+def get_version(namespace: str, alias: str = VERSION_ALIAS) -> int:
+    """Return the current version of ``namespace``, creating it on first use.
+
+    For the ``local`` alias the version is kept in the local cache for
+    ``LOCAL_CACHE_VERSION_TIMEOUT`` seconds, so local hits do not read the
+    shared cache; other workers see a bump after at most that delay.
+    """
+    if alias == LOCAL_ALIAS:
+        local = caches[LOCAL_ALIAS]
+        version = local.get(_version_key(namespace))
+        if version is None:
+            version = get_version(namespace)
+            local.set(_version_key(namespace), version, settings.LOCAL_CACHE_VERSION_TIMEOUT)
+        return version
+
+    cache = caches[VERSION_ALIAS]
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), _fresh_version(), timeout=None)
+        version = cache.get(_version_key(namespace)) or _fresh_version()
+    return version
+
+
+def bump_version(namespace: str) -> None:
+    """Invalidate every entry stored under ``namespace`` in all aliases."""
+    cache = caches[VERSION_ALIAS]
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.set(_version_key(namespace), _fresh_version(), timeout=None)
+    # This worker sees its own bump at once; others when their copy expires.
+    caches[LOCAL_ALIAS].delete(_version_key(namespace))
+
+
+def memoize(
+    key: str,
+    compute: Callable[[], Any],
+    timeout=DEFAULT_TIMEOUT,
+    namespace: Optional[str] = None,
+    alias: str = 'default',
+):
+    """Return the cached value for ``key`` or compute and store it.
+
+    ``None`` is a valid cached value. When ``namespace`` is given the entry is
+    stored under the namespace version and dropped by :func:`bump_version`.
+    """
+    cache = caches[alias]
+    version = None
+    if namespace:
+        key = f'{namespace}:{key}'
+        version = get_version(namespace, alias)
+
+    value = cache.get(key, _MISSING, version=version)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, timeout, version=version)
+    return value
+
+
+def cached(namespace: str, timeout=DEFAULT_TIMEOUT, alias: str = 'default', key: Optional[Callable[..., str]] = None):
+    """Decorator form of :func:`memoize`.
+
+    By default the cache key is built from the function name and the string
+    form of its arguments; pass ``key`` for arguments without a stable
+    ``str()``. The wrapped function gets an ``invalidate()`` attribute.
+    """
+    def decorator(func):
+        base_key = f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if key is not None:
+                cache_key = f'{base_key}:{key(*args, **kwargs)}'
+            else:
+                parts = [str(arg) for arg in args]
+                parts += [f'{name}={value}' for name, value in sorted(kwargs.items())]
+                cache_key = ':'.join([base_key, *parts])
+            return memoize(cache_key, lambda: func(*args, **kwargs), timeout, namespace, alias)
+
+        wrapper.invalidate = lambda: bump_version(namespace)
+        return wrapper
+
+    return decorator
+
+
+def cached_fragment(
+    name: str,
+    vary_on,
+    render: Callable[[], str],
+    namespace: str,
+    timeout=DEFAULT_TIMEOUT,
+    alias: str = 'default',
+):
+    """Return the rendered HTML fragment ``name``, rendering it on a miss.
+
+    The entry is keyed by ``vary_on`` and stored under ``namespace``, so a
+    :func:`bump_version` of the namespace re-renders every variant. Hits and
+    misses are counted per fragment name for the hit-ratio metric.
+    """
+    rendered = False
+
+    def compute():
+        nonlocal rendered
+        rendered = True
+        return render()
+
+    key = ':'.join(['fragment', name, *(str(part) for part in vary_on)])
+    html = memoize(key, compute, timeout, namespace, alias)
+    (FRAGMENT_MISSES if rendered else FRAGMENT_HITS).labels(name).inc()
+    return html
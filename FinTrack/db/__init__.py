@@ -0,0 +1,3 @@
+"""
+Database integration: custom backends and routers.
+"""
@@ -0,0 +1,276 @@
+"""
+Process-wide database connection pool.
+
+Django keeps one connection per thread and alias and, with ``CONN_MAX_AGE``,
+never hands it to another thread. The pool lets every thread of a worker
+share ``max_size`` connections instead: ``PooledDatabaseWrapperMixin`` takes a
+connection from the pool when Django connects and gives it back when Django
+closes (at the end of each request with ``CONN_MAX_AGE = 0``).
+"""
+from __future__ import annotations
+
+import collections
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from prometheus_client import Gauge, Histogram
+
+POOL_IN_USE = Gauge('fintrack_db_pool_connections_in_use', 'Pooled connections checked out', ['pool'])
+POOL_IDLE = Gauge('fintrack_db_pool_connections_idle', 'Pooled connections waiting for a checkout', ['pool'])
+POOL_WAIT = Histogram(
+    'fintrack_db_pool_wait_seconds',
+    'Time spent waiting for a pooled connection',
+    ['pool'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections.
+
+    ``connect`` opens a new connection, ``check`` raises if a connection is
+    no longer usable. Idle connections above ``min_size`` are closed after
+    ``max_idle`` seconds; any connection is recycled after ``max_lifetime``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], object],
+        *,
+        check: Optional[Callable[[object], None]] = None,
+        min_size: int = 0,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        max_idle: float = 300.0,
+        max_lifetime: float = 3600.0,
+    ):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError('Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1')
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self._connect = connect
+        self._check = check
+        self._cond = threading.Condition()
+        # (connection, returned_at); hot connections are taken from the right,
+        # so the ones that stay idle drift to the left and get evicted.
+        self._idle: collections.deque = collections.deque()
+        self._opened_at: Dict[int, float] = {}
+        self._size = 0
+        self._prefilled = False
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        self._prefill()
+        while True:
+            conn, expired = self._checkout(deadline)
+            self._close_all(expired)
+            if conn is None:
+                conn = self._open()
+            elif not self._usable(conn):
+                self._discard(conn)
+                continue
+            POOL_WAIT.labels(self.name).observe(time.monotonic() - start)
+            POOL_IN_USE.labels(self.name).inc()
+            return conn
+
+    def release(self, conn) -> None:
+        POOL_IN_USE.labels(self.name).dec()
+        try:
+            # Leave no transaction open for the next borrower.
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        if time.monotonic() - self._opened_at.get(id(conn), 0) > self.max_lifetime:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            POOL_IDLE.labels(self.name).set(len(self._idle))
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Close idle connections; checked-out ones are closed on release."""
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            POOL_IDLE.labels(self.name).set(0)
+        self._close_all(idle)
+
+    def _checkout(self, deadline):
+        """Return (idle connection or None to open a new one, evicted connections)."""
+        with self._cond:
+            expired = self._evict_idle()
+            while True:
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                    POOL_IDLE.labels(self.name).set(len(self._idle))
+                    return conn, expired
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, expired
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f'No connection available in pool {self.name!r} after {self.timeout}s')
+                self._cond.wait(remaining)
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        expired = []
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.max_idle:
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+        if expired:
+            POOL_IDLE.labels(self.name).set(len(self._idle))
+        return expired
+
+    def _prefill(self):
+        if self._prefilled:
+            return
+        with self._cond:
+            if self._prefilled:
+                return
+            self._prefilled = True
+            missing = max(self.min_size - self._size, 0)
+            self._size += missing
+        for opened in range(missing):
+            try:
+                conn = self._open()
+            except Exception:
+                # _open() gave back its own slot; give back the ones never used.
+                with self._cond:
+                    self._size -= missing - opened - 1
+                    self._prefilled = False
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                POOL_IDLE.labels(self.name).set(len(self._idle))
+                self._cond.notify()
+
+    def _open(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        self._opened_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _usable(self, conn) -> bool:
+        if self._check is None:
+            return True
+        try:
+            self._check(conn)
+        except Exception:
+            return False
+        return True
+
+    def _discard(self, conn):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._close_all([conn])
+
+    def _close_all(self, connections):
+        for conn in connections:
+            self._opened_at.pop(id(conn), None)
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key: str, factory: Callable[[], ConnectionPool]) -> ConnectionPool:
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = factory()
+    return pool
+
+
+def _forget_pools_after_fork():
+    # Sockets inherited from a preloading master must not be shared.
+    _pools.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_pools_after_fork)
+
+
+def _default_check(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT 1')
+    finally:
+        cursor.close()
+
+
+class PooledDatabaseWrapperMixin:
+    """Borrow connections from a per-alias ``ConnectionPool``.
+
+    Pool options come from ``OPTIONS['pool']``: ``min_size``, ``max_size``,
+    ``timeout``, ``max_idle`` and ``max_lifetime``. Use with
+    ``CONN_MAX_AGE = 0`` so connections go back to the pool after each request.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    @property
+    def pool_key(self):
+        # Test runs switch NAME on the same alias; they must not share a pool.
+        return f"{self.alias}:{self.settings_dict['NAME']}"
+
+    def get_new_connection(self, conn_params):
+        base_connect = super().get_new_connection
+
+        def factory():
+            return ConnectionPool(
+                self.alias,
+                lambda: base_connect(conn_params),
+                check=_default_check,
+                **self.settings_dict['OPTIONS'].get('pool', {}),
+            )
+
+        return get_pool(self.pool_key, factory).acquire()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = _pools.get(self.pool_key)
+        with self.wrap_database_errors:
+            if pool is None:
+                self.connection.close()
+            else:
+                pool.release(self.connection)
@@ -0,0 +1,3 @@
+"""
+PostgreSQL backend with a process-wide connection pool, see ``FinTrack.db.pool``.
+"""
@@ -0,0 +1,21 @@
+"""
+PostgreSQL backend that borrows connections from ``FinTrack.db.pool``.
+
+Selected in settings when ``DATABASE_POOL_MAX_SIZE`` is set; pool options are
+read from ``OPTIONS['pool']``.
+"""
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from FinTrack.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        # Upstream sets isolation_level only while opening a connection, which
+        # is skipped for reused ones; mirror it so every wrapper has it.
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            IsolationLevel.READ_COMMITTED if isolation_level is None else IsolationLevel(isolation_level)
+        )
+        return super().get_new_connection(conn_params)
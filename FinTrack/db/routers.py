@@ -0,0 +1,96 @@
+"""
+Primary/replica routing with read-your-writes pinning.
+
+Enabled when ``DATABASE_REPLICA_URL`` is set (see settings). Reads go to the
+``replica`` alias unless the current request has already written, or the
+user wrote within the last ``DATABASE_REPLICA_PIN_SECONDS`` - that pin is
+carried between requests in the session by ``PrimaryPinningMiddleware``.
+"""
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+PRIMARY_ALIAS = 'default'
+REPLICA_ALIAS = 'replica'
+SESSION_PIN_KEY = '_db_primary_pin_until'
+
+# Sessions carry the pin itself and must never be read from a lagging replica.
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_pinned_to_primary: ContextVar[bool] = ContextVar('pinned_to_primary', default=False)
+_wrote_to_primary: ContextVar[bool] = ContextVar('wrote_to_primary', default=False)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return PRIMARY_ALIAS
+        if _pinned_to_primary.get() or _wrote_to_primary.get():
+            return PRIMARY_ALIAS
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _wrote_to_primary.set(True)
+        return PRIMARY_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # No opinion: lets `migrate --database replica` build a local copy.
+        return None
+
+
+class PrimaryPinningMiddleware:
+    """Pins reads to the primary for a while after the user's own writes.
+
+    Must come after ``SessionMiddleware`` and before ``AuthenticationMiddleware``
+    so the user is loaded from the primary while pinned. Under ASGI the
+    session is read in a thread; the context variables follow the request
+    into ``sync_to_async`` calls.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pinned = request.session.get(SESSION_PIN_KEY, 0) > time.time()
+        pinned_token = _pinned_to_primary.set(pinned)
+        wrote_token = _wrote_to_primary.set(False)
+        try:
+            response = self.get_response(request)
+            self._pin_after_write(request)
+        finally:
+            _pinned_to_primary.reset(pinned_token)
+            _wrote_to_primary.reset(wrote_token)
+        return response
+
+    async def __acall__(self, request):
+        pinned = await sync_to_async(request.session.get)(SESSION_PIN_KEY, 0) > time.time()
+        pinned_token = _pinned_to_primary.set(pinned)
+        wrote_token = _wrote_to_primary.set(False)
+        try:
+            response = await self.get_response(request)
+            self._pin_after_write(request)
+        finally:
+            _pinned_to_primary.reset(pinned_token)
+            _wrote_to_primary.reset(wrote_token)
+        return response
+
+    @staticmethod
+    def _pin_after_write(request):
+        if _wrote_to_primary.get():
+            pin_seconds = getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5)
+            request.session[SESSION_PIN_KEY] = time.time() + pin_seconds
@@ -0,0 +1,3 @@
+"""
+SQLite backend tuned for production use, see ``base.DatabaseWrapper``.
+"""
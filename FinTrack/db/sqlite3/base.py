@@ -0,0 +1,45 @@
+"""
+SQLite backend that applies a connection profile on every new connection.
+
+Extra ``OPTIONS`` understood on top of the stock backend:
+
+* ``pragmas`` - mapping merged over ``pragmas.DEFAULT_PRAGMAS``;
+* ``transaction_mode`` - ``DEFERRED`` (default), ``IMMEDIATE`` or
+  ``EXCLUSIVE``. ``IMMEDIATE`` takes the write lock when ``atomic()`` starts,
+  so concurrent writers queue on ``busy_timeout`` instead of failing on the
+  read-to-write lock upgrade. Same semantics as the option added in Django 5.1.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+from .pragmas import DEFAULT_PRAGMAS, TRANSACTION_MODES, apply_pragmas
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # sqlite3.connect() rejects unknown keyword arguments.
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    @property
+    def pragmas(self):
+        return {**DEFAULT_PRAGMAS, **self.settings_dict['OPTIONS'].get('pragmas', {})}
+
+    @property
+    def transaction_mode(self):
+        mode = (self.settings_dict['OPTIONS'].get('transaction_mode') or 'DEFERRED').upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES transaction_mode must be one of {', '.join(TRANSACTION_MODES)}."
+            )
+        return mode
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
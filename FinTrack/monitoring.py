@@ -6,16 +6,14 @@ from __future__ import annotations
 import time
 from typing import Iterable
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.conf import settings
-from django.contrib.sessions.models import Session
 from django.db import connections, DatabaseError
 from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
 
 from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
 
-from accounts.utils import get_client_statistics
-
 REQUEST_LATENCY = Histogram(
     'fintrack_request_latency_seconds',
     'Latency of HTTP requests in seconds',
@@ -42,37 +40,57 @@ def _should_track(path: str) -> bool:
 
 
 class RequestMetricsMiddleware:
-    """Collects request latency and throughput metrics."""
+    """Collects request latency and throughput metrics (WSGI and ASGI)."""
+
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        path_template = request.path
-        if request.resolver_match and request.resolver_match.view_name:
-            path_template = request.resolver_match.view_name
-
-        track_request = _should_track(request.path)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        path_template = self._path_template(request)
         start = time.perf_counter()
         response = self.get_response(request)
-        latency = time.perf_counter() - start
+        self._observe(request, path_template, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        path_template = self._path_template(request)
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, path_template, response, time.perf_counter() - start)
+        return response
 
-        if track_request:
+    @staticmethod
+    def _path_template(request):
+        if request.resolver_match and request.resolver_match.view_name:
+            return request.resolver_match.view_name
+        return request.path
+
+    @staticmethod
+    def _observe(request, path_template, response, latency):
+        if _should_track(request.path):
             REQUEST_LATENCY.labels(request.method, path_template).observe(latency)
             REQUEST_COUNT.labels(request.method, path_template, response.status_code).inc()
 
-        return response
-
 
 def _update_business_metrics():
     """Push application-specific metrics into gauges prior to export."""
+    # Imported on first scrape: the middleware in this module is loaded with
+    # the handler and should not pull in the accounts app and its models.
+    from django.contrib.sessions.models import Session
+    from accounts.utils import get_client_statistics
+
     stats = get_client_statistics()
     ACTIVE_CLIENTS.set(stats['active_clients'])
     PREMIUM_CLIENTS.set(stats['premium_clients'])
     BASIC_CLIENTS.set(stats['basic_clients'])
-
-    active_sessions = Session.objects.filter(expire_date__gte=timezone.now()).count()
-    ACTIVE_SESSIONS.set(active_sessions)
+    ACTIVE_SESSIONS.set(Session.objects.filter(expire_date__gte=timezone.now()).count())
 
 
 def metrics_view(_request):
@@ -81,24 +99,40 @@ def metrics_view(_request):
     return HttpResponse(generate_latest(), content_type=CONTENT_TYPE_LATEST)
 
 
+async def ametrics_view(_request):
+    """``metrics_view`` for ASGI (``settings.ASYNC_VIEWS``); the queries run in a thread."""
+    await sync_to_async(_update_business_metrics)()
+    return HttpResponse(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
+
+def _ping_database():
+    with connections['default'].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def _health_response(error: DatabaseError | None) -> JsonResponse:
+    payload = {
+        'status': 'error' if error else 'ok',
+        'database': 'error' if error else 'ok',
+        'timestamp': timezone.now().isoformat(),
+        'detail': str(error) if error else 'healthy',
+    }
+    return JsonResponse(payload, status=500 if error else 200)
+
+
 def health_check(_request):
     """Simple health check endpoint used by load tests and uptime monitors."""
-    db_status = 'ok'
     try:
-        with connections['default'].cursor() as cursor:
-            cursor.execute('SELECT 1')
+        _ping_database()
     except DatabaseError as exc:
-        db_status = 'error'
-        message = str(exc)
-    else:
-        message = 'healthy'
+        return _health_response(exc)
+    return _health_response(None)
 
-    payload = {
-        'status': 'ok' if db_status == 'ok' else 'error',
-        'database': db_status,
-        'timestamp': timezone.now().isoformat(),
-    }
-    status_code = 200 if db_status == 'ok' else 500
-    payload['detail'] = message
-    return JsonResponse(payload, status=status_code)
 
+async def ahealth_check(_request):
+    """``health_check`` for ASGI (``settings.ASYNC_VIEWS``)."""
+    try:
+        await sync_to_async(_ping_database)()
+    except DatabaseError as exc:
+        return _health_response(exc)
+    return _health_response(None)
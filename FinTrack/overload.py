@@ -0,0 +1,174 @@
+"""
+Adaptive concurrency limits and load shedding per route group.
+
+Every request is assigned to a group from ``OVERLOAD_ROUTE_GROUPS`` by its
+view name (unlisted views fall into ``default``). Each group counts its
+in-flight requests and keeps two moving averages of its latency: a short one
+for "now" and a long one as the baseline. After every request the group's
+limit is moved towards ``limit * gradient + sqrt(limit)``, where the gradient
+is ``baseline * tolerance / now`` clamped to ``[0.5, 1]``. When the database
+slows down, latency rises above the baseline and the limit shrinks; when it
+recovers, the square-root headroom grows the limit back.
+
+Only ``low`` priority groups are shed, with 503 once their in-flight count
+reaches the limit; ``normal`` groups are measured but always admitted and
+``critical`` groups (auth, health) are never touched. Limits are per process,
+so shedding only happens with threaded workers, where one slow group can
+otherwise occupy every thread.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from prometheus_client import Counter, Gauge
+
+# Per-process values: labelled by pid like fintrack_worker_rss_bytes, so
+# series of different workers do not overwrite each other on scrape.
+CONCURRENCY_LIMIT = Gauge('fintrack_concurrency_limit', 'Adaptive in-flight request limit', ['group', 'pid'])
+IN_FLIGHT = Gauge('fintrack_in_flight_requests', 'Requests being processed by this process', ['group', 'pid'])
+REQUESTS_SHED = Counter('fintrack_requests_shed_total', 'Requests rejected with 503 by load shedding', ['group'])
+
+DEFAULT_GROUP = 'default'
+RETRY_AFTER_SECONDS = 5
+
+
+class AdaptiveLimit:
+    """Gradient concurrency limit for one route group; thread-safe."""
+
+    SHORT_WEIGHT = 0.2
+    LONG_WEIGHT = 0.01
+    SMOOTHING = 0.2
+
+    def __init__(self, initial: float, min_limit: float, max_limit: float, tolerance: float = 1.5):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.short_latency: Optional[float] = None
+        self.long_latency: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def acquire(self, enforce: bool) -> bool:
+        with self._lock:
+            if enforce and self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float):
+        with self._lock:
+            in_flight = self.in_flight
+            self.in_flight -= 1
+            self._sample(latency, in_flight)
+
+    def _sample(self, latency: float, in_flight: int):
+        if self.short_latency is None:
+            self.short_latency = self.long_latency = latency
+            return
+        self.short_latency += self.SHORT_WEIGHT * (latency - self.short_latency)
+        self.long_latency += self.LONG_WEIGHT * (latency - self.long_latency)
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_latency / max(self.short_latency, 1e-6)))
+        # A group using well under its limit says nothing about how far the
+        # limit could grow; only let it shrink.
+        if gradient == 1.0 and in_flight < self.limit / 2:
+            return
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = (1 - self.SMOOTHING) * self.limit + self.SMOOTHING * target
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+
+
+class ConcurrencyLimiter:
+    """Route groups of this process and their limits."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.pid = str(os.getpid())
+        self._groups: Dict[str, AdaptiveLimit] = {}
+        self._routes: Optional[Dict[str, Tuple[str, str]]] = None
+        self._lock = threading.Lock()
+
+    def classify(self, view_name: str) -> Tuple[str, str]:
+        """``(group, priority)`` for a view name such as ``'fintrack_admin:index'``."""
+        if self._routes is None:
+            self._routes = {
+                route: (group, config.get('priority', 'normal'))
+                for group, config in settings.OVERLOAD_ROUTE_GROUPS.items()
+                for route in config['routes']
+            }
+        return self._routes.get(view_name, (DEFAULT_GROUP, 'normal'))
+
+    def group(self, name: str) -> AdaptiveLimit:
+        limit = self._groups.get(name)
+        if limit is None:
+            with self._lock:
+                limit = self._groups.setdefault(name, AdaptiveLimit(
+                    settings.OVERLOAD_INITIAL_LIMIT,
+                    settings.OVERLOAD_MIN_LIMIT,
+                    settings.OVERLOAD_MAX_LIMIT,
+                ))
+        return limit
+
+
+limiter = ConcurrencyLimiter()
+
+
+def _reset_after_fork():
+    # Locks, in-flight counts and the parent's series must not be inherited.
+    limiter.reset()
+    CONCURRENCY_LIMIT.clear()
+    IN_FLIGHT.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def service_unavailable() -> HttpResponse:
+    response = HttpResponse(
+        'Сервис перегружен. Повторите запрос позже.',
+        status=503,
+        content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response
+
+
+class OverloadMiddleware(MiddlewareMixin):
+    """Counts requests per route group and sheds low-priority ones under load."""
+
+    def process_response(self, request, response):
+        admitted = getattr(request, '_overload_admitted', None)
+        if admitted is not None:
+            self._finish(*admitted)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.OVERLOAD_ENABLED or request.resolver_match is None:
+            return None
+        group, priority = limiter.classify(request.resolver_match.view_name)
+        if priority == 'critical':
+            return None
+        limit = limiter.group(group)
+        if not limit.acquire(enforce=priority == 'low'):
+            REQUESTS_SHED.labels(group).inc()
+            return service_unavailable()
+        IN_FLIGHT.labels(group, limiter.pid).set(limit.in_flight)
+        request._overload_admitted = (group, limit, time.perf_counter())
+        return None
+
+    def _finish(self, group, limit, started):
+        limit.release(time.perf_counter() - started)
+        IN_FLIGHT.labels(group, limiter.pid).set(limit.in_flight)
+        CONCURRENCY_LIMIT.labels(group, limiter.pid).set(limit.limit)
@@ -0,0 +1,63 @@
+"""
+Paginators for very large tables.
+
+``COUNT(*)`` over a whole table reads every row (PostgreSQL) or the smallest
+index (SQLite) on each page load. For unfiltered lists the exact number is
+not needed, so :class:`EstimatedCountPaginator` asks the database for an
+estimate instead and counts exactly only when the list is filtered or small.
+An estimate can overstate the count (rows deleted since the last ANALYZE, or
+below the largest key), so a page that turns out to be the real end of the
+list replaces it with the exact count.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+
+def estimate_row_count(model, using: str = 'default') -> Optional[int]:
+    """Return an approximate row count of ``model``'s table, or None."""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            # Refreshed by VACUUM/ANALYZE; -1 means the table was never analyzed.
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+            row = cursor.fetchone()
+        return row[0] if row and row[0] >= 0 else None
+    # Elsewhere the largest auto-increment key is an O(log n) upper bound that
+    # is close to the real count unless many rows were deleted.
+    return model._default_manager.using(using).aggregate(max_pk=Max('pk'))['max_pk'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Use the table estimate for unfiltered querysets above ``threshold`` rows."""
+
+    threshold = 10000
+    estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is not None and not query.where and not query.distinct:
+            estimate = estimate_row_count(queryset.model, using=queryset.db)
+            if estimate is not None and estimate >= self.threshold:
+                self.estimated = True
+                return estimate
+        return super().count
+
+    def page(self, number):
+        page = super().page(number)
+        if self.estimated and len(page) < self.per_page:
+            # A short or empty page is the real end of the list; the pages
+            # after it exist only in the estimate.
+            self.estimated = False
+            self.count = self.object_list.count()
+            self.__dict__.pop('num_pages', None)
+            if page.number > self.num_pages:
+                raise EmptyPage('That page contains no results')
+        return page
@@ -0,0 +1,166 @@
+"""
+Token-bucket rate limiting for expensive endpoints (login, registration).
+
+``RATE_LIMITS`` maps a URL name to a list of policies; each policy is a
+bucket keyed by client IP or by a POST field such as ``username``::
+
+    RATE_LIMITS = {
+        'login': [
+            {'key': 'ip', 'rate': '20/m', 'burst': 10},
+            {'key': 'post:username+ip', 'rate': '5/m', 'burst': 5},
+        ],
+    }
+
+``key`` parts can be combined with ``+`` (``post:username+ip`` - one bucket
+per username and address). ``rate`` is the refill speed (``N/s``, ``N/m`` or
+``N/h``), ``burst`` the bucket size. Buckets live in the shared cache so every worker sees the same
+counts; if the shared cache is unreachable the process falls back to its
+``local`` cache rather than failing open or closed. The check runs in
+``process_view``, before the view (and password hashing) runs, and a
+rejected request gets ``429`` with ``Retry-After``.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = Counter('fintrack_ratelimit_rejected_total', 'Requests rejected by rate limiting', ['policy', 'key'])
+RATE_LIMIT_FALLBACK = Counter(
+    'fintrack_ratelimit_fallback_total',
+    'Rate limit checks served from the in-process cache because the shared cache failed',
+)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600}
+KEY_PREFIX = 'ratelimit'
+
+
+def parse_rate(rate: str) -> float:
+    """Tokens per second for ``'N/s'``, ``'N/m'`` or ``'N/h'``."""
+    count, _, period = rate.partition('/')
+    try:
+        return int(count) / PERIODS[period]
+    except (ValueError, KeyError):
+        raise ValueError(f'Invalid rate {rate!r}, expected e.g. "5/m"') from None
+
+
+def client_ip(request) -> str:
+    """
+    Client address, skipping ``RATE_LIMIT_PROXY_COUNT`` trusted proxies.
+
+    Proxies append to ``X-Forwarded-For``, so the client is the entry just
+    before the ones our own proxies added; anything further left is
+    client-supplied and not trusted.
+    """
+    proxies = settings.RATE_LIMIT_PROXY_COUNT
+    if proxies:
+        forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if part.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _key_value(kind: str, request) -> str:
+    if kind == 'ip':
+        return client_ip(request)
+    if kind.startswith('post:'):
+        return request.POST.get(kind[len('post:'):], '').strip().lower()
+    raise ValueError(f'Unknown rate limit key {kind!r}')
+
+
+def bucket_key(name: str, policy: dict, request) -> Optional[str]:
+    """Cache key of the policy's bucket; ``None`` when a key part is missing from the request."""
+    kind = policy['key']
+    values = [_key_value(part, request) for part in kind.split('+')]
+    if not all(values):
+        return None
+    digest = hashlib.sha1('\0'.join(values).encode()).hexdigest()
+    return f'{KEY_PREFIX}:{name}:{kind}:{digest}'
+
+
+def take(buckets: List[Tuple[str, float, int]], now: Optional[float] = None) -> Tuple[int, float]:
+    """
+    Take one token from every bucket ``(key, rate, burst)``.
+
+    Returns ``(index, retry_after)`` of the first empty bucket, or
+    ``(-1, 0)`` when all had a token. Tokens are only taken when every bucket
+    allows the request. Buckets are read and written with one ``get_many`` /
+    ``set_many`` each; concurrent requests may race and let a few extra
+    attempts through, which is acceptable for shedding load.
+    """
+    now = time.time() if now is None else now
+    try:
+        return _take(caches['default'], buckets, now)
+    except Exception:
+        RATE_LIMIT_FALLBACK.inc()
+        logger.warning('Shared cache unavailable for rate limiting, using local buckets', exc_info=True)
+        return _take(caches['local'], buckets, now)
+
+
+def _take(cache, buckets, now):
+    states = cache.get_many([key for key, _, _ in buckets])
+    updated: Dict[str, Tuple[float, float]] = {}
+    for index, (key, rate, burst) in enumerate(buckets):
+        tokens, stamp = states.get(key, (burst, now))
+        tokens = min(burst, tokens + max(now - stamp, 0) * rate)
+        if tokens < 1:
+            return index, (1 - tokens) / rate
+        updated[key] = (tokens - 1, now)
+    # A bucket refills completely in burst / rate seconds; after that its
+    # state is the same as a missing one.
+    timeout = max(math.ceil(burst / rate) for _, rate, burst in buckets) + 1
+    cache.set_many(updated, timeout=timeout)
+    return -1, 0.0
+
+
+def too_many_requests(retry_after: float) -> HttpResponse:
+    seconds = max(math.ceil(retry_after), 1)
+    response = HttpResponse(
+        f'Слишком много попыток. Повторите через {seconds} с.',
+        status=429,
+        content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    """Applies ``RATE_LIMITS`` by URL name before the view runs."""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.RATE_LIMIT_ENABLED:
+            return None
+        name = request.resolver_match.url_name if request.resolver_match else None
+        policies = settings.RATE_LIMITS.get(name)
+        if not policies:
+            return None
+
+        buckets, applied = [], []
+        for policy in policies:
+            if request.method not in policy.get('methods', ('POST',)):
+                continue
+            key = bucket_key(name, policy, request)
+            if key is None:
+                continue
+            rate = parse_rate(policy['rate'])
+            buckets.append((key, rate, policy.get('burst') or max(int(rate * 60), 1)))
+            applied.append(policy)
+        if not buckets:
+            return None
+
+        index, retry_after = take(buckets)
+        if index < 0:
+            return None
+        RATE_LIMITED.labels(name, applied[index]['key']).inc()
+        return too_many_requests(retry_after)
@@ -0,0 +1,11 @@
+"""
+Exchange rates shared by the converter page, the rates API and any code
+that converts money between currencies.
+
+Use :func:`get_snapshot` to read the current rates; it never waits on a
+provider. See :mod:`FinTrack.rates.store` for how snapshots are refreshed.
+"""
+from .snapshot import RateSnapshot, UnknownCurrency, decimal_places
+from .store import get_snapshot
+
+__all__ = ['RateSnapshot', 'UnknownCurrency', 'decimal_places', 'get_snapshot']
@@ -0,0 +1,122 @@
+"""
+Bulk conversion in integer minor units.
+
+Items are grouped by currency pair; each pair gets one exact rational factor
+(``numerator / denominator``) computed from the snapshot, and every amount in
+the group is converted with plain integer arithmetic. Amounts are scaled to
+the source currency's minor units (cents, 1/10000 troy ounce for metals) and
+results are rounded half up to the target's minor units, so the output is
+exact and independent of float or Decimal context precision.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from prometheus_client import Counter
+
+from .snapshot import RateSnapshot, UnknownCurrency, decimal_places
+
+# Upper bound for one call; callers with more items split the batch.
+MAX_ITEMS = 10000
+# Amounts beyond int64 minor units are rejected rather than silently widened.
+MAX_MINOR_UNITS = 2 ** 63 - 1
+
+CONVERTED_ITEMS = Counter('fintrack_convert_items_total', 'Amounts converted in batches', ['result'])
+
+
+class ConversionError(ValueError):
+    """One item of a batch could not be converted."""
+
+
+def to_minor_units(amount, code: str) -> int:
+    """Exact integer amount of ``code`` minor units, e.g. ``'10.5' EUR -> 1050``."""
+    try:
+        value = Decimal(str(amount)) if not isinstance(amount, Decimal) else amount
+    except InvalidOperation:
+        raise ConversionError(f'invalid amount: {amount!r}') from None
+    if not value.is_finite():
+        raise ConversionError(f'invalid amount: {amount!r}')
+    # Checked before scaling: scaleb raises decimal.Overflow (not a
+    # ValueError) for exponents such as 1e1000000.
+    if value and value.adjusted() > len(str(MAX_MINOR_UNITS)):
+        raise ConversionError('amount is too large')
+    scaled = value.scaleb(decimal_places(code))
+    if scaled != scaled.to_integral_value():
+        raise ConversionError(f'{code} allows {decimal_places(code)} decimal places')
+    minor = int(scaled)
+    if abs(minor) > MAX_MINOR_UNITS:
+        raise ConversionError('amount is too large')
+    return minor
+
+
+def from_minor_units(minor: int, code: str) -> Decimal:
+    return Decimal(minor).scaleb(-decimal_places(code))
+
+
+def pair_factor(snapshot: RateSnapshot, from_code: str, to_code: str) -> Tuple[int, int]:
+    """``(numerator, denominator)`` turning ``from_code`` minor units into ``to_code`` minor units."""
+    factor = _units_per_base(snapshot, to_code) / _units_per_base(snapshot, from_code)
+    factor *= Fraction(10) ** (decimal_places(to_code) - decimal_places(from_code))
+    return factor.numerator, factor.denominator
+
+
+def _units_per_base(snapshot: RateSnapshot, code: str) -> Fraction:
+    if code in snapshot.rates:
+        return Fraction(snapshot.rates[code])
+    if code in snapshot.metals:
+        return 1 / Fraction(snapshot.metals[code])
+    raise UnknownCurrency(code)
+
+
+def _scale(amounts: Sequence[int], numerator: int, denominator: int) -> List[int]:
+    # Half-up rounding away from zero: floor((2|n| + q) / 2q) with the sign restored.
+    twice = 2 * denominator
+    return [
+        (2 * a * numerator + denominator) // twice if a >= 0 else -((-2 * a * numerator + denominator) // twice)
+        for a in amounts
+    ]
+
+
+def convert_batch(
+    snapshot: RateSnapshot, items: Iterable[Tuple[object, str, str]],
+) -> Tuple[List[Optional[Decimal]], List[dict]]:
+    """
+    Convert ``(amount, from_code, to_code)`` triples.
+
+    Returns ``(results, errors)``: ``results[i]`` is the converted amount
+    rounded to the target's decimal places, or ``None`` when item ``i``
+    failed; ``errors`` lists ``{'index': i, 'error': message}`` for those.
+    """
+    results: List[Optional[Decimal]] = []
+    errors: List[dict] = []
+    groups = defaultdict(lambda: ([], []))
+    for index, item in enumerate(items):
+        results.append(None)
+        try:
+            amount, from_code, to_code = item
+            if not isinstance(from_code, str) or not isinstance(to_code, str):
+                raise ConversionError('currency codes must be strings')
+            for code in (from_code, to_code):
+                if code not in snapshot.rates and code not in snapshot.metals:
+                    raise ConversionError(f'unknown currency: {code}')
+            minor = to_minor_units(amount, from_code)
+        except (TypeError, ValueError) as error:
+            message = str(error) if isinstance(error, ConversionError) else 'expected [amount, from, to]'
+            errors.append({'index': index, 'error': message})
+            continue
+        positions, amounts = groups[(from_code, to_code)]
+        positions.append(index)
+        amounts.append(minor)
+
+    for (from_code, to_code), (positions, amounts) in groups.items():
+        numerator, denominator = pair_factor(snapshot, from_code, to_code)
+        for index, minor in zip(positions, _scale(amounts, numerator, denominator)):
+            results[index] = from_minor_units(minor, to_code)
+
+    CONVERTED_ITEMS.labels('ok').inc(len(results) - len(errors))
+    if errors:
+        CONVERTED_ITEMS.labels('error').inc(len(errors))
+    return results, errors
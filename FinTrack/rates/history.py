@@ -0,0 +1,250 @@
+"""
+Daily rate history, one memory-mapped file per currency.
+
+Each ``<CODE>.bin`` file under ``RATES_HISTORY_DIR`` is a flat array of
+native int64 pairs ``(day ordinal, rate * RATE_SCALE)`` sorted by day,
+with the same quoting as :class:`~FinTrack.rates.snapshot.RateSnapshot`
+(currencies per base unit, metals in base per troy ounce). Readers map the
+file and binary-search the day column in place, so a lookup touches a few
+pages rather than loading the history or querying the database.
+
+A rate applies from its day until the next recorded day. Files are rewritten
+atomically (temp file + ``os.replace``); open maps keep reading the previous
+version until the next lookup notices the new file.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import tempfile
+import threading
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from fractions import Fraction
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .batch import ConversionError, _scale, from_minor_units, to_minor_units
+from .snapshot import METALS, RateSnapshot, decimal_places
+
+RATE_SCALE = 10 ** 9
+SUFFIX = '.bin'
+# Longest chart series served to the browser.
+MAX_SERIES_DAYS = 366
+
+
+class MissingHistory(LookupError):
+    """No rate is recorded for the code on or before the requested day."""
+
+
+class CurrencyHistory:
+    """Read-only view of one currency file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.code = os.path.basename(path)[:-len(SUFFIX)]
+        with open(path, 'rb') as source:
+            self.stat = os.fstat(source.fileno())
+            if self.stat.st_size:
+                self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+                values = memoryview(self._map).cast('q')
+            else:
+                self._map = None
+                values = memoryview(array('q'))
+        self.days = values[0::2]
+        self.values = values[1::2]
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def is_current(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size) == (
+            self.stat.st_ino, self.stat.st_mtime_ns, self.stat.st_size,
+        )
+
+    def index_at(self, day: date) -> int:
+        """Position of the record in effect on ``day``."""
+        index = bisect_right(self.days, day.toordinal()) - 1
+        if index < 0:
+            raise MissingHistory(f'{self.code} on {day.isoformat()}')
+        return index
+
+    def points(self, start: date, end: date) -> List[Tuple[date, Decimal]]:
+        """Records inside ``[start, end]`` plus the one in effect on ``start``."""
+        if not len(self):
+            return []
+        low = max(bisect_right(self.days, start.toordinal()) - 1, 0)
+        high = bisect_right(self.days, end.toordinal())
+        return [
+            (date.fromordinal(self.days[index]), Decimal(self.values[index]) / RATE_SCALE)
+            for index in range(low, high)
+        ]
+
+    def items(self) -> Dict[int, int]:
+        return dict(zip(self.days, self.values))
+
+
+class RateHistory:
+    """Directory of per-currency history files."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+        self._open: Dict[str, CurrencyHistory] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> str:
+        return str(self._directory or settings.RATES_HISTORY_DIR)
+
+    def path(self, code: str) -> str:
+        if not code.isalpha():
+            raise ValueError(f'invalid currency code: {code!r}')
+        return os.path.join(self.directory, code.upper() + SUFFIX)
+
+    def codes(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(SUFFIX)] for name in names if name.endswith(SUFFIX))
+
+    def get(self, code: str) -> CurrencyHistory:
+        path = self.path(code)
+        history = self._open.get(path)
+        if history is None or not history.is_current():
+            try:
+                history = CurrencyHistory(path)
+            except FileNotFoundError:
+                raise MissingHistory(code) from None
+            with self._lock:
+                self._open[path] = history
+        return history
+
+    def rate_at(self, code: str, day: date) -> Decimal:
+        history = self.get(code)
+        return Decimal(history.values[history.index_at(day)]) / RATE_SCALE
+
+    def series(self, code: str, days: int = 30, end: Optional[date] = None) -> List[Tuple[date, Decimal]]:
+        """Daily points for charts, oldest first; gaps repeat the previous rate."""
+        end = end or timezone.localdate()
+        start = end - timedelta(days=days - 1)
+        try:
+            points = self.get(code).points(start, end)
+        except MissingHistory:
+            return []
+        series = []
+        position = 0
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            while position + 1 < len(points) and points[position + 1][0] <= day:
+                position += 1
+            if points and points[position][0] <= day:
+                series.append((day, points[position][1]))
+        return series
+
+    def write(self, code: str, rates: Mapping[date, Decimal]) -> bool:
+        """Merge ``{day: rate}`` into the file; returns False when nothing changed."""
+        path = self.path(code)
+        try:
+            merged = self.get(code).items()
+        except MissingHistory:
+            merged = {}
+        changes = {
+            day.toordinal(): int((Decimal(rate) * RATE_SCALE).to_integral_value())
+            for day, rate in rates.items()
+        }
+        if all(merged.get(day) == value for day, value in changes.items()):
+            return False
+        merged.update(changes)
+        records = array('q')
+        for day in sorted(merged):
+            records.extend((day, merged[day]))
+
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as target:
+                records.tofile(target)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return True
+
+    def record_snapshot(self, snapshot: RateSnapshot) -> List[str]:
+        """Store the snapshot's rates for its day; returns the codes that changed."""
+        day = snapshot.as_of.date()
+        quotes = {**snapshot.rates, **snapshot.metals}
+        return [code for code, rate in quotes.items() if self.write(code, {day: rate})]
+
+    def convert_at(
+        self, items: Iterable[Tuple[object, str, str, date]],
+    ) -> Tuple[List[Optional[Decimal]], List[dict]]:
+        """
+        Convert ``(amount, from_code, to_code, day)`` items at their days' rates.
+
+        Items are grouped by the pair of history records in effect, so each
+        group is scaled by one exact factor exactly like
+        :func:`~FinTrack.rates.batch.convert_batch`. Returns ``(results,
+        errors)`` in the same shape.
+        """
+        results: List[Optional[Decimal]] = []
+        errors: List[dict] = []
+        groups = defaultdict(lambda: ([], []))
+        opened: Dict[str, CurrencyHistory] = {}
+
+        def rates_for(code):
+            if code not in opened:
+                opened[code] = self.get(code)
+            return opened[code]
+
+        for index, item in enumerate(items):
+            results.append(None)
+            try:
+                amount, from_code, to_code, day = item
+                # Files are named by the upper-case code; METALS and
+                # decimal_places must see the same code.
+                from_code, to_code = from_code.upper(), to_code.upper()
+                key = (from_code, rates_for(from_code).index_at(day), to_code, rates_for(to_code).index_at(day))
+                minor = to_minor_units(amount, from_code)
+            except MissingHistory as error:
+                errors.append({'index': index, 'error': f'no rate history for {error.args[0]}'})
+                continue
+            except (TypeError, ValueError, AttributeError) as error:
+                message = str(error) if isinstance(error, ConversionError) else 'expected [amount, from, to, date]'
+                errors.append({'index': index, 'error': message})
+                continue
+            positions, amounts = groups[key]
+            positions.append(index)
+            amounts.append(minor)
+
+        for (from_code, from_index, to_code, to_index), (positions, amounts) in groups.items():
+            factor = (
+                _units_per_base(to_code, opened[to_code].values[to_index])
+                / _units_per_base(from_code, opened[from_code].values[from_index])
+                * Fraction(10) ** (decimal_places(to_code) - decimal_places(from_code))
+            )
+            for index, minor in zip(positions, _scale(amounts, factor.numerator, factor.denominator)):
+                results[index] = from_minor_units(minor, to_code)
+        return results, errors
+
+    def reset(self):
+        with self._lock:
+            self._open.clear()
+
+
+def _units_per_base(code: str, stored: int) -> Fraction:
+    value = Fraction(stored, RATE_SCALE)
+    return 1 / value if code in METALS else value
+
+
+history = RateHistory()
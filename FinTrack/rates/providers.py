@@ -0,0 +1,85 @@
+"""
+Rate providers: where fresh snapshots come from.
+
+Providers are only called by :class:`FinTrack.rates.store.RateStore` from its
+background thread (or explicitly from management code), never while serving a
+request. ``RATES_PROVIDER`` selects the class; it is built without arguments
+and reads its own settings.
+"""
+from __future__ import annotations
+
+import json
+import os
+import urllib.request
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .snapshot import InvalidSnapshot, RateSnapshot
+
+
+class RateProvider(ABC):
+    """Returns a complete :class:`RateSnapshot` or raises."""
+
+    name = 'provider'
+
+    @abstractmethod
+    def fetch(self) -> RateSnapshot:
+        """Current snapshot; raises when the source is unavailable or malformed."""
+
+
+class FileRateProvider(RateProvider):
+    """Reads a JSON snapshot from disk (``RATES_SNAPSHOT_PATH``).
+
+    The file is re-read only when its modification time changes, so operators
+    can publish new rates by replacing the file.
+    """
+
+    name = 'file'
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = str(path or settings.RATES_SNAPSHOT_PATH)
+        self._loaded = None
+
+    def fetch(self) -> RateSnapshot:
+        mtime = os.stat(self.path).st_mtime_ns
+        if self._loaded is None or self._loaded[0] != mtime:
+            with open(self.path, encoding='utf-8') as source:
+                try:
+                    data = json.load(source)
+                except ValueError as error:
+                    raise InvalidSnapshot(f'{self.path}: {error}') from error
+            self._loaded = (mtime, RateSnapshot.from_dict(data, source=f'file:{self.path}'))
+        return self._loaded[1]
+
+
+class HttpRateProvider(RateProvider):
+    """Fetches the snapshot JSON from ``RATES_HTTP_URL``.
+
+    ``opener`` defaults to :func:`urllib.request.urlopen`; tests pass a stub
+    that returns a file-like object.
+    """
+
+    name = 'http'
+
+    def __init__(self, url: Optional[str] = None, timeout: Optional[float] = None, opener: Optional[Callable] = None):
+        self.url = url or settings.RATES_HTTP_URL
+        self.timeout = timeout if timeout is not None else settings.RATES_HTTP_TIMEOUT
+        self.opener = opener or urllib.request.urlopen
+        if not self.url:
+            raise ValueError('RATES_HTTP_URL is not set')
+
+    def fetch(self) -> RateSnapshot:
+        request = urllib.request.Request(self.url, headers={'Accept': 'application/json'})
+        with self.opener(request, timeout=self.timeout) as response:
+            try:
+                data = json.load(response)
+            except ValueError as error:
+                raise InvalidSnapshot(f'{self.url}: {error}') from error
+        return RateSnapshot.from_dict(data, source=f'http:{self.url}')
+
+
+def load_provider() -> RateProvider:
+    return import_string(settings.RATES_PROVIDER)()
@@ -0,0 +1,100 @@
+"""
+Immutable exchange-rate snapshot.
+
+Currency rates are quoted as units of the currency per one unit of the base
+currency; metals are quoted as base currency per troy ounce, so an "amount"
+of a metal is a number of troy ounces.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+# Digits after the decimal point for amounts; everything else uses two.
+DECIMAL_PLACES = {'JPY': 0, 'KRW': 0, 'XAU': 4, 'XAG': 4, 'XPT': 4, 'XPD': 4}
+# Codes quoted in base currency per troy ounce rather than units per base.
+METALS = frozenset({'XAU', 'XAG', 'XPT', 'XPD'})
+
+
+class UnknownCurrency(KeyError):
+    """The snapshot has no rate for the requested code."""
+
+
+class InvalidSnapshot(ValueError):
+    """Provider data could not be turned into a snapshot."""
+
+
+def decimal_places(code: str) -> int:
+    return DECIMAL_PLACES.get(code, 2)
+
+
+class RateSnapshot:
+    """Rates known at ``as_of``; safe to share between threads."""
+
+    __slots__ = ('base', 'rates', 'metals', 'as_of', 'source')
+
+    def __init__(
+        self,
+        base: str,
+        rates: Mapping[str, Decimal],
+        metals: Mapping[str, Decimal],
+        as_of: datetime,
+        source: str = '',
+    ):
+        self.base = base
+        self.rates = MappingProxyType(dict(rates))
+        self.metals = MappingProxyType(dict(metals))
+        # Providers may omit the offset; ages and history days are computed
+        # against aware datetimes, so a naive time is taken as UTC.
+        self.as_of = as_of.replace(tzinfo=timezone.utc) if as_of.tzinfo is None else as_of
+        self.source = source
+
+    @classmethod
+    def from_dict(cls, data: Mapping, source: str = '') -> 'RateSnapshot':
+        """Build a snapshot from the JSON layout of ``default_rates.json``."""
+        try:
+            base = data['base']
+            rates = {code: Decimal(str(value)) for code, value in data['rates'].items()}
+            metals = {code: Decimal(str(value)) for code, value in data.get('metals', {}).items()}
+            as_of = datetime.fromisoformat(data['as_of'])
+        except (KeyError, TypeError, AttributeError, ValueError, InvalidOperation) as error:
+            raise InvalidSnapshot(f'Malformed rate data: {error!r}') from error
+        if rates.get(base) != 1:
+            raise InvalidSnapshot(f'Base currency {base} must have rate 1')
+        if any(value <= 0 for value in (*rates.values(), *metals.values())):
+            raise InvalidSnapshot('Rates must be positive')
+        return cls(base, rates, metals, as_of, source)
+
+    def to_dict(self) -> dict:
+        return {
+            'base': self.base,
+            'as_of': self.as_of.isoformat(),
+            'rates': {code: str(value) for code, value in self.rates.items()},
+            'metals': {code: str(value) for code, value in self.metals.items()},
+        }
+
+    @property
+    def codes(self):
+        return [*self.rates, *self.metals]
+
+    def units_per_base(self, code: str) -> Decimal:
+        """How many units (or troy ounces) of ``code`` one base unit buys."""
+        if code in self.rates:
+            return self.rates[code]
+        if code in self.metals:
+            return 1 / self.metals[code]
+        raise UnknownCurrency(code)
+
+    def convert(self, amount: Decimal, from_code: str, to_code: str, places: Optional[int] = None) -> Decimal:
+        """Convert ``amount`` and round half up to the target's decimal places."""
+        if from_code == to_code:
+            converted = Decimal(amount)
+        elif from_code in self.metals:
+            converted = Decimal(amount) * self.metals[from_code] * self.units_per_base(to_code)
+        else:
+            converted = Decimal(amount) / self.units_per_base(from_code) * self.units_per_base(to_code)
+        if places is None:
+            places = decimal_places(to_code)
+        return converted.quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP)
@@ -0,0 +1,121 @@
+"""
+Process-wide rate snapshot with background refresh.
+
+Readers call :func:`get_snapshot` and get the current in-memory snapshot
+without any I/O beyond the very first call, which loads the local snapshot
+file. A daemon thread asks the configured provider for a new snapshot every
+``RATES_REFRESH_SECONDS``; when the provider fails, the last good snapshot
+stays in place and the failure is logged and counted. Successful refreshes
+are also written to the daily history (:mod:`FinTrack.rates.history`).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from prometheus_client import Counter, Gauge
+
+from .history import history
+from .providers import FileRateProvider, RateProvider, load_provider
+from .snapshot import RateSnapshot
+
+logger = logging.getLogger(__name__)
+
+RATES_REFRESH = Counter('fintrack_rates_refresh_total', 'Background rate refresh attempts', ['result'])
+RATES_AGE = Gauge('fintrack_rates_snapshot_age_seconds', 'Age of the rate snapshot served by this process')
+
+
+class RateStore:
+    """Holds the current snapshot and the thread that refreshes it."""
+
+    def __init__(
+        self,
+        provider_factory: Callable[[], RateProvider] = load_provider,
+        bootstrap_factory: Callable[[], RateProvider] = FileRateProvider,
+        interval: Optional[float] = None,
+    ):
+        self._provider_factory = provider_factory
+        self._bootstrap_factory = bootstrap_factory
+        self._interval = interval
+        self.reset()
+
+    @property
+    def interval(self) -> float:
+        return settings.RATES_REFRESH_SECONDS if self._interval is None else self._interval
+
+    def get(self) -> RateSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    # A local file read, not a fetch: the bundled snapshot is
+                    # the last good value until the first refresh succeeds.
+                    self._snapshot = self._bootstrap_factory().fetch()
+                snapshot = self._snapshot
+        self._ensure_thread()
+        return snapshot
+
+    def refresh(self) -> bool:
+        """Fetch a new snapshot; keep the previous one if the fetch fails."""
+        try:
+            if self._provider is None:
+                self._provider = self._provider_factory()
+            snapshot = self._provider.fetch()
+        except Exception:
+            RATES_REFRESH.labels('error').inc()
+            logger.exception('Rate refresh failed; keeping snapshot from %s', getattr(self._snapshot, 'as_of', None))
+            return False
+        self._snapshot = snapshot
+        RATES_REFRESH.labels('ok').inc()
+        return True
+
+    def age(self) -> float:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return 0.0
+        return max((timezone.now() - snapshot.as_of).total_seconds(), 0.0)
+
+    def reset(self):
+        """Forget the snapshot, provider and thread (after fork and in tests)."""
+        self._snapshot = None
+        self._provider = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rates-refresh', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            if self.refresh():
+                self._record_history()
+            time.sleep(self.interval)
+
+    def _record_history(self):
+        try:
+            history.record_snapshot(self._snapshot)
+        except Exception:
+            logger.exception('Could not record rate history')
+
+
+store = RateStore()
+RATES_AGE.set_function(store.age)
+
+
+def get_snapshot() -> RateSnapshot:
+    return store.get()
+
+
+if hasattr(os, 'register_at_fork'):
+    # The parent's refresh thread does not survive fork.
+    os.register_at_fork(after_in_child=store.reset)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
 import dj_database_url
@@ -18,6 +19,13 @@ import dj_database_url
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Test runs: in-memory caches, no background threads, no rate limits.
+# Evaluated once; every test-only switch below keys off this flag. Set
+# DJANGO_TESTING explicitly for other runners; without it only the
+# `manage.py test` subcommand counts (not any argument that happens to be "test").
+_testing = os.getenv('DJANGO_TESTING')
+TESTING = _testing.lower() == 'true' if _testing else sys.argv[1:2] == ['test']
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -55,11 +63,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'FinTrack.staticfiles.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'FinTrack.overload.OverloadMiddleware',
+    'FinTrack.ratelimit.RateLimitMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.activity.ActivityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'FinTrack.monitoring.RequestMetricsMiddleware',
@@ -85,6 +96,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'FinTrack.wsgi.application'
 
+# Read-only pages and /health/, /metrics/ have sync and async variants; the
+# URLconf picks the async ones only when served over ASGI (FinTrack/asgi.py
+# sets this), so WSGI workers never run them through async_to_sync.
+ASYNC_VIEWS = os.getenv('DJANGO_ASYNC_VIEWS', 'False').lower() == 'true'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -96,6 +112,157 @@ DATABASES = {
     )
 }
 
+# Optional read replica: reads go to 'replica', writes and reads right after
+# the user's own writes go to 'default' (see FinTrack/db/routers.py).
+# Test runs always get the alias as a mirror of the test database, with
+# routing off; the tests that exercise it switch it on with override_settings,
+# so the suite behaves the same whether DATABASE_REPLICA_URL is set or not.
+REPLICA_ROUTERS = ['FinTrack.db.routers.PrimaryReplicaRouter']
+REPLICA_MIDDLEWARE = list(MIDDLEWARE)
+REPLICA_MIDDLEWARE.insert(
+    REPLICA_MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware'),
+    'FinTrack.db.routers.PrimaryPinningMiddleware',
+)
+_replica_url = os.getenv('DATABASE_REPLICA_URL')
+if TESTING:
+    DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+elif _replica_url:
+    DATABASES['replica'] = dj_database_url.parse(_replica_url, conn_max_age=600)
+    DATABASE_ROUTERS = REPLICA_ROUTERS
+    MIDDLEWARE = REPLICA_MIDDLEWARE
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DATABASE_REPLICA_PIN_SECONDS', '5'))
+
+# Optional process-wide connection pool for PostgreSQL (FinTrack/db/pool.py).
+# Connections go back to the pool after every request, so CONN_MAX_AGE is 0.
+# Test runs create and drop databases and keep the stock backend.
+_pool_max_size = int(os.getenv('DATABASE_POOL_MAX_SIZE', '0'))
+if _pool_max_size and not TESTING:
+    for _database in DATABASES.values():
+        if _database['ENGINE'] != 'django.db.backends.postgresql':
+            continue
+        _database['ENGINE'] = 'FinTrack.db.postgresql_pool'
+        _database['CONN_MAX_AGE'] = 0
+        _database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', '0')),
+            'max_size': _pool_max_size,
+            'timeout': float(os.getenv('DATABASE_POOL_TIMEOUT', '30')),
+            'max_idle': float(os.getenv('DATABASE_POOL_MAX_IDLE', '300')),
+            'max_lifetime': float(os.getenv('DATABASE_POOL_MAX_LIFETIME', '3600')),
+        }
+
+# SQLite connection profile (see FinTrack/db/sqlite3/pragmas.py): WAL journal,
+# busy timeout, relaxed fsync, mmap reads and a larger page cache. Set
+# SQLITE_TRANSACTION_MODE=IMMEDIATE to take the write lock at BEGIN.
+for _database in DATABASES.values():
+    if _database['ENGINE'] != 'django.db.backends.sqlite3':
+        continue
+    _database['ENGINE'] = 'FinTrack.db.sqlite3'
+    _database['OPTIONS'] = {
+        'pragmas': {
+            'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+            'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+            'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024))),
+            'cache_size': -int(os.getenv('SQLITE_CACHE_SIZE_KB', '20000')),
+        },
+        'transaction_mode': os.getenv('SQLITE_TRANSACTION_MODE', 'DEFERRED'),
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+#
+# 'default' is shared between workers (file system or Redis, see CACHE_URL),
+# 'local' is a per-process memory cache for hot read-mostly data.
+# Backends from FinTrack.cache export hit/miss/eviction metrics.
+
+_cache_url = os.getenv('CACHE_URL', f"file://{BASE_DIR / '.cache'}")
+if TESTING:
+    _cache_url = 'locmem://'
+
+_cache_options = {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '10000'))}
+if _cache_url.startswith(('redis://', 'rediss://')):
+    # Redis evicts on its own (maxmemory-policy); OPTIONS go to redis-py here.
+    _shared_cache = {'BACKEND': 'FinTrack.cache.RedisCache', 'LOCATION': _cache_url}
+elif _cache_url.startswith('file://'):
+    _shared_cache = {
+        'BACKEND': 'FinTrack.cache.FileBasedCache',
+        'LOCATION': _cache_url[len('file://'):],
+        'OPTIONS': _cache_options,
+    }
+else:
+    _shared_cache = {
+        'BACKEND': 'FinTrack.cache.LocMemCache',
+        'LOCATION': 'fintrack-shared',
+        'OPTIONS': _cache_options,
+    }
+
+CACHES = {
+    'default': {
+        **_shared_cache,
+        'TIMEOUT': int(os.getenv('CACHE_DEFAULT_TIMEOUT', '300')),
+        'KEY_PREFIX': 'fintrack',
+        'METRICS_NAME': 'default',
+    },
+    'local': {
+        'BACKEND': 'FinTrack.cache.LocMemCache',
+        'LOCATION': 'fintrack-local',
+        'TIMEOUT': int(os.getenv('LOCAL_CACHE_TIMEOUT', '60')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', '5000'))},
+        'METRICS_NAME': 'local',
+    },
+}
+# Namespace versions read for the 'local' alias are kept in it for this many
+# seconds; a bump in another worker reaches this one's local entries after
+# at most this delay.
+LOCAL_CACHE_VERSION_TIMEOUT = float(os.getenv('LOCAL_CACHE_VERSION_TIMEOUT', '2'))
+
+# Client activity (accounts/activity.py): last-seen and last-login times are
+# buffered per process and written in one batched UPDATE every few seconds,
+# when the buffer holds ACTIVITY_FLUSH_SIZE clients, and at process exit.
+# Tests flush explicitly, without a background thread.
+ACTIVITY_FLUSH_INTERVAL = 0 if TESTING else float(os.getenv('ACTIVITY_FLUSH_INTERVAL', '5'))
+ACTIVITY_FLUSH_SIZE = int(os.getenv('ACTIVITY_FLUSH_SIZE', '500'))
+
+# Token buckets for endpoints that hash passwords (FinTrack/ratelimit.py),
+# keyed by URL name; the admin login resolves to 'login' as well. Buckets live
+# in the shared cache. Set RATE_LIMIT_PROXY_COUNT to the number of reverse
+# proxies in front of the app so the client IP is read from X-Forwarded-For.
+RATE_LIMIT_ENABLED = not TESTING and os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+RATE_LIMIT_PROXY_COUNT = int(os.getenv('RATE_LIMIT_PROXY_COUNT', '0'))
+# Guesses against one account are limited per address (username+ip), so
+# failed attempts from elsewhere cannot lock its owner out. The username-only
+# bucket is deliberately loose: it only slows guessing spread over many
+# addresses, and exhausting it takes ~50 requests (several minutes of the IP
+# bucket per address), after which the account gets a login every ~36 s.
+RATE_LIMITS = {
+    'login': [
+        {'key': 'ip', 'rate': '30/m', 'burst': 10},
+        {'key': 'post:username+ip', 'rate': '10/h', 'burst': 5},
+        {'key': 'post:username', 'rate': '100/h', 'burst': 50},
+    ],
+    'register': [
+        {'key': 'ip', 'rate': '10/h', 'burst': 3},
+    ],
+}
+
+# Adaptive per-process concurrency limits (FinTrack/overload.py). Groups are
+# keyed by view name; 'low' groups get 503 when over their limit, 'critical'
+# ones are never limited and everything else is only measured.
+OVERLOAD_ENABLED = os.getenv('OVERLOAD_ENABLED', 'True').lower() == 'true'
+OVERLOAD_INITIAL_LIMIT = int(os.getenv('OVERLOAD_INITIAL_LIMIT', '20'))
+OVERLOAD_MIN_LIMIT = int(os.getenv('OVERLOAD_MIN_LIMIT', '1'))
+OVERLOAD_MAX_LIMIT = int(os.getenv('OVERLOAD_MAX_LIMIT', '100'))
+OVERLOAD_ROUTE_GROUPS = {
+    'auth': {
+        'priority': 'critical',
+        'routes': ['login', 'logout', 'register', 'fintrack_admin:login', 'fintrack_admin:logout', 'admin:login', 'admin:logout'],
+    },
+    'health': {'priority': 'critical', 'routes': ['health_check', 'metrics']},
+    'news': {'priority': 'low', 'routes': ['dashboard', 'news', 'news_feed']},
+    'converter': {'priority': 'low', 'routes': ['converter', 'rates_api', 'rates_history_api', 'convert_api']},
+    'admin_stats': {'priority': 'low', 'routes': ['fintrack_admin:index']},
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -135,8 +302,7 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Use simpler storage for tests to avoid manifest issues
-import sys
-if 'test' in sys.argv:
+if TESTING:
     STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
 else:
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
@@ -144,6 +310,34 @@ else:
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Exchange rates (FinTrack/rates): requests read an in-memory snapshot; a
+# background thread asks RATES_PROVIDER for a new one every
+# RATES_REFRESH_SECONDS and keeps the last good snapshot when it fails.
+# The default provider re-reads RATES_SNAPSHOT_PATH; set RATES_PROVIDER to
+# FinTrack.rates.providers.HttpRateProvider and RATES_HTTP_URL to fetch rates.
+RATES_PROVIDER = os.getenv('RATES_PROVIDER', 'FinTrack.rates.providers.FileRateProvider')
+RATES_SNAPSHOT_PATH = os.getenv('RATES_SNAPSHOT_PATH', str(BASE_DIR / 'FinTrack' / 'rates' / 'default_rates.json'))
+RATES_HTTP_URL = os.getenv('RATES_HTTP_URL', '')
+RATES_HTTP_TIMEOUT = float(os.getenv('RATES_HTTP_TIMEOUT', '10'))
+RATES_REFRESH_SECONDS = 0 if TESTING else float(os.getenv('RATES_REFRESH_SECONDS', '600'))
+# Daily rate history (one memory-mapped file per currency), written by the
+# refresh thread and by `manage.py load_rate_history`.
+RATES_HISTORY_DIR = os.getenv('RATES_HISTORY_DIR', str(BASE_DIR / '.rates_history'))
+
+# Avatar uploads (accounts/avatars.py) are stripped of metadata and resized into
+# thumbnails by a per-process thread pool of AVATAR_WORKERS threads; tests
+# process them inline. Queued uploads wait as temp files; past
+# AVATAR_MAX_PENDING queued or running jobs the request processes its upload.
+AVATAR_WORKERS = 0 if TESTING else int(os.getenv('AVATAR_WORKERS', '2'))
+AVATAR_MAX_PENDING = int(os.getenv('AVATAR_MAX_PENDING', '16'))
+AVATAR_MAX_UPLOAD_MB = int(os.getenv('AVATAR_MAX_UPLOAD_MB', '10'))
+
+# Uploaded client CSVs wait here between the dry run and "apply" in the admin.
+# They contain personal data, so the directory must not be under MEDIA_ROOT.
+CLIENT_IMPORT_DIR = os.getenv('CLIENT_IMPORT_DIR', str(BASE_DIR / '.client_imports'))
+# Files never applied are removed on a later upload once older than this (seconds).
+CLIENT_IMPORT_MAX_AGE = int(os.getenv('CLIENT_IMPORT_MAX_AGE', str(24 * 3600)))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,168 @@
+"""
+Worker startup cost: import-time profile and warm-up.
+
+``profile_imports`` boots the app in a fresh interpreter the way a worker does
+(``django.setup()``, the request handler with its middleware, the URLconf)
+under ``python -X importtime`` and returns one record per imported module;
+``manage.py import_profile`` prints it and the test suite keeps it within
+``IMPORT_BUDGET_MS``. Modules in ``LAZY_MODULES`` are only needed by a few
+requests and must not be imported on the way. Modules Django loads with
+``import_module`` (settings, the URLconf, middleware) are not reported by
+``-X importtime`` themselves, only the imports they make.
+
+``warm_up`` does the work a cold process otherwise leaves to its first
+requests: it populates every URL resolver (compiling all route patterns),
+compiles the project's templates into the cached loader, imports the context
+processors and loads the translation catalog and locale formats.
+``gunicorn.conf.py`` runs it in the master when the app is preloaded, so every
+forked or recycled worker inherits the result, and again in each worker
+before it accepts connections.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+WARMUP_SECONDS = Gauge('fintrack_warmup_seconds', 'Duration of the last warm-up of this process')
+
+BOOT_SCRIPT = (
+    'import django\n'
+    'django.setup()\n'
+    'from django.core.handlers.wsgi import WSGIHandler\n'
+    'WSGIHandler()\n'
+    'from django.urls import get_resolver\n'
+    'get_resolver().url_patterns\n'
+)
+# Import time of the boot script with -X importtime (which itself adds some
+# overhead); generous enough for a slow CI runner.
+IMPORT_BUDGET_MS = 1500
+# Pillow is only needed to process an uploaded avatar.
+LAZY_MODULES = ('PIL',)
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+    @property
+    def package(self) -> str:
+        return self.module.split('.', 1)[0]
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """Records from ``-X importtime`` output, in the order modules finished importing."""
+    records = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return records
+
+
+def profile_imports(script: str = BOOT_SCRIPT, env: Optional[Dict[str, str]] = None) -> List[ImportRecord]:
+    """Runs ``script`` in a fresh interpreter under ``-X importtime``."""
+    base_dir = Path(__file__).resolve().parent.parent
+    env = dict(os.environ if env is None else env)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'FinTrack.settings')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(base_dir), env.get('PYTHONPATH')]))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        cwd=base_dir, env=env, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f'Boot script failed:\n{result.stderr[-2000:]}')
+    return parse_importtime(result.stderr)
+
+
+def total_ms(records: Iterable[ImportRecord]) -> float:
+    """Wall time spent importing: the sum over top-level imports."""
+    return sum(record.cumulative_us for record in records if record.depth == 0) / 1000
+
+
+def by_package(records: Iterable[ImportRecord]) -> Dict[str, float]:
+    """Self time in milliseconds per top-level package, largest first."""
+    totals: Dict[str, int] = defaultdict(int)
+    for record in records:
+        totals[record.package] += record.self_us
+    return {package: us / 1000 for package, us in sorted(totals.items(), key=lambda item: -item[1])}
+
+
+def warm_up() -> Dict[str, int]:
+    """Resolves URLs, compiles templates and loads translations; cheap to repeat."""
+    from django.conf import settings
+    from django.urls import get_resolver
+    from django.utils import formats, translation
+
+    started = time.perf_counter()
+    urls = _populate(get_resolver())
+    templates = _compile_templates(settings.BASE_DIR)
+    with translation.override(settings.LANGUAGE_CODE):
+        # Catalog and locale format module of the site language.
+        translation.gettext('')
+        formats.get_format('DATE_INPUT_FORMATS')
+    elapsed = time.perf_counter() - started
+
+    WARMUP_SECONDS.set(elapsed)
+    logger.info('Warm-up of process %s: %d URL patterns, %d templates in %.0f ms',
+                os.getpid(), urls, templates, elapsed * 1000)
+    return {'urls': urls, 'templates': templates}
+
+
+def _populate(resolver) -> int:
+    from django.urls import URLResolver
+
+    # Populating the reverse lookup compiles the pattern of every route on
+    # this level; namespaced includes (the admin sites) are populated lazily
+    # by Django, hence the recursion.
+    resolver.reverse_dict
+    count = 0
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            count += _populate(pattern)
+        else:
+            count += 1
+    return count
+
+
+def _compile_templates(base_dir: Path) -> int:
+    """Compiles every template of the project (not of third-party apps)."""
+    from django.template import TemplateSyntaxError, engines
+    from django.template.backends.django import DjangoTemplates
+
+    count = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        # Context processors are imported on the first render otherwise.
+        engine.engine.template_context_processors
+        for directory in map(Path, engine.template_dirs):
+            if base_dir not in directory.parents:
+                continue
+            for path in sorted(directory.rglob('*.html')):
+                name = path.relative_to(directory).as_posix()
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError:
+                    # The page will fail on its own; do not stop the worker.
+                    logger.exception('Template %s does not compile', name)
+                    continue
+                count += 1
+    return count
@@ -0,0 +1,37 @@
+"""
+WhiteNoise middleware that also runs natively under ASGI.
+
+WhiteNoise 6 ships a sync-only middleware; as the outermost middleware it
+would make Django run every ASGI request chain through a thread. Static files
+are found by a dictionary lookup (``autorefresh`` is off outside DEBUG), so
+this subclass does the lookup on the event loop and only hands matching
+requests to WhiteNoise's file response.
+"""
+from __future__ import annotations
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -19,7 +19,10 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from accounts.admin_site import admin_site
-from FinTrack.monitoring import metrics_view, health_check
+from FinTrack.monitoring import ahealth_check, ametrics_view, health_check, metrics_view
+
+if settings.ASYNC_VIEWS:
+    metrics_view, health_check = ametrics_view, ahealth_check
 
 urlpatterns = [
     path('admin/', admin_site.urls),  # Кастомная админка
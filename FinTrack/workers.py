@@ -0,0 +1,138 @@
+"""
+Worker sizing and memory watchdog for gunicorn (see ``gunicorn.conf.py``).
+
+Sizing reads the CPUs actually available to the container (affinity mask and
+cgroup quota), not the host's core count. The watchdog is a daemon thread
+started in every worker after fork: when the worker's resident set grows past
+``WORKER_MAX_RSS_MB`` it asks the worker to stop gracefully (``SIGTERM``), the
+worker finishes its in-flight requests and the arbiter starts a fresh one.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import os
+import signal
+import threading
+from typing import Callable, Optional
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+WORKER_RSS = Gauge('fintrack_worker_rss_bytes', 'Resident memory of a worker process', ['pid'])
+WORKER_RSS_LIMIT = Gauge('fintrack_worker_rss_limit_bytes', 'RSS at which the worker is recycled (0 - never)')
+WORKER_RECYCLES = Counter('fintrack_worker_recycles_total', 'Workers that asked to be recycled', ['reason'])
+
+CGROUP_V2_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+CGROUP_V1_QUOTA = '/sys/fs/cgroup/cpu/cpu.cfs_quota_us'
+CGROUP_V1_PERIOD = '/sys/fs/cgroup/cpu/cpu.cfs_period_us'
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as source:
+            return source.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus(cpu_max: str = CGROUP_V2_CPU_MAX, quota: str = CGROUP_V1_QUOTA, period: str = CGROUP_V1_PERIOD) -> int:
+    """CPUs this process may use: affinity mask, capped by the cgroup CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    limit = None
+    v2 = _read(cpu_max)
+    if v2:
+        value, _, length = v2.partition(' ')
+        if value != 'max' and length:
+            limit = int(value) / int(length)
+    else:
+        value, length = _read(quota), _read(period)
+        if value and length and int(value) > 0:
+            limit = int(value) / int(length)
+    if limit:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return max(cpus, 1)
+
+
+def default_workers(worker_class: str, cpus: int) -> int:
+    """Gunicorn's ``2 * CPU + 1`` for sync workers; threaded and async workers need fewer processes."""
+    if worker_class == 'sync':
+        return 2 * cpus + 1
+    return cpus + 1
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 where /proc is unavailable)."""
+    statm = _read('/proc/self/statm')
+    if not statm:
+        return 0
+    return int(statm.split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def track_rss():
+    """Exports this process's RSS under its own ``pid`` label.
+
+    Every scrape is served by one worker, so without the label the series
+    would jump between processes; with it each worker keeps its own series.
+    A forked child drops the series inherited from its parent.
+    """
+    WORKER_RSS.clear()
+    WORKER_RSS.labels(str(os.getpid())).set_function(current_rss)
+
+
+track_rss()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=track_rss)
+
+
+class RssWatchdog:
+    """Calls ``on_exceed`` once when RSS stays over ``limit_bytes``."""
+
+    def __init__(
+        self,
+        limit_bytes: int,
+        interval: float,
+        on_exceed: Optional[Callable[[int], None]] = None,
+        rss: Callable[[], int] = current_rss,
+    ):
+        self.limit_bytes = limit_bytes
+        self.interval = interval
+        self.on_exceed = on_exceed or recycle_worker
+        self.rss = rss
+        self._stop = threading.Event()
+
+    def check(self) -> bool:
+        rss = self.rss()
+        if self.limit_bytes and rss > self.limit_bytes:
+            WORKER_RECYCLES.labels('rss').inc()
+            logger.warning('Worker %s uses %d MB RSS (limit %d MB), recycling',
+                           os.getpid(), rss // 2 ** 20, self.limit_bytes // 2 ** 20)
+            self.on_exceed(rss)
+            return True
+        return False
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            if self.check():
+                return
+
+    def start(self) -> 'RssWatchdog':
+        WORKER_RSS_LIMIT.set(self.limit_bytes)
+        if self.limit_bytes and self.interval > 0:
+            threading.Thread(target=self.run, name='rss-watchdog', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def recycle_worker(_rss: int):
+    # SIGTERM is a graceful stop for every gunicorn worker class: in-flight
+    # requests finish, then the arbiter replaces the process.
+    os.kill(os.getpid(), signal.SIGTERM)
@@ -0,0 +1,258 @@
+"""
+Отложенная запись активности клиентов (write-behind)
+
+Запросы только добавляют данные в буфер в памяти процесса, запись в базу
+идет пачками из фонового потока: каждые ACTIVITY_FLUSH_INTERVAL секунд, сразу
+после накопления ACTIVITY_FLUSH_SIZE записей и при завершении процесса.
+
+- tracker - время входа и последнего запроса клиента, один UPDATE ... CASE
+  на пачку клиентов;
+- events - журнал событий ActivityEvent для ленты админки, bulk_create.
+"""
+import atexit
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.utils import timezone
+from django.utils.deprecation import MiddlewareMixin
+from prometheus_client import Counter, Histogram
+
+from FinTrack.cache import bump_version
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_FLUSHED = Counter('fintrack_activity_flushed_total', 'Buffered activity records written in batches', ['buffer'])
+ACTIVITY_FLUSH_SECONDS = Histogram('fintrack_activity_flush_seconds', 'Duration of a batched activity write', ['buffer'])
+
+FIELDS = ('last_seen', 'last_login_date')
+# Ограничивает число параметров одного UPDATE
+UPDATE_CHUNK = 300
+
+
+class BufferedWriter(ABC):
+    """
+    Буфер с записью пачками из фонового потока
+
+    Наследники задают пустой буфер (_empty), добавление (_merge), возврат
+    незаписанной пачки (_restore) и запись пачки (_write); без любого из них
+    класс нельзя создать. При interval <= 0 поток не запускается, а полный
+    буфер записывается сразу - так работают тесты.
+    """
+
+    name = 'buffer'
+
+    def __init__(self, interval=5.0, max_pending=500):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.reset()
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def flush(self):
+        """
+        Записывает накопленное
+
+        Returns:
+            int: Число записанных элементов буфера
+        """
+        with self._lock:
+            pending, self._pending = self._pending, self._empty()
+        if not pending:
+            return 0
+        try:
+            with ACTIVITY_FLUSH_SECONDS.labels(self.name).time():
+                self._write(pending)
+        except Exception:
+            with self._lock:
+                self._restore(pending)
+            raise
+        ACTIVITY_FLUSHED.labels(self.name).inc(len(pending))
+        return len(pending)
+
+    def reset(self):
+        """
+        Забывает буфер и фоновый поток (после fork)
+        """
+        self._pending = self._empty()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def _add(self, *args):
+        with self._lock:
+            self._merge(*args)
+            full = len(self._pending) >= self.max_pending
+        if self.interval <= 0:
+            if full:
+                self.flush()
+            return
+        self._ensure_thread()
+        if full:
+            # Пишет фоновый поток: запрос, добавивший запись, не ждет базу
+            self._wake.set()
+
+    @abstractmethod
+    def _empty(self):
+        """Новый пустой буфер"""
+
+    @abstractmethod
+    def _merge(self, *args):
+        """Добавляет запись в self._pending (под блокировкой)"""
+
+    @abstractmethod
+    def _restore(self, pending):
+        """Возвращает в буфер пачку, которую не удалось записать"""
+
+    @abstractmethod
+    def _write(self, pending):
+        """Записывает пачку в базу"""
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f'{self.name}-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось записать буфер %s', self.name)
+            finally:
+                connection.close()
+
+
+class ActivityTracker(BufferedWriter):
+    """
+    Время входа и последней активности: user_id -> {поле: время}
+    """
+
+    name = 'last_seen'
+
+    def seen(self, user_id, when=None):
+        self._add(user_id, dict.fromkeys(('last_seen',), when or timezone.now()))
+
+    def logged_in(self, user_id, when=None):
+        self._add(user_id, dict.fromkeys(FIELDS, when or timezone.now()))
+
+    def _empty(self):
+        return {}
+
+    def _merge(self, user_id, values):
+        entry = self._pending.setdefault(user_id, {})
+        for field, when in values.items():
+            if field not in entry or entry[field] < when:
+                entry[field] = when
+
+    def _restore(self, pending):
+        # Возвращаем отметки в буфер, не затирая более свежие
+        for user_id, values in pending.items():
+            self._merge(user_id, values)
+
+    def _write(self, pending):
+        from .models import Client
+
+        items = list(pending.items())
+        for start in range(0, len(items), UPDATE_CHUNK):
+            chunk = items[start:start + UPDATE_CHUNK]
+            updates = {}
+            for field in FIELDS:
+                whens = [When(user_id=user_id, then=Value(values[field])) for user_id, values in chunk if field in values]
+                if whens:
+                    updates[field] = Case(*whens, default=F(field), output_field=DateTimeField())
+            # update() не трогает updated_at: активность не считается изменением клиента
+            Client.objects.filter(user_id__in=[user_id for user_id, _ in chunk]).update(**updates)
+
+
+class EventEmitter(BufferedWriter):
+    """
+    Журнал событий: несохраненные ActivityEvent в порядке появления
+    """
+
+    name = 'events'
+
+    def emit(self, kind, description, user_id=None, when=None):
+        from .models import ActivityEvent
+
+        self._add(ActivityEvent(
+            kind=kind,
+            description=description[:ActivityEvent._meta.get_field('description').max_length],
+            user_id=user_id,
+            created_at=when or timezone.now(),
+        ))
+
+    def _empty(self):
+        return []
+
+    def _merge(self, event):
+        self._pending.append(event)
+
+    def _restore(self, pending):
+        # Пока база недоступна, храним не больше десяти пачек, старые события теряются
+        self._pending[:0] = pending
+        del self._pending[:-self.max_pending * 10]
+
+    def _write(self, pending):
+        from .models import ActivityEvent
+        from .utils import ACTIVITY_FEED_NAMESPACE
+
+        ActivityEvent.objects.bulk_create(pending, batch_size=UPDATE_CHUNK)
+        bump_version(ACTIVITY_FEED_NAMESPACE)
+
+
+tracker = ActivityTracker(
+    interval=getattr(settings, 'ACTIVITY_FLUSH_INTERVAL', 5.0),
+    max_pending=getattr(settings, 'ACTIVITY_FLUSH_SIZE', 500),
+)
+events = EventEmitter(
+    interval=getattr(settings, 'ACTIVITY_FLUSH_INTERVAL', 5.0),
+    max_pending=getattr(settings, 'ACTIVITY_FLUSH_SIZE', 500),
+)
+WRITERS = (tracker, events)
+
+
+def _flush_at_exit():
+    for writer in WRITERS:
+        try:
+            writer.flush()
+        except Exception:
+            logger.exception('Буфер %s не записан при остановке процесса', writer.name)
+
+
+def _reset_after_fork():
+    # Поток не переживает fork, а буфер мастера запишет сам мастер
+    for writer in WRITERS:
+        writer.reset()
+
+
+atexit.register(_flush_at_exit)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class ActivityMiddleware(MiddlewareMixin):
+    """
+    Отмечает время последнего запроса авторизованного пользователя
+
+    Работает и под ASGI: process_response вызывается в потоке, где можно
+    загрузить пользователя из сессии.
+    """
+
+    def process_response(self, request, response):
+        # Без cookie сессии пользователь анонимный: не загружаем сессию ради проверки
+        if settings.SESSION_COOKIE_NAME in request.COOKIES and request.user.is_authenticated:
+            tracker.seen(request.user.pk)
+        return response
@@ -1,7 +1,75 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import AccessLevel, Client, Profile
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+
+from FinTrack.paginators import EstimatedCountPaginator
+from .client_import import CSVImportError, import_stashed, stash_upload, upload_storage
+from .forms import ClientImportUploadForm
+from .models import AccessLevel, Client, NewsArticle, Profile
+from .utils import bulk_set_access_level, bulk_set_active, get_access_levels, get_client_field_choices
+
+
+class CachedChoicesFilter(admin.SimpleListFilter):
+    """
+    Фильтр по значению поля клиента; список значений берется из кэша,
+    а не из SELECT DISTINCT по всей таблице на каждой загрузке списка
+    """
+    field_name = None
+
+    def lookups(self, request, model_admin):
+        return [(value, value) for value in get_client_field_choices(self.field_name) if value]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.field_name: self.value()})
+        return queryset
+
+
+class CountryFilter(CachedChoicesFilter):
+    title = 'Страна'
+    parameter_name = 'country'
+    field_name = 'country'
+
+
+class CityFilter(CachedChoicesFilter):
+    title = 'Город'
+    parameter_name = 'city'
+    field_name = 'city'
+
+
+class AccessLevelFilter(admin.SimpleListFilter):
+    """
+    Фильтр по уровню доступа из кэша уровней (тот же список строит действия списка)
+    """
+    title = 'Уровень доступа'
+    parameter_name = 'access_level'
+
+    def lookups(self, request, model_admin):
+        return [(str(level.pk), level.name) for level in get_access_levels()]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            # Как у RelatedFieldListFilter: неверный id - ошибка параметров, а не 500
+            try:
+                return queryset.filter(access_level_id=int(self.value()))
+            except ValueError as error:
+                raise IncorrectLookupParameters(error)
+        return queryset
+
+
+class LargeTableAdminMixin:
+    """
+    Списки больших таблиц: без второго COUNT(*) по всей таблице
+    и с оценкой числа строк вместо точного подсчета без фильтров
+    """
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(AccessLevel)
@@ -26,12 +94,14 @@ class AccessLevelAdmin(admin.ModelAdmin):
 
 
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
+class ClientAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['full_name', 'user', 'access_level', 'phone', 'email', 'is_active', 'registration_date']
-    list_filter = ['access_level', 'is_active', 'gender', 'country', 'city']
+    list_select_related = ['user', 'access_level']
+    list_filter = [AccessLevelFilter, 'is_active', 'gender', CountryFilter, CityFilter]
     search_fields = ['first_name', 'last_name', 'middle_name', 'phone', 'email', 'user__username']
-    readonly_fields = ['registration_date', 'updated_at']
+    readonly_fields = ['registration_date', 'last_login_date', 'last_seen', 'updated_at']
     list_per_page = 25
+    actions = ['activate_clients', 'deactivate_clients']
     
     fieldsets = (
         ('Пользователь и доступ', {
@@ -52,15 +122,103 @@ class ClientAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Системная информация', {
-            'fields': ('registration_date', 'last_login_date', 'updated_at'),
+            'fields': ('registration_date', 'last_login_date', 'last_seen', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
 
+    # Массовые действия выполняются одним UPDATE по выбранному (или всему
+    # отфильтрованному, "выбрать все") набору клиентов, без save() на каждую строку
+
+    @admin.action(description='Активировать выбранных клиентов', permissions=['change'])
+    def activate_clients(self, request, queryset):
+        updated = bulk_set_active(queryset, True)
+        self.message_user(request, f'Активировано клиентов: {updated}')
+
+    @admin.action(description='Деактивировать выбранных клиентов', permissions=['change'])
+    def deactivate_clients(self, request, queryset):
+        updated = bulk_set_active(queryset, False)
+        self.message_user(request, f'Деактивировано клиентов: {updated}')
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if not self.has_change_permission(request):
+            return actions
+        for access_level in get_access_levels():
+            name = f'set_access_level_{access_level.pk}'
+            actions[name] = (
+                self._make_access_level_action(access_level),
+                name,
+                f'Перевести на уровень «{access_level.name}»',
+            )
+        return actions
+
+    @staticmethod
+    def _make_access_level_action(access_level):
+        def set_access_level(modeladmin, request, queryset):
+            updated = bulk_set_access_level(queryset, access_level)
+            modeladmin.message_user(request, f'Переведено на уровень «{access_level.name}»: {updated}')
+        return set_access_level
+
+    # Загрузка CSV: сначала проверка и список изменений, затем применение
+    # того же файла (он ждет подтверждения в CLIENT_IMPORT_DIR)
+    IMPORT_SESSION_KEY = 'client_import_file'
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        return [
+            path('import/', self.admin_site.admin_view(self.import_csv_view), name='%s_%s_import' % info),
+        ] + super().get_urls()
+
+    def import_csv_view(self, request):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        info = self.opts.app_label, self.opts.model_name
+        pending = request.session.get(self.IMPORT_SESSION_KEY)
+
+        if request.method == 'POST' and 'apply' in request.POST:
+            if not pending or not upload_storage().exists(pending):
+                self.message_user(request, 'Файл для применения не найден, загрузите его еще раз', level=messages.ERROR)
+                return redirect(reverse('%s:%s_%s_import' % ((self.admin_site.name,) + info)))
+            del request.session[self.IMPORT_SESSION_KEY]
+            report = import_stashed(pending, dry_run=False)
+            self.message_user(
+                request,
+                f'Обновлено клиентов: {report.changed}, без изменений: {report.unchanged}, строк с ошибками: {report.error_count}',
+                level=messages.WARNING if report.error_count else messages.SUCCESS,
+            )
+            return redirect(reverse('%s:%s_%s_changelist' % ((self.admin_site.name,) + info)))
+
+        report = None
+        form = ClientImportUploadForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            if pending:
+                upload_storage().delete(pending)
+            pending = stash_upload(form.cleaned_data['csv_file'])
+            try:
+                report = import_stashed(pending)
+            except CSVImportError as error:
+                upload_storage().delete(pending)
+                request.session.pop(self.IMPORT_SESSION_KEY, None)
+                form.add_error('csv_file', str(error))
+            else:
+                request.session[self.IMPORT_SESSION_KEY] = pending
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Обновление клиентов из CSV',
+            'opts': self.opts,
+            'admin_site_name': self.admin_site.name,
+            'form': form,
+            'report': report,
+        }
+        return TemplateResponse(request, 'admin/accounts/client/import_csv.html', context)
+
 
 @admin.register(Profile)
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['user', 'has_client_data', 'created_at']
+    list_select_related = ['user']
     list_filter = ['created_at']
     search_fields = ['user__username', 'user__email']
     readonly_fields = ['created_at', 'updated_at']
@@ -79,6 +237,39 @@ class ProfileAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(NewsArticle)
+class NewsArticleAdmin(admin.ModelAdmin):
+    list_display = ['title', 'published_at', 'is_featured', 'updated_at']
+    list_filter = ['is_featured']
+    search_fields = ['title', 'summary']
+    date_hierarchy = 'published_at'
+    readonly_fields = ['created_at', 'updated_at']
+    actions = ['publish_now']
+
+    fieldsets = (
+        ('Новость', {
+            'fields': ('title', 'summary', 'image_url', 'url', 'is_featured')
+        }),
+        ('Публикация', {
+            'fields': ('published_at',),
+            'description': 'Пустая дата - черновик, дата в будущем - отложенная публикация',
+        }),
+        ('Системная информация', {
+            'fields': ('created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    @admin.action(description='Опубликовать сейчас')
+    def publish_now(self, request, queryset):
+        # save() по одной, чтобы сигнал сбросил кэш ленты
+        articles = list(queryset.filter(published_at__isnull=True))
+        for article in articles:
+            article.published_at = timezone.now()
+            article.save(update_fields=['published_at', 'updated_at'])
+        self.message_user(request, f'Опубликовано новостей: {len(articles)}')
+
+
 # Расширяем стандартную админку User для отображения связанных моделей
 class ProfileInline(admin.StackedInline):
     model = Profile
@@ -93,9 +284,10 @@ class ClientInline(admin.StackedInline):
     extra = 0
 
 
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(LargeTableAdminMixin, UserAdmin):
     inlines = (ProfileInline, ClientInline)
     list_display = UserAdmin.list_display + ('get_client_access_level',)
+    list_select_related = ['client__access_level']
     
     def get_client_access_level(self, obj):
         if hasattr(obj, 'client'):
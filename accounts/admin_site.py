@@ -3,7 +3,8 @@ from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin
 from django.db.models import Count
 from django.utils.html import format_html
-from .models import Client, AccessLevel, Profile
+from .models import Client, AccessLevel, NewsArticle, Profile
+from .utils import get_access_levels, get_client_statistics, get_daily_stats, get_recent_events, sparkline_points
 
 
 class FinTrackAdminSite(AdminSite):
@@ -17,44 +18,22 @@ class FinTrackAdminSite(AdminSite):
         """
         extra_context = extra_context or {}
         
-        # Получаем статистику
-        total_users = User.objects.count()
-        total_clients = Client.objects.filter(is_active=True).count()
-        premium_clients = Client.objects.filter(
-            access_level__is_premium=True, 
-            is_active=True
-        ).count()
-        total_access_levels = AccessLevel.objects.count()
+        # Текущие счетчики - из кэша (один агрегирующий запрос раз в минуту),
+        # динамика - из снимков ClientDailyStats
+        stats = get_client_statistics()
+        history = get_daily_stats()
         
-        # Последние действия (заглушка для демонстрации)
-        recent_actions = [
-            {
-                'icon': '👤',
-                'description': 'Новый пользователь зарегистрирован',
-                'time': '2 минуты назад'
-            },
-            {
-                'icon': '💼',
-                'description': 'Клиент обновил профиль',
-                'time': '15 минут назад'
-            },
-            {
-                'icon': '⭐',
-                'description': 'Премиум подписка активирована',
-                'time': '1 час назад'
-            },
-            {
-                'icon': '📊',
-                'description': 'Создан новый уровень доступа',
-                'time': '2 часа назад'
-            }
-        ]
+        # Лента из журнала событий: один ограниченный запрос, кэшируется
+        recent_actions = get_recent_events()
         
         extra_context.update({
-            'total_users': total_users,
-            'total_clients': total_clients,
-            'premium_clients': premium_clients,
-            'total_access_levels': total_access_levels,
+            'total_users': stats['total_users'],
+            'total_clients': stats['active_clients'],
+            'premium_clients': stats['active_premium_clients'],
+            'total_access_levels': len(get_access_levels()),
+            'users_sparkline': sparkline_points(day['total_users'] for day in history),
+            'clients_sparkline': sparkline_points(day['active_clients'] for day in history),
+            'premium_sparkline': sparkline_points(day['premium_clients'] for day in history),
             'recent_actions': recent_actions,
         })
         
@@ -65,9 +44,10 @@ class FinTrackAdminSite(AdminSite):
 admin_site = FinTrackAdminSite(name='fintrack_admin')
 
 # Регистрируем модели в кастомном админ-сайте
-from .admin import AccessLevelAdmin, ClientAdmin, ProfileAdmin, CustomUserAdmin
+from .admin import AccessLevelAdmin, ClientAdmin, NewsArticleAdmin, ProfileAdmin, CustomUserAdmin
 
 admin_site.register(AccessLevel, AccessLevelAdmin)
 admin_site.register(Client, ClientAdmin)
 admin_site.register(Profile, ProfileAdmin)
+admin_site.register(NewsArticle, NewsArticleAdmin)
 admin_site.register(User, CustomUserAdmin)
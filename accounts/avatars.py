@@ -0,0 +1,268 @@
+"""
+Обработка аватаров: проверка, удаление метаданных, миниатюры
+
+Запрос только проверяет загруженный файл (clean_avatar формы), копирует его во
+временный каталог и ставит в очередь (не длиннее AVATAR_MAX_PENDING, иначе
+обработка идет в потоке запроса); пул потоков процесса поворачивает снимок по
+EXIF, сохраняет копию без метаданных и квадратные миниатюры AVATAR_SIZES в WebP
+и JPEG. Имена файлов строятся из хэша содержимого (avatars/<hash>.jpg,
+avatars/<hash>-200.webp), поэтому их можно кэшировать в браузере навсегда.
+Пока файл обрабатывается, страница показывает прежний аватар.
+
+При AVATAR_WORKERS = 0 (тесты) обработка идет сразу в вызывающем потоке.
+"""
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+AVATARS_PROCESSED = Counter('fintrack_avatars_processed_total', 'Avatar uploads processed in the background', ['result'])
+AVATARS_INLINE = Counter('fintrack_avatars_inline_total', 'Avatar uploads processed in the request because the queue was full')
+AVATAR_PROCESS_SECONDS = Histogram('fintrack_avatar_process_seconds', 'Time to strip and resize one avatar')
+
+# Аватар на страницах 100x100: 1x, 2x и 3x для экранов высокой плотности
+AVATAR_SIZES = (100, 200, 300)
+THUMBNAIL_FORMATS = (('webp', 'WEBP'), ('jpg', 'JPEG'))
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF', 'MPO'}
+MASTER_SIZE = 1024
+MAX_PIXELS = 40_000_000
+QUALITY = 85
+
+_executor = None
+_executor_lock = threading.Lock()
+# Места в очереди пула (создается вместе с пулом)
+_pending = None
+
+
+def validate_avatar(upload):
+    """
+    Проверяет загруженный файл до сохранения
+
+    ImageField формы уже убедился, что Pillow может открыть файл; здесь
+    ограничиваются размер файла, формат и число пикселей (защита от
+    "бомб" распаковки).
+
+    Raises:
+        ValidationError: Файл не подходит
+    """
+    # Pillow импортируется только при первой загрузке аватара: модуль
+    # подключается формами при старте, а импорт PIL.Image - самый долгий
+    from PIL import Image
+
+    max_bytes = settings.AVATAR_MAX_UPLOAD_MB * 1024 * 1024
+    if upload.size > max_bytes:
+        raise ValidationError(f'Файл больше {settings.AVATAR_MAX_UPLOAD_MB} МБ')
+    upload.seek(0)
+    try:
+        with Image.open(upload) as image:
+            image_format, (width, height) = image.format, image.size
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Не удалось прочитать изображение')
+    finally:
+        upload.seek(0)
+    if image_format not in ALLOWED_FORMATS:
+        raise ValidationError('Поддерживаются JPEG, PNG, WebP и GIF')
+    if width * height > MAX_PIXELS:
+        raise ValidationError('Слишком большое разрешение изображения')
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:20]
+
+
+def master_name(digest):
+    return f'avatars/{digest}.jpg'
+
+
+def thumbnail_name(digest, size, extension):
+    return f'avatars/{digest}-{size}.{extension}'
+
+
+def thumbnail_names(digest):
+    return [thumbnail_name(digest, size, extension) for size in AVATAR_SIZES for extension, _ in THUMBNAIL_FORMATS]
+
+
+def render_avatar(data):
+    """
+    Готовит файлы аватара из исходных байтов
+
+    Returns:
+        tuple: (хэш содержимого, словарь имя файла -> байты): копия без
+            метаданных и миниатюры
+    """
+    from PIL import Image, ImageOps
+
+    digest = content_hash(data)
+    with Image.open(io.BytesIO(data)) as source:
+        # Первый кадр для GIF; поворот по EXIF, после чего метаданные не нужны
+        image = ImageOps.exif_transpose(source)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # Прозрачность - на белом фоне, иначе JPEG зальет ее черным
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+    # Пересохранение без exif/icc/xmp удаляет геометки и данные камеры
+    image.thumbnail((MASTER_SIZE, MASTER_SIZE), Image.LANCZOS)
+    files = {master_name(digest): _encode(image, 'JPEG')}
+    for size in AVATAR_SIZES:
+        thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for extension, image_format in THUMBNAIL_FORMATS:
+            files[thumbnail_name(digest, size, extension)] = _encode(thumbnail, image_format)
+    return digest, files
+
+
+def _encode(image, image_format):
+    buffer = io.BytesIO()
+    options = {'quality': QUALITY}
+    if image_format == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    else:
+        options['method'] = 4
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def process_avatar(profile_id, data):
+    """
+    Сохраняет обработанный аватар и переключает на него профиль
+
+    Одинаковые файлы получают одинаковые имена, поэтому уже записанные
+    файлы не перезаписываются. Прежние файлы удаляются, если на них не
+    ссылается другой профиль.
+    """
+    from .models import Profile
+
+    started = time.perf_counter()
+    digest, files = render_avatar(data)
+    for name, content in files.items():
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(content))
+
+    previous = Profile.objects.filter(pk=profile_id).values_list('avatar', 'avatar_hash').first()
+    # update(), а не save(): не затираем поля, измененные, пока шла обработка
+    Profile.objects.filter(pk=profile_id).update(avatar=master_name(digest), avatar_hash=digest)
+    if previous and previous[0] and previous[0] != master_name(digest):
+        _delete_unused(*previous)
+    AVATAR_PROCESS_SECONDS.observe(time.perf_counter() - started)
+    return digest
+
+
+def _delete_unused(name, digest):
+    from .models import Profile
+
+    if Profile.objects.filter(avatar=name).exists():
+        return
+    for stale in [name] + (thumbnail_names(digest) if digest else []):
+        default_storage.delete(stale)
+
+
+def schedule_avatar(profile_id, upload):
+    """
+    Ставит загруженный (уже проверенный) файл в очередь обработки
+
+    Args:
+        profile_id: id профиля
+        upload: UploadedFile из формы
+    """
+    executor = _get_executor()
+    if executor is None:
+        _run(profile_id, _read(upload))
+    else:
+        # Поток пула должен увидеть профиль уже сохраненным
+        transaction.on_commit(lambda: _submit(executor, profile_id, upload))
+
+
+def _submit(executor, profile_id, upload):
+    """
+    Передает пулу путь к копии файла во временном каталоге, а не байты:
+    очередь не держит загрузки в памяти. Заданий в очереди и в работе не
+    больше AVATAR_MAX_PENDING; сверх этого файл обрабатывается в потоке запроса
+    """
+    if not _pending.acquire(blocking=False):
+        AVATARS_INLINE.inc()
+        _run(profile_id, _read(upload))
+        return
+    path = None
+    try:
+        path = _spool(upload)
+        executor.submit(_run_in_worker, profile_id, path)
+    except BaseException:
+        _pending.release()
+        if path:
+            os.unlink(path)
+        raise
+
+
+def _read(upload):
+    upload.seek(0)
+    return upload.read()
+
+
+def _spool(upload):
+    upload.seek(0)
+    with tempfile.NamedTemporaryFile(prefix='avatar-', dir=settings.FILE_UPLOAD_TEMP_DIR, delete=False) as target:
+        shutil.copyfileobj(upload, target)
+    return target.name
+
+
+def _run(profile_id, data):
+    try:
+        process_avatar(profile_id, data)
+    except Exception:
+        AVATARS_PROCESSED.labels('error').inc()
+        logger.exception('Не удалось обработать аватар профиля %s', profile_id)
+    else:
+        AVATARS_PROCESSED.labels('ok').inc()
+
+
+def _run_in_worker(profile_id, path):
+    close_old_connections()
+    try:
+        with open(path, 'rb') as source:
+            data = source.read()
+        os.unlink(path)
+        _run(profile_id, data)
+    finally:
+        _pending.release()
+        connection.close()
+
+
+def _get_executor():
+    global _executor, _pending
+    if settings.AVATAR_WORKERS <= 0:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _pending = threading.BoundedSemaphore(max(settings.AVATAR_MAX_PENDING, settings.AVATAR_WORKERS))
+                _executor = ThreadPoolExecutor(max_workers=settings.AVATAR_WORKERS, thread_name_prefix='avatars')
+    return _executor
+
+
+def _reset_after_fork():
+    # Потоки пула не переживают fork
+    global _executor, _executor_lock, _pending
+    _executor = None
+    _pending = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,289 @@
+"""
+Массовое обновление клиентов из CSV
+
+Файл читается потоком и обрабатывается пачками по BATCH_SIZE строк. Первая
+колонка-ключ - id или email, остальные - поля ClientForm; пустая ячейка
+означает "не менять". Каждая строка проверяется правилами ClientForm, но
+уникальность телефона и email проверяется одним запросом на пачку, а не
+запросом на строку. Изменения применяются через bulk_update, по одному
+UPDATE на пачку.
+
+На пачку приходится не больше трех запросов: клиенты по ключам, занятые
+телефоны и email, bulk_update (только при применении).
+"""
+import csv
+import io
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Q
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from FinTrack.cache import bump_version
+from .activity import events
+from .forms import ClientImportForm
+from .models import ActivityEvent, Client
+from .utils import CLIENT_FILTERS_NAMESPACE, CLIENTS_BULK_UPDATED
+
+BATCH_SIZE = 500
+KEY_FIELDS = ('id', 'email')
+UNIQUE_FIELDS = ('phone', 'email')
+# Изменения этих полей меняют значения фильтров админки
+FILTER_FIELDS = {'city', 'country'}
+
+
+class CSVImportError(ValueError):
+    """Файл нельзя обработать целиком (нет колонки-ключа, неизвестные колонки)"""
+
+
+class ImportReport:
+    """
+    Итог проверки или применения файла
+
+    Списки changes и errors ограничены PREVIEW_LIMIT записями, счетчики - полные.
+    """
+
+    PREVIEW_LIMIT = 200
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.changes = []
+        self.errors = []
+
+    def add_change(self, line, client, diff):
+        self.changed += 1
+        if len(self.changes) < self.PREVIEW_LIMIT:
+            self.changes.append({
+                'line': line,
+                'client': client.full_name,
+                'client_id': client.pk,
+                'fields': [(name, old, new) for name, (old, new) in diff.items()],
+            })
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < self.PREVIEW_LIMIT:
+            self.errors.append({'line': line, 'message': message})
+
+
+def upload_storage():
+    """
+    Хранилище загруженных файлов между проверкой и применением (вне MEDIA_ROOT)
+    """
+    return FileSystemStorage(location=settings.CLIENT_IMPORT_DIR)
+
+
+def stash_upload(upload):
+    """
+    Сохраняет загруженный файл до подтверждения
+
+    Заодно удаляет файлы, которые так и не применили (старше
+    CLIENT_IMPORT_MAX_AGE секунд).
+
+    Returns:
+        str: Имя файла в upload_storage()
+    """
+    storage = upload_storage()
+    remove_stale_uploads(storage)
+    return storage.save(f'{uuid.uuid4().hex}.csv', upload)
+
+
+def remove_stale_uploads(storage):
+    """
+    Удаляет брошенные файлы: проверенные, но не примененные
+
+    Returns:
+        int: Сколько файлов удалено
+    """
+    if not storage.exists(''):
+        return 0
+    deadline = timezone.now() - timedelta(seconds=settings.CLIENT_IMPORT_MAX_AGE)
+    removed = 0
+    for name in storage.listdir('')[1]:
+        try:
+            if storage.get_modified_time(name) < deadline:
+                storage.delete(name)
+                removed += 1
+        except FileNotFoundError:
+            # Файл уже применили или удалили в другом запросе
+            continue
+    return removed
+
+
+def import_stashed(name, dry_run=True):
+    """
+    Проверяет или применяет сохраненный файл; после применения файл удаляется
+
+    Returns:
+        ImportReport: Отчет import_clients
+    """
+    storage = upload_storage()
+    with storage.open(name, 'rb') as binary_file:
+        report = import_clients(binary_file, dry_run=dry_run)
+    if not dry_run:
+        storage.delete(name)
+    return report
+
+
+def open_csv(binary_file):
+    """
+    Открывает загруженный файл как поток словарей; разделитель , или ;
+
+    Args:
+        binary_file: Файл, открытый в двоичном режиме
+
+    Returns:
+        tuple: (ключевая колонка, список колонок полей, csv.DictReader)
+    """
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+    header = text.readline()
+    if not header.strip():
+        raise CSVImportError('Файл пуст')
+    try:
+        dialect = csv.Sniffer().sniff(header, delimiters=',;')
+    except csv.Error:
+        dialect = csv.excel
+    columns = [name.strip() for name in next(csv.reader([header], dialect))]
+
+    key = next((name for name in KEY_FIELDS if name in columns), None)
+    if key is None:
+        raise CSVImportError('Нужна колонка id или email')
+    allowed = set(ClientImportForm._meta.fields)
+    unknown = [name for name in columns if name != key and name not in allowed]
+    if unknown:
+        raise CSVImportError(f'Неизвестные колонки: {", ".join(unknown)}')
+    return key, [name for name in columns if name != key], csv.DictReader(text, fieldnames=columns, dialect=dialect)
+
+
+def import_clients(binary_file, dry_run=True, batch_size=BATCH_SIZE):
+    """
+    Проверяет файл и, если dry_run=False, применяет изменения
+
+    Применение идет в одной транзакции: ошибка базы откатывает весь файл,
+    строки с ошибками проверки пропускаются и попадают в отчет.
+
+    Args:
+        binary_file: CSV-файл, открытый в двоичном режиме
+        dry_run: Только показать изменения
+        batch_size: Строк в пачке
+
+    Returns:
+        ImportReport: Отчет с изменениями и ошибками
+    """
+    key, columns, reader = open_csv(binary_file)
+    report = ImportReport(dry_run)
+    # Ключи и новые значения уникальных полей, уже встреченные в файле
+    seen_keys = set()
+    claimed = {field: {} for field in UNIQUE_FIELDS}
+    changed_filters = False
+
+    with transaction.atomic():
+        batch = []
+        # Строка 1 - заголовок
+        for line, row in enumerate(reader, start=2):
+            batch.append((line, row))
+            if len(batch) >= batch_size:
+                changed_filters |= _process_batch(batch, key, columns, report, seen_keys, claimed)
+                batch = []
+        if batch:
+            changed_filters |= _process_batch(batch, key, columns, report, seen_keys, claimed)
+
+    if not dry_run and report.changed:
+        if changed_filters:
+            bump_version(CLIENT_FILTERS_NAMESPACE)
+        CLIENTS_BULK_UPDATED.labels('csv_import').inc(report.changed)
+        events.emit(ActivityEvent.PROFILE_UPDATE, f'Импорт из CSV: обновлены данные {report.changed} клиентов')
+    return report
+
+
+def _process_batch(batch, key, columns, report, seen_keys, claimed):
+    report.rows += len(batch)
+    keys = [row[key].strip() for _, row in batch if row.get(key)]
+    if key == 'id':
+        keys = [value for value in keys if value.isdigit()]
+    clients = Client.objects.in_bulk(keys, field_name=key)
+
+    # Проверка правилами формы, без запросов
+    validated = []
+    for line, row in batch:
+        if None in row:
+            report.add_error(line, 'Лишние значения в строке')
+            continue
+        value = (row.get(key) or '').strip()
+        client = clients.get(int(value) if key == 'id' and value.isdigit() else value)
+        if client is None:
+            report.add_error(line, f'Клиент {key}={value or "—"} не найден')
+            continue
+        if client.pk in seen_keys:
+            report.add_error(line, f'Клиент {key}={value} уже встречался в файле')
+            continue
+        seen_keys.add(client.pk)
+
+        values = {name: row[name].strip() for name in columns if row[name] and row[name].strip()}
+        data = model_to_dict(client, fields=ClientImportForm._meta.fields)
+        before = dict(data)
+        data.update(values)
+        form = ClientImportForm(data, instance=client)
+        if not form.is_valid():
+            report.add_error(line, '; '.join(
+                f'{name}: {" ".join(messages)}' for name, messages in form.errors.items()
+            ))
+            continue
+        diff = {
+            name: (before[name], form.cleaned_data[name])
+            for name in values
+            if form.cleaned_data[name] != before[name]
+        }
+        validated.append((line, client, diff))
+
+    # Уникальность телефона и email: один запрос на пачку
+    wanted = {field: {diff[field][1] for _, _, diff in validated if field in diff} for field in UNIQUE_FIELDS}
+    taken = {field: {} for field in UNIQUE_FIELDS}
+    if any(wanted.values()):
+        condition = Q()
+        for field, values in wanted.items():
+            if values:
+                condition |= Q(**{f'{field}__in': values})
+        for row in Client.objects.filter(condition).values('pk', *UNIQUE_FIELDS):
+            for field in UNIQUE_FIELDS:
+                taken[field][row[field]] = row['pk']
+
+    changed, fields = [], set()
+    changed_filters = False
+    for line, client, diff in validated:
+        conflicts = [
+            field for field in UNIQUE_FIELDS
+            if field in diff and (
+                taken[field].get(diff[field][1], client.pk) != client.pk
+                or claimed[field].get(diff[field][1], client.pk) != client.pk
+            )
+        ]
+        if conflicts:
+            report.add_error(line, '; '.join(f'{field}: значение уже используется' for field in conflicts))
+            continue
+        if not diff:
+            report.unchanged += 1
+            continue
+        for field in UNIQUE_FIELDS:
+            if field in diff:
+                claimed[field][diff[field][1]] = client.pk
+        report.add_change(line, client, diff)
+        fields.update(diff)
+        changed_filters |= bool(FILTER_FIELDS & diff.keys())
+        changed.append(client)
+
+    if changed and not report.dry_run:
+        # bulk_update не заполняет auto_now
+        now = timezone.now()
+        for client in changed:
+            client.updated_at = now
+        Client.objects.bulk_update(changed, sorted(fields) + ['updated_at'])
+    return changed_filters
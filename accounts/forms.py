@@ -1,6 +1,9 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import UploadedFile
+from django.db.models.functions import Lower
+from .avatars import schedule_avatar, validate_avatar
 from .models import Profile, Client, AccessLevel
 
 
@@ -21,7 +24,13 @@ class RegisterForm(UserCreationForm):
 
     def clean_email(self):
         email = self.cleaned_data.get("email")
-        if User.objects.filter(email__iexact=email).exists():
+        # LOWER(email) = ... использует индекс auth_user_email_lower_idx (в отличие от iexact).
+        # LOWER в SQLite меняет только ASCII. Имя до @ по правилам EmailField -
+        # только ASCII, а домен User.clean() и create_user сохраняют в нижнем
+        # регистре, поэтому для адресов, сохраненных через Django, LOWER(email)
+        # совпадает с email.lower(). Строки, записанные в обход модели, на SQLite
+        # сравниваются без учета регистра только по латинским буквам.
+        if User.objects.annotate(email_lower=Lower('email')).filter(email_lower=email.lower()).exists():
             raise forms.ValidationError("Этот email уже используется")
         return email
 
@@ -96,6 +105,30 @@ class ClientForm(forms.ModelForm):
         return email
 
 
+class ClientImportForm(ClientForm):
+    """
+    ClientForm для строки CSV: уникальность телефона и email импорт проверяет
+    сам, одним запросом на пачку строк (accounts.client_import)
+    """
+
+    def clean_phone(self):
+        return self.cleaned_data.get("phone")
+
+    def clean_email(self):
+        return self.cleaned_data.get("email")
+
+    def validate_unique(self):
+        pass
+
+
+class ClientImportUploadForm(forms.Form):
+    csv_file = forms.FileField(
+        label='CSV-файл',
+        help_text='Колонка id или email и любые поля клиента; пустая ячейка оставляет значение без изменений',
+        widget=forms.FileInput(attrs={'accept': '.csv,text/csv'}),
+    )
+
+
 class ProfileExtendedForm(forms.ModelForm):
     class Meta:
         model = Profile
@@ -106,6 +139,23 @@ class ProfileExtendedForm(forms.ModelForm):
             'website': forms.URLInput(attrs={'placeholder': 'https://example.com'}),
         }
 
+    def clean_avatar(self):
+        avatar = self.cleaned_data.get("avatar")
+        if isinstance(avatar, UploadedFile):
+            validate_avatar(avatar)
+        return avatar
+
+    def save(self, commit=True):
+        upload = self.cleaned_data.get("avatar")
+        if not commit or not isinstance(upload, UploadedFile):
+            return super().save(commit)
+        # Исходный файл не сохраняется как есть: до конца обработки
+        # (метаданные, миниатюры) профиль показывает прежний аватар
+        self.instance.avatar = self.initial.get("avatar")
+        profile = super().save(commit)
+        schedule_avatar(profile.pk, upload)
+        return profile
+
 
 class AccessLevelForm(forms.ModelForm):
     class Meta:
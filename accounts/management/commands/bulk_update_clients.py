@@ -0,0 +1,67 @@
+"""
+Массовое изменение клиентов одним UPDATE по отфильтрованному набору
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import AccessLevel, Client
+from accounts.utils import bulk_set_access_level, bulk_set_active
+
+
+class Command(BaseCommand):
+    help = 'Переводит клиентов на уровень доступа или меняет их активность одним UPDATE'
+
+    def add_arguments(self, parser):
+        # Одно действие за запуск: после первого UPDATE фильтры вроде --from-level
+        # уже не совпадали бы с исходным набором клиентов
+        action = parser.add_mutually_exclusive_group(required=True)
+        action.add_argument('--level', help='Новый уровень доступа (название AccessLevel)')
+        action.add_argument('--activate', action='store_true', help='Активировать клиентов')
+        action.add_argument('--deactivate', action='store_true', help='Деактивировать клиентов')
+
+        parser.add_argument('--from-level', help='Только клиенты с этим уровнем доступа')
+        parser.add_argument('--city', help='Только клиенты из этого города')
+        parser.add_argument('--country', help='Только клиенты из этой страны')
+        only = parser.add_mutually_exclusive_group()
+        only.add_argument('--active-only', action='store_true', help='Только активные клиенты')
+        only.add_argument('--inactive-only', action='store_true', help='Только неактивные клиенты')
+        parser.add_argument('--dry-run', action='store_true', help='Показать число клиентов, ничего не меняя')
+
+    def handle(self, *args, **options):
+        access_level = self._get_level(options['level']) if options['level'] else None
+        queryset = self._filtered(options)
+
+        if options['dry_run']:
+            if access_level is not None:
+                count = queryset.exclude(access_level=access_level).count()
+                self.stdout.write(f'Будет переведено на уровень «{access_level.name}»: {count}')
+            else:
+                count = queryset.exclude(is_active=options['activate']).count()
+                self.stdout.write(f'Изменится активность: {count}')
+            return
+
+        if access_level is not None:
+            updated = bulk_set_access_level(queryset, access_level)
+            self.stdout.write(self.style.SUCCESS(f'Переведено на уровень «{access_level.name}»: {updated}'))
+        else:
+            updated = bulk_set_active(queryset, options['activate'])
+            self.stdout.write(self.style.SUCCESS(f'Изменена активность: {updated}'))
+
+    def _get_level(self, name):
+        try:
+            return AccessLevel.objects.get(name=name)
+        except AccessLevel.DoesNotExist:
+            raise CommandError(f'Уровень доступа «{name}» не найден')
+
+    def _filtered(self, options):
+        queryset = Client.objects.all()
+        if options['from_level']:
+            queryset = queryset.filter(access_level=self._get_level(options['from_level']))
+        if options['city']:
+            queryset = queryset.filter(city=options['city'])
+        if options['country']:
+            queryset = queryset.filter(country=options['country'])
+        if options['active_only']:
+            queryset = queryset.filter(is_active=True)
+        elif options['inactive_only']:
+            queryset = queryset.filter(is_active=False)
+        return queryset
@@ -0,0 +1,40 @@
+"""
+Профиль импорта при старте воркера (python -X importtime)
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from FinTrack.startup import IMPORT_BUDGET_MS, LAZY_MODULES, by_package, profile_imports, total_ms
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает приложение в отдельном интерпретаторе так же, как воркер, и показывает, '
+        'какие модули дольше всего импортируются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Сколько модулей и пакетов показать')
+        parser.add_argument(
+            '--budget-ms', type=float, default=None,
+            help=f'Завершиться с ошибкой, если импорт дольше (проверка в тестах - {IMPORT_BUDGET_MS} мс)',
+        )
+
+    def handle(self, *args, **options):
+        records = profile_imports()
+        total = total_ms(records)
+        limit = options['limit']
+
+        self.stdout.write(f'Импорт: {total:.0f} мс, модулей {len(records)}')
+        self.stdout.write('\nМодули (собственное время, мс):')
+        for record in sorted(records, key=lambda record: -record.self_us)[:limit]:
+            self.stdout.write(f'  {record.self_us / 1000:8.1f}  {record.module}')
+        self.stdout.write('\nПакеты (мс):')
+        for package, ms in list(by_package(records).items())[:limit]:
+            self.stdout.write(f'  {ms:8.1f}  {package}')
+
+        loaded = sorted({record.package for record in records} & set(LAZY_MODULES))
+        if loaded:
+            raise CommandError(f'При старте импортированы модули, которые должны загружаться лениво: {", ".join(loaded)}')
+        budget = options['budget_ms']
+        if budget is not None and total > budget:
+            raise CommandError(f'Импорт {total:.0f} мс превышает бюджет {budget:.0f} мс')
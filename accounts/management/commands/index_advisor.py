@@ -0,0 +1,83 @@
+"""
+Проверка планов выполнения самых частых запросов проекта
+"""
+import re
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from accounts.models import ActivityEvent, Client, ClientDailyStats, NewsArticle
+
+# Полное чтение таблицы: SQLite "SCAN table" без индекса, PostgreSQL "Seq Scan"
+SEQUENTIAL_SCAN_PATTERNS = [
+    re.compile(r'\bSCAN (?!CONSTANT ROW)\S+(?!.*\bUSING\b)'),
+    re.compile(r'\bSeq Scan on\b'),
+]
+
+
+def hot_queries():
+    """
+    Запросы, которые выполняются на каждой загрузке страниц и админки
+
+    Счетчики статистики (aggregate_client_counts) читают всю таблицу по
+    определению и кэшируются, поэтому здесь не проверяются.
+
+    Returns:
+        list: Пары (название, QuerySet)
+    """
+    now = timezone.now()
+    return [
+        ('register.clean_email', User.objects.annotate(email_lower=Lower('email')).filter(email_lower='user@example.com')),
+        ('register.clean_phone', Client.objects.filter(phone='+70000000000')),
+        ('client_list.page', Client.objects.all()[:20]),
+        ('client_list.city', Client.objects.filter(city__icontains='Казань')[:20]),
+        ('client_list.access_level', Client.objects.filter(access_level_id=1, is_active=True)[:20]),
+        ('admin_index.activity_feed', ActivityEvent.objects.order_by('-created_at')[:8]),
+        ('admin_index.daily_stats', ClientDailyStats.objects.filter(date__gte=date.today() - timedelta(days=29)).order_by('date')),
+        ('admin_filter.city', Client.objects.distinct().order_by('city').values_list('city', flat=True)),
+        ('admin_filter.country', Client.objects.distinct().order_by('country').values_list('country', flat=True)),
+        ('news.feed_page', NewsArticle.objects.filter(
+            Q(published_at__lt=now) | Q(published_at=now, id__lt=1000), published_at__lte=now,
+        ).order_by('-published_at', '-id')[:13]),
+    ]
+
+
+def has_sequential_scan(plan):
+    return any(pattern.search(line) for line in plan.splitlines() for pattern in SEQUENTIAL_SCAN_PATTERNS)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет EXPLAIN для частых запросов и отмечает полные просмотры таблиц'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true', help='Обновить статистику планировщика (ANALYZE) перед проверкой')
+        parser.add_argument('--verbose-plans', action='store_true', help='Печатать план каждого запроса')
+        parser.add_argument('--fail-on-seqscan', action='store_true', help='Завершиться с ошибкой, если найден полный просмотр')
+
+    def handle(self, *args, **options):
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        queries = hot_queries()
+        flagged = []
+        for name, queryset in queries:
+            plan = queryset.explain()
+            if has_sequential_scan(plan):
+                flagged.append(name)
+                self.stdout.write(self.style.WARNING(f'SEQ SCAN  {name}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok        {name}'))
+            if options['verbose_plans'] or name in flagged:
+                for line in plan.splitlines():
+                    self.stdout.write(f'          {line}')
+
+        if flagged:
+            self.stdout.write(f'Полный просмотр таблицы: {len(flagged)} из {len(queries)} запросов')
+            if options['fail_on_seqscan']:
+                raise CommandError('Найдены запросы без подходящего индекса: ' + ', '.join(flagged))
@@ -0,0 +1,56 @@
+"""
+Загрузка истории курсов валют в файлы RATES_HISTORY_DIR
+"""
+import csv
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from FinTrack.rates import get_snapshot
+from FinTrack.rates.history import history
+
+
+class Command(BaseCommand):
+    help = (
+        'Добавляет курсы из CSV (колонки date, code, rate; котировки как в снимке курсов) '
+        'или текущий снимок в историю курсов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', nargs='?', help='CSV с колонками date (YYYY-MM-DD), code, rate')
+        parser.add_argument('--snapshot', action='store_true', help='Записать текущий снимок курсов за его дату')
+
+    def handle(self, *args, **options):
+        if not options['csv_path'] and not options['snapshot']:
+            raise CommandError('Укажите CSV-файл или --snapshot')
+
+        changed = []
+        if options['csv_path']:
+            rates = self.read_csv(options['csv_path'])
+            changed += [code for code, points in sorted(rates.items()) if history.write(code, points)]
+        if options['snapshot']:
+            changed += history.record_snapshot(get_snapshot())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'История курсов в {history.directory}: обновлено валют {len(set(changed))}'
+        ))
+
+    def read_csv(self, path):
+        rates = defaultdict(dict)
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as source:
+                for line, row in enumerate(csv.DictReader(source), start=2):
+                    try:
+                        day = datetime.strptime(row['date'].strip(), '%Y-%m-%d').date()
+                        code = row['code'].strip().upper()
+                        rate = Decimal(row['rate'].strip())
+                    except (KeyError, AttributeError, ValueError, InvalidOperation):
+                        raise CommandError(f'Строка {line}: ожидаются date, code, rate')
+                    if not code.isalpha() or rate <= 0:
+                        raise CommandError(f'Строка {line}: неверный код валюты или курс')
+                    rates[code][day] = rate
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        return rates
@@ -0,0 +1,26 @@
+"""
+Миниатюры для аватаров, загруженных до появления обработки
+"""
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from accounts.avatars import process_avatar
+from accounts.models import Profile
+
+
+class Command(BaseCommand):
+    help = 'Удаляет метаданные и строит миниатюры для аватаров без avatar_hash'
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        pending = Profile.objects.exclude(avatar='').exclude(avatar__isnull=True).filter(avatar_hash='')
+        for profile_id, name in pending.values_list('id', 'avatar').iterator():
+            try:
+                with default_storage.open(name, 'rb') as source:
+                    process_avatar(profile_id, source.read())
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'Профиль {profile_id} ({name}): {error}')
+            else:
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано аватаров: {processed}, с ошибками: {failed}'))
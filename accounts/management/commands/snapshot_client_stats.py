@@ -0,0 +1,47 @@
+"""
+Снимок статистики клиентов за день для графиков админки
+"""
+from datetime import datetime, time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from FinTrack.cache import bump_version
+from accounts.models import ClientDailyStats
+from accounts.utils import DAILY_STATS_NAMESPACE, aggregate_client_counts
+
+
+class Command(BaseCommand):
+    help = 'Сохраняет текущие счетчики клиентов в ClientDailyStats (запускать по расписанию, например раз в час)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Дата снимка YYYY-MM-DD (по умолчанию сегодня)')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Дата должна быть в формате YYYY-MM-DD')
+        else:
+            day = timezone.localdate()
+
+        # Счетчики - текущее состояние таблицы; --date нужен, чтобы запуск после
+        # полуночи записал итог прошедших суток
+        counts = aggregate_client_counts(day_start=timezone.make_aware(datetime.combine(day, time.min)))
+        stats, _ = ClientDailyStats.objects.update_or_create(
+            date=day,
+            defaults={
+                'total_users': User.objects.count(),
+                'total_clients': counts['total_clients'],
+                'active_clients': counts['active_clients'],
+                'premium_clients': counts['active_premium_clients'],
+                'new_clients': counts['new_clients'],
+            },
+        )
+        bump_version(DAILY_STATS_NAMESPACE)
+        self.stdout.write(self.style.SUCCESS(
+            f'{stats}: клиентов {stats.total_clients}, активных {stats.active_clients}, '
+            f'премиум {stats.premium_clients}, новых {stats.new_clients}'
+        ))
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.24 on 2026-10-19 13:56
+
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+# auth.User belongs to another app, so its index is managed by hand here.
+# It serves RegisterForm.clean_email, which compares LOWER(email).
+USER_EMAIL_LOWER_INDEX = models.Index(Lower('email'), name='auth_user_email_lower_idx')
+
+
+def add_user_email_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('auth', 'User'), USER_EMAIL_LOWER_INDEX)
+
+
+def remove_user_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('auth', 'User'), USER_EMAIL_LOWER_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_auto_create_clients'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['last_name', 'first_name'], name='client_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['is_active'], name='client_is_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['access_level', 'is_active'], name='client_level_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['city'], name='client_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['country'], name='client_country_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['access_level'], name='client_active_level_idx'),
+        ),
+        migrations.RunPython(add_user_email_index, remove_user_email_index),
+    ]
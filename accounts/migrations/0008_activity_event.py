@@ -0,0 +1,29 @@
+# Generated by Django 4.2.24 on 2026-10-19 14:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_client_last_seen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время')),
+                ('kind', models.CharField(choices=[('registration', 'Регистрация'), ('profile_update', 'Обновление профиля'), ('access_level', 'Изменение уровня доступа'), ('premium', 'Активация премиума')], max_length=20, verbose_name='Тип')),
+                ('user_id', models.IntegerField(blank=True, null=True, verbose_name='Пользователь')),
+                ('description', models.CharField(max_length=255, verbose_name='Описание')),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'События',
+                'indexes': [models.Index(models.OrderBy(models.F('created_at'), descending=True), name='activity_created_desc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.24 on 2026-10-19 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_activity_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Дата')),
+                ('total_users', models.PositiveIntegerField(default=0, verbose_name='Пользователей')),
+                ('total_clients', models.PositiveIntegerField(default=0, verbose_name='Клиентов')),
+                ('active_clients', models.PositiveIntegerField(default=0, verbose_name='Активных клиентов')),
+                ('premium_clients', models.PositiveIntegerField(default=0, verbose_name='Активных премиум клиентов')),
+                ('new_clients', models.PositiveIntegerField(default=0, verbose_name='Новых клиентов за день')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Статистика за день',
+                'verbose_name_plural': 'Статистика по дням',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.24 on 2026-10-19 14:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_profile_avatar_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='Заголовок')),
+                ('summary', models.CharField(max_length=500, verbose_name='Краткое содержание')),
+                ('image_url', models.URLField(blank=True, verbose_name='Изображение')),
+                ('url', models.URLField(blank=True, verbose_name='Ссылка на статью')),
+                ('is_featured', models.BooleanField(default=False, verbose_name='Выделить в ленте')),
+                ('published_at', models.DateTimeField(blank=True, null=True, verbose_name='Опубликовано')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Новость',
+                'verbose_name_plural': 'Новости',
+                'ordering': ['-published_at', '-id'],
+                'indexes': [models.Index(models.OrderBy(models.F('published_at'), descending=True), models.OrderBy(models.F('id'), descending=True), name='news_published_idx')],
+            },
+        ),
+    ]
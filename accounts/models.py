@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models import F, Q
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class AccessLevel(models.Model):
@@ -64,12 +66,24 @@ class Client(models.Model):
     is_active = models.BooleanField(default=True, verbose_name="Активный клиент")
     registration_date = models.DateTimeField(auto_now_add=True, verbose_name="Дата регистрации")
     last_login_date = models.DateTimeField(null=True, blank=True, verbose_name="Последний вход")
+    last_seen = models.DateTimeField(null=True, blank=True, verbose_name="Последняя активность")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
 
     class Meta:
         verbose_name = "Клиент"
         verbose_name_plural = "Клиенты"
         ordering = ['last_name', 'first_name']
+        indexes = [
+            # Сортировка списков клиентов
+            models.Index(fields=['last_name', 'first_name'], name='client_name_idx'),
+            # Фильтры списков и админки
+            models.Index(fields=['is_active'], name='client_is_active_idx'),
+            models.Index(fields=['access_level', 'is_active'], name='client_level_active_idx'),
+            models.Index(fields=['city'], name='client_city_idx'),
+            models.Index(fields=['country'], name='client_country_idx'),
+            # Счетчики активных клиентов по уровням (главная админки, статистика)
+            models.Index(fields=['access_level'], condition=Q(is_active=True), name='client_active_level_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.last_name} {self.first_name} ({self.user.username})"
@@ -92,6 +106,9 @@ class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     client = models.OneToOneField(Client, on_delete=models.CASCADE, related_name='profile', null=True, blank=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # Хэш содержимого обработанного аватара: по нему строятся имена миниатюр
+    # (accounts.avatars); пусто - миниатюр нет, показывается сам файл
+    avatar_hash = models.CharField(max_length=32, blank=True, editable=False)
     bio = models.TextField(max_length=500, blank=True)
     website = models.URLField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -103,6 +120,88 @@ class Profile(models.Model):
     @property
     def has_client_data(self):
         """Проверяет, есть ли связанные данные клиента"""
-        return self.client is not None
+        # По ключу, без загрузки клиента: свойство показывается в списке админки
+        return self.client_id is not None
+
+
+class ActivityEvent(models.Model):
+    """Событие для ленты активности (журнал только на добавление)"""
+    REGISTRATION = 'registration'
+    PROFILE_UPDATE = 'profile_update'
+    ACCESS_LEVEL = 'access_level'
+    PREMIUM = 'premium'
+    KIND_CHOICES = [
+        (REGISTRATION, 'Регистрация'),
+        (PROFILE_UPDATE, 'Обновление профиля'),
+        (ACCESS_LEVEL, 'Изменение уровня доступа'),
+        (PREMIUM, 'Активация премиума'),
+    ]
+    ICONS = {REGISTRATION: '👤', PROFILE_UPDATE: '💼', ACCESS_LEVEL: '📊', PREMIUM: '⭐'}
+
+    id = models.BigAutoField(primary_key=True)
+    # Время события, а не вставки: события пишутся пачками с задержкой
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Время")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Тип")
+    # Без внешнего ключа: журнал можно секционировать по времени и чистить
+    # старые секции, не затрагивая пользователей
+    user_id = models.IntegerField(null=True, blank=True, verbose_name="Пользователь")
+    description = models.CharField(max_length=255, verbose_name="Описание")
+
+    class Meta:
+        verbose_name = "Событие"
+        verbose_name_plural = "События"
+        indexes = [
+            models.Index(F('created_at').desc(), name='activity_created_desc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.description}"
+
+    @property
+    def icon(self):
+        return self.ICONS.get(self.kind, '•')
+
+
+class ClientDailyStats(models.Model):
+    """Снимок статистики клиентов за день (команда snapshot_client_stats)"""
+    date = models.DateField(unique=True, verbose_name="Дата")
+    total_users = models.PositiveIntegerField(default=0, verbose_name="Пользователей")
+    total_clients = models.PositiveIntegerField(default=0, verbose_name="Клиентов")
+    active_clients = models.PositiveIntegerField(default=0, verbose_name="Активных клиентов")
+    premium_clients = models.PositiveIntegerField(default=0, verbose_name="Активных премиум клиентов")
+    new_clients = models.PositiveIntegerField(default=0, verbose_name="Новых клиентов за день")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Статистика за день"
+        verbose_name_plural = "Статистика по дням"
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"Статистика за {self.date}"
+
+
+class NewsArticle(models.Model):
+    """Новость для ленты; без даты публикации - черновик"""
+    title = models.CharField(max_length=200, verbose_name="Заголовок")
+    summary = models.CharField(max_length=500, verbose_name="Краткое содержание")
+    image_url = models.URLField(blank=True, verbose_name="Изображение")
+    url = models.URLField(blank=True, verbose_name="Ссылка на статью")
+    is_featured = models.BooleanField(default=False, verbose_name="Выделить в ленте")
+    published_at = models.DateTimeField(null=True, blank=True, verbose_name="Опубликовано")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Новость"
+        verbose_name_plural = "Новости"
+        ordering = ['-published_at', '-id']
+        indexes = [
+            # Лента по курсору: WHERE (published_at, id) < (...) ORDER BY published_at DESC, id DESC
+            models.Index(F('published_at').desc(), F('id').desc(), name='news_published_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
 
 # Create your models here.
@@ -0,0 +1,130 @@
+"""
+Лента новостей с пагинацией по курсору
+
+Страница - это статьи строго "старше" курсора (published_at, id) в порядке
+убывания, поэтому запрос идет по индексу news_published_idx и не читает
+пропущенные строки, как OFFSET. Курсор непрозрачен для клиента: это
+base64 от времени публикации в микросекундах и id последней статьи.
+
+Кэшируется только первая страница и ее отрисованная сетка. Курсор приходит
+от клиента: ключ по нему позволил бы заполнить общий кэш случайными
+курсорами, а следующие страницы и так стоят один запрос по индексу.
+Публикация, изменение или удаление новости сбрасывает весь кэш ленты
+(accounts.signals). Отложенная публикация (published_at в будущем) появится
+в ленте не позже чем через NEWS_PAGE_TIMEOUT.
+"""
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from FinTrack.cache import cached, cached_fragment
+from .models import NewsArticle
+from .utils import NEWS_NAMESPACE
+
+PAGE_SIZE = 12
+NEWS_PAGE_TIMEOUT = 300
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class InvalidCursor(ValueError):
+    """Курсор поврежден или создан не этой лентой"""
+
+
+def encode_cursor(published_at, article_id):
+    micros = (published_at - _EPOCH) // timedelta(microseconds=1)
+    return base64.urlsafe_b64encode(f'{micros}.{article_id}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple: (published_at, id)
+
+    Raises:
+        InvalidCursor: Курсор не разбирается
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        micros, article_id = raw.split('.')
+        return _EPOCH + timedelta(microseconds=int(micros)), int(article_id)
+    except (ValueError, UnicodeDecodeError, OverflowError):
+        raise InvalidCursor(cursor)
+
+
+def card(article):
+    """
+    Компактные данные карточки для шаблона и JSON
+    """
+    return {
+        'id': article.id,
+        'title': article.title,
+        'summary': article.summary,
+        'image': article.image_url,
+        'url': article.url,
+        'featured': article.is_featured,
+        'date': timezone.localdate(article.published_at).isoformat(),
+    }
+
+
+def get_news_page(cursor='', limit=PAGE_SIZE):
+    """
+    Страница ленты после курсора (пустой курсор - первая страница)
+
+    Args:
+        cursor: next_cursor предыдущей страницы
+        limit: Статей на странице
+
+    Returns:
+        dict: articles (карточки) и next_cursor (None на последней странице)
+
+    Raises:
+        InvalidCursor: Курсор не разбирается
+    """
+    if not cursor:
+        return _first_page(limit)
+    return _load_page(cursor, limit)
+
+
+@cached(NEWS_NAMESPACE, timeout=NEWS_PAGE_TIMEOUT)
+def _first_page(limit):
+    return _load_page('', limit)
+
+
+def _load_page(cursor, limit):
+    queryset = NewsArticle.objects.filter(published_at__lte=timezone.now())
+    if cursor:
+        published_at, article_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(published_at__lt=published_at) | Q(published_at=published_at, id__lt=article_id)
+        )
+    # Одна лишняя строка показывает, есть ли следующая страница, без COUNT
+    articles = list(queryset.order_by('-published_at', '-id')[:limit + 1])
+    next_cursor = None
+    if len(articles) > limit:
+        articles = articles[:limit]
+        next_cursor = encode_cursor(articles[-1].published_at, articles[-1].id)
+    return {'articles': [card(article) for article in articles], 'next_cursor': next_cursor}
+
+
+def get_news_grid():
+    """
+    HTML сетки первой страницы ленты
+
+    Сетка не содержит данных пользователя и одинакова для всех, поэтому
+    хранится в кэше в одном варианте на версию ленты. На попадании в кэш не
+    выполняется ни запросов, ни отрисовки шаблона.
+    """
+    def render():
+        page = get_news_page()
+        return render_to_string('pages/news_grid.html', {
+            'news_articles': page['articles'],
+            'next_cursor': page['next_cursor'],
+        })
+
+    return mark_safe(cached_fragment(
+        'news_grid', [], render, namespace=NEWS_NAMESPACE, timeout=NEWS_PAGE_TIMEOUT,
+    ))
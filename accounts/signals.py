@@ -4,11 +4,15 @@
 from datetime import date
 import time
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Client, AccessLevel, Profile
-from .utils import create_client_from_user
+from django.contrib.auth.signals import user_logged_in
+
+from FinTrack.cache import bump_version
+from .activity import events, tracker
+from .models import ActivityEvent, Client, AccessLevel, NewsArticle, Profile
+from .utils import ACCESS_LEVELS_NAMESPACE, CLIENT_STATS_NAMESPACE, NEWS_NAMESPACE, create_client_from_user
 
 
 @receiver(post_save, sender=User)
@@ -61,9 +65,82 @@ def update_client_data(sender, instance, created, **kwargs):
     """
     Обновляет данные клиента при изменении данных пользователя
     """
+    # login() сохраняет только last_login: данные клиента не менялись
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
     if not created and hasattr(instance, 'client'):
         client = instance.client
         client.first_name = instance.first_name or client.first_name
         client.last_name = instance.last_name or client.last_name
         client.email = instance.email or client.email
         client.save()
+
+
+@receiver(post_save, sender=User)
+def record_registration(sender, instance, created, **kwargs):
+    """
+    Добавляет регистрацию в ленту событий админки
+    """
+    if created:
+        events.emit(ActivityEvent.REGISTRATION, f'Новый пользователь {instance.username} зарегистрирован', instance.pk)
+
+
+@receiver(post_save, sender=AccessLevel)
+def record_access_level_created(sender, instance, created, **kwargs):
+    """
+    Добавляет создание уровня доступа в ленту событий админки
+    """
+    if created:
+        events.emit(ActivityEvent.ACCESS_LEVEL, f'Создан уровень доступа «{instance.name}»')
+
+
+@receiver(user_logged_in)
+def track_client_login(sender, request, user, **kwargs):
+    """
+    Отмечает вход клиента; запись в базу откладывается (см. accounts/activity.py)
+    """
+    tracker.logged_in(user.pk)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def invalidate_client_cache(sender, **kwargs):
+    """
+    Сбрасывает кэш статистики при изменении клиентов
+    """
+    bump_version(CLIENT_STATS_NAMESPACE)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_count_on_create(sender, instance, created, **kwargs):
+    """
+    Сбрасывает статистику (total_users) при регистрации; обычное сохранение
+    пользователя (например, last_login при входе) число не меняет
+    """
+    if created:
+        bump_version(CLIENT_STATS_NAMESPACE)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_user_count_on_delete(sender, **kwargs):
+    bump_version(CLIENT_STATS_NAMESPACE)
+
+
+@receiver(post_save, sender=AccessLevel)
+@receiver(post_delete, sender=AccessLevel)
+def invalidate_access_level_cache(sender, **kwargs):
+    """
+    Сбрасывает кэш уровней доступа и зависящую от них статистику
+    """
+    bump_version(ACCESS_LEVELS_NAMESPACE)
+    bump_version(CLIENT_STATS_NAMESPACE)
+
+
+@receiver(post_save, sender=NewsArticle)
+@receiver(post_delete, sender=NewsArticle)
+def invalidate_news_cache(sender, **kwargs):
+    """
+    Сбрасывает кэш страниц ленты при публикации, изменении или удалении новости
+    """
+    bump_version(NEWS_NAMESPACE)
@@ -0,0 +1,32 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from ..avatars import AVATAR_SIZES, thumbnail_name
+
+register = template.Library()
+
+
+@register.inclusion_tag('accounts/avatar.html')
+def avatar(profile, css_class='', alt='Аватар'):
+    """
+    Аватар профиля с миниатюрами WebP/JPEG в srcset
+
+    Аватары, загруженные до появления миниатюр, показываются исходным файлом.
+    """
+    context = {'css_class': css_class, 'alt': alt, 'size': AVATAR_SIZES[0]}
+    if not profile.avatar_hash:
+        context['src'] = profile.avatar.url
+        return context
+
+    def srcset(extension):
+        return ', '.join(
+            f'{default_storage.url(thumbnail_name(profile.avatar_hash, size, extension))} {size}w'
+            for size in AVATAR_SIZES
+        )
+
+    context.update(
+        src=default_storage.url(thumbnail_name(profile.avatar_hash, AVATAR_SIZES[0], 'jpg')),
+        webp_srcset=srcset('webp'),
+        jpeg_srcset=srcset('jpg'),
+    )
+    return context
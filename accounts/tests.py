@@ -1,19 +1,77 @@
-from datetime import date
+import asyncio
+import io
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-from django.contrib.auth.models import User
+from django.contrib.auth.models import AnonymousUser, Permission, User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.paginator import EmptyPage
+from django.conf import settings
+from django.db import connection, connections
 from django.db.models.signals import post_save
-from django.test import TestCase
-from django.urls import reverse
+from django.contrib.sessions.backends.base import SessionBase
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.template import Context, Template, engines
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from PIL import Image
+from prometheus_client import REGISTRY
 
-from .models import AccessLevel, Client, Profile
+from FinTrack.cache import FileBasedCache, LocMemCache, _version_key, bump_version, cached, get_version, memoize
+from FinTrack.db.pool import ConnectionPool, PooledDatabaseWrapperMixin, PoolTimeout
+from FinTrack.db.routers import SESSION_PIN_KEY, PrimaryPinningMiddleware, PrimaryReplicaRouter
+from FinTrack.db.sqlite3.base import DatabaseWrapper as TunedSQLiteWrapper
+from FinTrack.monitoring import ahealth_check, ametrics_view
+from FinTrack.paginators import EstimatedCountPaginator, estimate_row_count
+from FinTrack.overload import REQUESTS_SHED, AdaptiveLimit, limiter
+from FinTrack.ratelimit import RATE_LIMIT_FALLBACK, RATE_LIMITED, client_ip
+from FinTrack.rates import RateSnapshot, get_snapshot
+from FinTrack.rates.batch import convert_batch, pair_factor
+from FinTrack.rates.history import RateHistory, history as rate_history
+from FinTrack.rates.providers import FileRateProvider, HttpRateProvider, RateProvider
+from FinTrack.rates.snapshot import InvalidSnapshot
+from FinTrack.rates.store import RateStore
+from FinTrack.startup import IMPORT_BUDGET_MS, LAZY_MODULES, by_package, parse_importtime, profile_imports, total_ms, warm_up
+from FinTrack.workers import WORKER_RECYCLES, RssWatchdog, available_cpus, current_rss, default_workers
+
+from .activity import ActivityTracker, BufferedWriter, EventEmitter, events, tracker
+from . import avatars
+from .avatars import AVATAR_SIZES, master_name, thumbnail_name
+from .client_import import import_clients, stash_upload
+from .forms import ProfileExtendedForm, RegisterForm
+from .management.commands.index_advisor import has_sequential_scan, hot_queries
+from .models import AccessLevel, ActivityEvent, Client, ClientDailyStats, NewsArticle, Profile
+from .news import get_news_page
+from .seeding import SEED_PASSWORD, access_level_ids, build_batch, seed_clients
 from .signals import create_client_for_new_user
 from .utils import (
+    bulk_set_access_level,
+    bulk_set_active,
     can_perform_action,
     create_client_from_user,
     downgrade_client_to_basic,
+    get_access_levels,
     get_client_statistics,
+    get_daily_stats,
+    get_recent_events,
+    sparkline_points,
     upgrade_client_to_premium,
 )
+from .views import aconverter_view, adashboard_view, asubscription_plans_view
 
 
 class SignalIsolationMixin:
@@ -239,3 +297,1482 @@ class ViewsIntegrationTests(SignalIsolationMixin, TestCase):
         self.client.login(username='testuser', password='testpass123')
         response = self.client.get(reverse('profile'))
         self.assertEqual(response.status_code, 200)
+
+
+class CacheHelpersTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['local'].clear()
+
+    def test_memoize_computes_once_per_version(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(memoize('answer', compute, namespace='tests'), 1)
+        self.assertEqual(memoize('answer', compute, namespace='tests'), 1)
+        bump_version('tests')
+        self.assertEqual(memoize('answer', compute, namespace='tests'), 2)
+        self.assertEqual(len(calls), 2)
+
+    def test_local_alias_is_invalidated_by_shared_version(self):
+        calls = []
+
+        @cached('tests', alias='local')
+        def expensive(value):
+            calls.append(value)
+            return value * 2
+
+        self.assertEqual(expensive(21), 42)
+        self.assertEqual(expensive(21), 42)
+        expensive.invalidate()
+        self.assertEqual(expensive(21), 42)
+        self.assertEqual(calls, [21, 21])
+
+    def test_hits_misses_and_evictions_are_counted(self):
+        cache = LocMemCache('tests-eviction', {'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_FREQUENCY': 2}, 'METRICS_NAME': 'tests'})
+
+        def sample(name):
+            return REGISTRY.get_sample_value(name, {'cache': 'tests'}) or 0
+
+        hits, misses, evictions = (
+            sample('fintrack_cache_hits_total'),
+            sample('fintrack_cache_misses_total'),
+            sample('fintrack_cache_evictions_total'),
+        )
+        cache.get('absent')
+        cache.set('a', 1)
+        cache.get('a')
+        cache.set('b', 2)
+        cache.set('c', 3)
+
+        self.assertEqual(sample('fintrack_cache_hits_total') - hits, 1)
+        self.assertEqual(sample('fintrack_cache_misses_total') - misses, 1)
+        self.assertEqual(sample('fintrack_cache_evictions_total') - evictions, 1)
+
+    def test_file_cache_lists_directory_once_per_set(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = FileBasedCache(directory.name, {'OPTIONS': {'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2}, 'METRICS_NAME': 'tests-file'})
+        evictions = REGISTRY.get_sample_value('fintrack_cache_evictions_total', {'cache': 'tests-file'}) or 0
+        for index in range(4):
+            cache.set(f'key-{index}', index)
+
+        with mock.patch.object(cache, '_list_cache_files', wraps=cache._list_cache_files) as listing:
+            cache.set('key-4', 4)
+
+        self.assertEqual(listing.call_count, 1)
+        self.assertEqual(len(cache._list_cache_files()), 3)
+        self.assertEqual(REGISTRY.get_sample_value('fintrack_cache_evictions_total', {'cache': 'tests-file'}) - evictions, 2)
+
+    @override_settings(LOCAL_CACHE_VERSION_TIMEOUT=60)
+    def test_local_alias_keeps_version_locally(self):
+        version = get_version('tests', 'local')
+        with mock.patch.object(caches['default'], 'get', side_effect=AssertionError('shared cache read')):
+            self.assertEqual(get_version('tests', 'local'), version)
+
+        # Сброс в другом воркере: локальная копия версии живет до истечения TTL
+        caches['default'].incr(_version_key('tests'))
+        self.assertEqual(get_version('tests', 'local'), version)
+        caches['local'].delete(_version_key('tests'))
+        self.assertEqual(get_version('tests', 'local'), version + 1)
+
+        bump_version('tests')
+        self.assertEqual(get_version('tests', 'local'), version + 2)
+
+
+class CachedUtilsTests(SignalIsolationMixin, TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['local'].clear()
+
+    def test_access_levels_cache_follows_model_changes(self):
+        AccessLevel.objects.create(name='Тестовый')
+        names = [level.name for level in get_access_levels()]
+        self.assertIn('Тестовый', names)
+
+        with self.assertNumQueries(0):
+            get_access_levels()
+
+        AccessLevel.objects.filter(name='Тестовый').get().delete()
+        self.assertNotIn('Тестовый', [level.name for level in get_access_levels()])
+
+    def test_client_statistics_are_served_from_cache(self):
+        get_client_statistics()
+        with self.assertNumQueries(0):
+            get_client_statistics()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite connection profile')
+class SQLiteProfileTests(TestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_immediate_transaction_mode_takes_write_lock(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'immediate.sqlite3')
+            wrapper = TunedSQLiteWrapper({
+                **connection.settings_dict,
+                'NAME': path,
+                'OPTIONS': {'transaction_mode': 'immediate'},
+            })
+            wrapper.ensure_connection()
+            with wrapper.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+
+            wrapper._start_transaction_under_autocommit()
+            other = sqlite3.connect(path, timeout=0, isolation_level=None)
+            try:
+                with self.assertRaisesMessage(sqlite3.OperationalError, 'locked'):
+                    other.execute('BEGIN IMMEDIATE')
+            finally:
+                other.close()
+                wrapper.connection.rollback()
+                wrapper.close()
+
+
+class PrimaryReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def _request(self, session_data=None):
+        request = self.factory.get('/')
+        request.session = SessionBase()
+        request.session.update(session_data or {})
+        return request
+
+    def test_reads_go_to_replica_until_request_writes(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Client))
+            self.router.db_for_write(Client)
+            seen.append(self.router.db_for_read(Client))
+            return HttpResponse()
+
+        request = self._request()
+        PrimaryPinningMiddleware(view)(request)
+        self.assertEqual(seen, ['replica', 'default'])
+        self.assertIn(SESSION_PIN_KEY, request.session)
+
+    def test_session_pin_routes_next_request_to_primary(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Client))
+            return HttpResponse()
+
+        first = self._request()
+        PrimaryPinningMiddleware(lambda request: self.router.db_for_write(Client) or HttpResponse())(first)
+        PrimaryPinningMiddleware(view)(self._request(dict(first.session.items())))
+        PrimaryPinningMiddleware(view)(self._request({SESSION_PIN_KEY: 0}))
+        self.assertEqual(seen, ['default', 'replica'])
+
+    def test_sessions_always_read_from_primary(self):
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+
+
+@override_settings(DATABASE_ROUTERS=settings.REPLICA_ROUTERS, MIDDLEWARE=settings.REPLICA_MIDDLEWARE)
+class ReplicaRoutingIntegrationTests(TransactionTestCase):
+    """Routing on: 'replica' mirrors the test database, its queries are captured separately."""
+
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        User.objects.create_user(username='reader', password='secret')
+
+    def test_reads_use_replica_and_own_writes_pin_primary(self):
+        self.client.login(username='reader', password='secret')
+
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.client.get(reverse('dashboard'))
+        self.assertTrue(replica_queries.captured_queries)
+
+        # profile_view writes through Profile.objects.get_or_create()
+        self.client.get(reverse('profile'))
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.client.get(reverse('dashboard'))
+        self.assertFalse(replica_queries.captured_queries)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+
+    def rollback(self):
+        if self.broken:
+            raise RuntimeError('connection lost')
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(TestCase):
+    def _pool(self, **options):
+        opened = []
+
+        def connect():
+            opened.append(FakeConnection())
+            return opened[-1]
+
+        def check(conn):
+            if conn.broken:
+                raise RuntimeError('connection lost')
+
+        return ConnectionPool('tests', connect, check=check, **options), opened
+
+    def test_connections_are_reused(self):
+        pool, opened = self._pool(max_size=2)
+        conn = pool.acquire()
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+        self.assertEqual(len(opened), 1)
+
+    def test_min_size_is_prefilled(self):
+        pool, opened = self._pool(min_size=2, max_size=3)
+        pool.acquire()
+        self.assertEqual(len(opened), 2)
+        self.assertEqual(pool.idle, 1)
+
+    def test_checkout_times_out_when_exhausted(self):
+        pool, _ = self._pool(max_size=1, timeout=0.05)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+    def test_broken_connection_is_replaced_on_checkout(self):
+        pool, opened = self._pool(max_size=1)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.broken = True
+        replacement = pool.acquire()
+        self.assertIsNot(replacement, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.size, 1)
+
+    def test_idle_connections_above_min_size_are_evicted(self):
+        pool, opened = self._pool(min_size=1, max_size=3, max_idle=0)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        pool.acquire()
+        self.assertEqual(pool.size, 1)
+        self.assertEqual(sum(conn.closed for conn in opened), 1)
+
+
+class PooledSQLiteWrapper(PooledDatabaseWrapperMixin, TunedSQLiteWrapper):
+    pass
+
+
+@skipUnless(connection.vendor == 'sqlite', 'pool wrapper exercised with SQLite')
+class PooledDatabaseWrapperTests(TestCase):
+    def test_closing_returns_connection_to_pool(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wrapper = PooledSQLiteWrapper({
+                **connection.settings_dict,
+                'NAME': os.path.join(tmp, 'pooled.sqlite3'),
+                'OPTIONS': {'pool': {'max_size': 2}},
+            }, alias='pooled')
+            wrapper.ensure_connection()
+            raw = wrapper.connection
+            wrapper.close()
+            wrapper.ensure_connection()
+            self.assertIs(wrapper.connection, raw)
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                self.assertEqual(cursor.fetchone(), (1,))
+            wrapper.close()
+
+
+class IndexAdvisorTests(TestCase):
+    def test_sequential_scan_detection(self):
+        self.assertTrue(has_sequential_scan('3 0 0 SCAN accounts_client'))
+        self.assertTrue(has_sequential_scan('Seq Scan on accounts_client  (cost=0.00..1.05 rows=5 width=4)'))
+        self.assertFalse(has_sequential_scan('4 0 0 SEARCH accounts_client USING INDEX client_city_idx (city=?)'))
+        self.assertFalse(has_sequential_scan('7 0 0 SCAN accounts_client USING COVERING INDEX client_city_idx'))
+        self.assertFalse(has_sequential_scan('Index Scan using client_city_idx on accounts_client'))
+
+    def test_email_lookup_uses_functional_index(self):
+        plan = dict(hot_queries())['register.clean_email'].explain()
+        self.assertFalse(has_sequential_scan(plan), plan)
+
+    def test_command_reports_every_hot_query(self):
+        out = StringIO()
+        call_command('index_advisor', stdout=out)
+        for name, _ in hot_queries():
+            self.assertIn(name, out.getvalue())
+
+    def test_register_form_rejects_email_case_insensitively(self):
+        User.objects.create_user(username='existing', password='secret', email='Taken@Example.com')
+        form = RegisterForm(data={
+            'username': 'newcomer',
+            'email': 'taken@example.COM',
+            'password1': 'Str0ng-pass-123',
+            'password2': 'Str0ng-pass-123',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('email', form.errors)
+
+    def test_register_form_rejects_email_with_non_ascii_domain(self):
+        def form(username, email):
+            return RegisterForm(data={
+                'username': username,
+                'email': email,
+                'password1': 'Str0ng-pass-123',
+                'password2': 'Str0ng-pass-123',
+            })
+
+        # LOWER в SQLite не меняет кириллицу: сравнение держится на том, что домен
+        # сохраняется в нижнем регистре
+        first = form('existing', 'Ivan@Пример.РФ')
+        self.assertTrue(first.is_valid(), first.errors)
+        self.assertEqual(first.save().email, 'Ivan@пример.рф')
+        second = form('newcomer', 'ivan@ПРИМЕР.рф')
+        self.assertFalse(second.is_valid())
+        self.assertIn('email', second.errors)
+
+
+class SeedDataTests(TestCase):
+    def test_command_creates_linked_rows_without_signals(self):
+        clients_before = Client.objects.count()
+        call_command('seed_data', clients=25, seed=3, batch_size=10, stdout=StringIO())
+
+        seeded = Client.objects.filter(email__startswith='seed')
+        self.assertEqual(Client.objects.count(), clients_before + 25)
+        self.assertEqual(seeded.count(), 25)
+        self.assertEqual(Profile.objects.filter(client__in=seeded).count(), 25)
+        client = seeded.select_related('user').first()
+        self.assertEqual(client.user_id, client.id)
+        self.assertTrue(client.user.check_password(SEED_PASSWORD))
+        # Последовательности сдвинуты: обычное создание не конфликтует с явными id
+        self.assertTrue(User.objects.create_user('after-seed', password='secret').id > client.id)
+
+    def test_batches_are_deterministic(self):
+        level_ids = access_level_ids()
+        first = build_batch(1000, 20, 5, 7, level_ids, 'hash')
+        second = build_batch(1000, 20, 5, 7, level_ids, 'hash')
+        other_seed = build_batch(1000, 20, 5, 8, level_ids, 'hash')
+        self.assertEqual(first, second)
+        self.assertNotEqual(first[1][2]['monthly_income'], other_seed[1][2]['monthly_income'])
+        # Даты регистрации не зависят от дня запуска
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(days=3)):
+            self.assertEqual(build_batch(1000, 20, 5, 7, level_ids, 'hash'), first)
+        self.assertEqual(first[1][2]['id'], list(range(1020, 1025)))
+
+
+_SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SQL_IN_LISTS = re.compile(r'\((?:\?, )+\?\)')
+
+
+def sql_shape(sql):
+    """Query text with literals replaced, so N+1 lookups collapse to one shape."""
+    return _SQL_IN_LISTS.sub('(?)', _SQL_LITERALS.sub('?', sql))
+
+
+class QueryBudgetTests(TestCase):
+    """Upper bounds on SQL per page; a page must not grow with the number of rows."""
+
+    # url name: (max queries, max repeated executions of one query shape)
+    BUDGETS = {
+        # Холодный кэш: первая страница ленты новостей читается из базы
+        'dashboard': (5, 0),
+        'profile': (5, 0),
+        # Уровни доступа читаются дважды: форма поиска и список для фильтра
+        'client_list': (6, 1),
+        'client_detail': (3, 0),
+        'subscription_plans': (4, 0),
+        'fintrack_admin:index': (7, 0),
+        # Холодный кэш: значения фильтров по стране и городу читаются из базы
+        'fintrack_admin:accounts_client_changelist': (8, 0),
+        'fintrack_admin:accounts_profile_changelist': (5, 0),
+        # Маленькая таблица: оставлен стандартный второй COUNT(*)
+        'fintrack_admin:accounts_accesslevel_changelist': (5, 1),
+        'fintrack_admin:auth_user_changelist': (6, 0),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seeded = seed_clients(20, seed=1)
+        cls.regular = User.objects.get(id=cls.seeded[0])
+        cls.staff = User.objects.create_superuser('budget-admin', 'admin@example.com', 'secret')
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+    def assertWithinBudget(self, url_name, user, args=(), data=None):
+        max_queries, max_repeats = self.BUDGETS[url_name]
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse(url_name, args=args), data)
+        self.assertEqual(response.status_code, 200)
+
+        queries = [query['sql'] for query in captured.captured_queries]
+        shapes = Counter(sql_shape(sql) for sql in queries)
+        repeats = sum(count - 1 for count in shapes.values())
+        if len(queries) > max_queries or repeats > max_repeats:
+            listing = '\n'.join(
+                f"{'N+1 ' if shapes[sql_shape(sql)] > 1 else '    '}{sql}" for sql in queries
+            )
+            self.fail(
+                f'{url_name}: {len(queries)} queries (budget {max_queries}), '
+                f'{repeats} repeated (budget {max_repeats}):\n{listing}'
+            )
+
+    def test_dashboard(self):
+        self.assertWithinBudget('dashboard', self.regular)
+
+    def test_profile(self):
+        self.assertWithinBudget('profile', self.regular)
+
+    def test_client_list_20_rows(self):
+        self.assertWithinBudget('client_list', self.staff)
+
+    def test_client_list_200_rows(self):
+        seed_clients(180, seed=2)
+        self.assertWithinBudget('client_list', self.staff)
+        self.assertWithinBudget('client_list', self.staff, data={'page': 5, 'city': 'Москва'})
+
+    def test_client_detail(self):
+        self.assertWithinBudget('client_detail', self.staff, args=[self.seeded[0]])
+
+    def test_subscription_plans(self):
+        self.assertWithinBudget('subscription_plans', self.regular)
+
+    def test_admin_index(self):
+        self.assertWithinBudget('fintrack_admin:index', self.staff)
+
+    def test_admin_client_changelist(self):
+        self.assertWithinBudget('fintrack_admin:accounts_client_changelist', self.staff)
+
+    def test_admin_access_level_changelist(self):
+        self.assertWithinBudget('fintrack_admin:accounts_accesslevel_changelist', self.staff)
+
+    def test_admin_access_level_filter_rejects_non_numeric_id(self):
+        self.client.force_login(self.staff)
+        url = reverse('fintrack_admin:accounts_client_changelist')
+        response = self.client.get(url, {'access_level': 'abc'})
+        self.assertRedirects(response, f'{url}?e=1', fetch_redirect_response=False)
+
+    def test_admin_changelists_do_not_grow_with_rows(self):
+        self.client.force_login(self.staff)
+        names = ['accounts_client', 'accounts_profile', 'auth_user']
+
+        def count_queries():
+            counts = {}
+            for name in names:
+                url = reverse(f'fintrack_admin:{name}_changelist')
+                with CaptureQueriesContext(connection) as captured:
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                counts[name] = len(captured)
+            return counts
+
+        count_queries()
+        small = count_queries()
+        seed_clients(60, seed=3)
+        self.assertEqual(count_queries(), small)
+
+    def test_admin_profile_changelist(self):
+        self.assertWithinBudget('fintrack_admin:accounts_profile_changelist', self.staff)
+
+    def test_admin_user_changelist(self):
+        self.assertWithinBudget('fintrack_admin:auth_user_changelist', self.staff)
+
+
+class ActivityTrackerTests(SignalIsolationMixin, TestCase):
+    def setUp(self):
+        self.level = AccessLevel.objects.create(name='Активность', description='Тест')
+        self.users = []
+        for index in range(3):
+            user = User.objects.create_user(username=f'active{index}', password='secret')
+            Client.objects.create(
+                user=user,
+                access_level=self.level,
+                first_name='Имя',
+                last_name='Фамилия',
+                phone=f'+7999000000{index}',
+                email=f'active{index}@example.com',
+                birth_date=date(1990, 1, 1),
+                gender='M',
+            )
+            self.users.append(user)
+        tracker.reset()
+
+    def tearDown(self):
+        tracker.reset()
+
+    def test_buffered_until_flush_then_single_update(self):
+        activity = ActivityTracker(interval=0, max_pending=100)
+        login_time = timezone.now() - timedelta(minutes=5)
+        with self.assertNumQueries(0):
+            activity.logged_in(self.users[0].pk, login_time)
+            activity.seen(self.users[0].pk)
+            activity.seen(self.users[1].pk, login_time)
+            activity.seen(self.users[1].pk, login_time - timedelta(minutes=1))
+        self.assertIsNone(Client.objects.get(user=self.users[0]).last_seen)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(activity.flush(), 2)
+
+        first = Client.objects.get(user=self.users[0])
+        second = Client.objects.get(user=self.users[1])
+        self.assertEqual(first.last_login_date, login_time)
+        self.assertGreater(first.last_seen, login_time)
+        self.assertEqual(second.last_seen, login_time)
+        self.assertIsNone(second.last_login_date)
+        self.assertIsNone(Client.objects.get(user=self.users[2]).last_seen)
+
+    def test_full_buffer_flushes_immediately(self):
+        activity = ActivityTracker(interval=0, max_pending=2)
+        activity.seen(self.users[0].pk)
+        self.assertEqual(activity.pending, 1)
+        activity.seen(self.users[1].pk)
+        self.assertEqual(activity.pending, 0)
+        self.assertEqual(Client.objects.filter(last_seen__isnull=False).count(), 2)
+
+    def test_incomplete_writer_fails_on_creation(self):
+        class NoRestore(BufferedWriter):
+            def _empty(self):
+                return {}
+
+            def _merge(self, *args):
+                pass
+
+            def _write(self, pending):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoRestore(interval=0)
+
+    def test_login_and_requests_are_tracked_without_client_writes(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.client.login(username='active2', password='secret')
+            self.client.get(reverse('about'))
+        self.assertFalse([q['sql'] for q in captured.captured_queries if 'accounts_client' in q['sql']])
+        self.assertEqual(tracker.pending, 1)
+
+        tracker.flush()
+        client = Client.objects.get(user=self.users[2])
+        self.assertIsNotNone(client.last_login_date)
+        self.assertGreaterEqual(client.last_seen, client.last_login_date)
+
+
+class ActivityEventTests(SignalIsolationMixin, TestCase):
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        events.reset()
+
+    def tearDown(self):
+        events.reset()
+
+    def test_events_are_buffered_and_batch_inserted(self):
+        emitter = EventEmitter(interval=0, max_pending=100)
+        with self.assertNumQueries(0):
+            for index in range(5):
+                emitter.emit(ActivityEvent.REGISTRATION, f'user{index}', index)
+        with self.assertNumQueries(1):
+            self.assertEqual(emitter.flush(), 5)
+        self.assertEqual(ActivityEvent.objects.count(), 5)
+
+    def test_feed_is_bounded_newest_first_and_refreshed_after_flush(self):
+        now = timezone.now()
+        ActivityEvent.objects.bulk_create(
+            ActivityEvent(kind=ActivityEvent.PROFILE_UPDATE, description=f'old{index}', created_at=now - timedelta(hours=index + 1))
+            for index in range(12)
+        )
+        feed = get_recent_events()
+        self.assertEqual(len(feed), 8)
+        self.assertEqual(feed[0]['description'], 'old0')
+        with self.assertNumQueries(0):
+            get_recent_events()
+
+        events.emit(ActivityEvent.PREMIUM, 'Премиум подписка активирована: Тест', when=now)
+        events.flush()
+        feed = get_recent_events()
+        self.assertEqual(feed[0]['description'], 'Премиум подписка активирована: Тест')
+        self.assertEqual(feed[0]['icon'], '⭐')
+
+    def test_domain_actions_emit_events(self):
+        trial = AccessLevel.objects.create(name='Пробный', description='Пробный период')
+        user = User.objects.create_user('eventful', password='secret')
+        client = Client.objects.create(
+            user=user,
+            access_level=trial,
+            first_name='Ева',
+            last_name='Событиева',
+            phone='+79990001122',
+            email='eventful@example.com',
+            birth_date=date(1990, 1, 1),
+            gender='F',
+        )
+        upgrade_client_to_premium(client)
+
+        events.flush()
+        kinds = list(ActivityEvent.objects.order_by('id').values_list('kind', flat=True))
+        self.assertEqual(kinds, [ActivityEvent.ACCESS_LEVEL, ActivityEvent.REGISTRATION, ActivityEvent.PREMIUM])
+
+    def test_admin_index_renders_feed(self):
+        staff = User.objects.create_superuser('feed-admin', 'feed@example.com', 'secret')
+        events.flush()
+        self.client.force_login(staff)
+        response = self.client.get(reverse('fintrack_admin:index'))
+        self.assertContains(response, 'Новый пользователь feed-admin зарегистрирован')
+        # Время события по-русски при любом LANGUAGE_CODE
+        self.assertContains(response, 'минут назад')
+
+
+class ClientDailyStatsTests(SignalIsolationMixin, TestCase):
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.premium = AccessLevel.objects.get(name='Премиум')
+        self.basic = AccessLevel.objects.get(name='Обычный')
+        for index, (level, active) in enumerate([(self.premium, True), (self.premium, False), (self.basic, True)]):
+            user = User.objects.create_user(username=f'stats{index}', password='secret')
+            Client.objects.create(
+                user=user,
+                access_level=level,
+                is_active=active,
+                first_name='Имя',
+                last_name='Фамилия',
+                phone=f'+7988000000{index}',
+                email=f'stats{index}@example.com',
+                birth_date=date(1990, 1, 1),
+                gender='M',
+            )
+
+    def test_statistics_use_single_aggregate(self):
+        with self.assertNumQueries(2):
+            stats = get_client_statistics()
+        self.assertEqual(stats['total_clients'], 3)
+        self.assertEqual(stats['active_clients'], 2)
+        self.assertEqual(stats['premium_clients'], 2)
+        self.assertEqual(stats['active_premium_clients'], 1)
+        self.assertEqual(stats['basic_clients'], 1)
+        self.assertEqual(stats['inactive_clients'], 1)
+        self.assertEqual(stats['total_users'], 3)
+
+    def test_user_count_is_refreshed_on_create_and_delete(self):
+        get_client_statistics()
+        user = User.objects.create_user(username='stats-new', password='secret')
+        self.assertEqual(get_client_statistics()['total_users'], 4)
+        with self.assertNumQueries(0):
+            get_client_statistics()
+        user.delete()
+        self.assertEqual(get_client_statistics()['total_users'], 3)
+
+    def test_snapshot_command_is_idempotent_and_feeds_sparklines(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        ClientDailyStats.objects.create(date=yesterday, total_users=1, total_clients=1, active_clients=1, premium_clients=0)
+        call_command('snapshot_client_stats', stdout=StringIO())
+        call_command('snapshot_client_stats', stdout=StringIO())
+
+        today = ClientDailyStats.objects.get(date=timezone.localdate())
+        self.assertEqual((today.total_clients, today.active_clients, today.premium_clients, today.new_clients), (3, 2, 1, 3))
+        history = get_daily_stats()
+        self.assertEqual([day['date'] for day in history], [yesterday, timezone.localdate()])
+        self.assertEqual(sparkline_points(day['active_clients'] for day in history), '0.0,28.0 120.0,0.0')
+
+        staff = User.objects.create_superuser('stats-admin', 'stats@example.com', 'secret')
+        self.client.force_login(staff)
+        self.client.get(reverse('fintrack_admin:index'))
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('fintrack_admin:index'))
+        self.assertContains(response, 'class="stat-sparkline"')
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    class SmallThresholdPaginator(EstimatedCountPaginator):
+        threshold = 10
+
+    def test_unfiltered_large_table_uses_estimate(self):
+        ids = seed_clients(15, seed=4)
+        Client.objects.filter(id=ids[3]).delete()
+        paginator = self.SmallThresholdPaginator(Client.objects.all(), 5)
+        self.assertEqual(paginator.count, ids[-1])
+        self.assertEqual(estimate_row_count(Client), ids[-1])
+
+    def test_end_of_list_replaces_overstated_estimate(self):
+        ids = seed_clients(15, seed=4)
+        Client.objects.filter(id=ids[3]).delete()
+        paginator = self.SmallThresholdPaginator(Client.objects.all(), 5)
+        self.assertEqual(len(paginator.page(3)), 4)
+        self.assertEqual((paginator.count, paginator.num_pages), (14, 3))
+
+        Client.objects.filter(id__in=ids[:5]).delete()
+        paginator = self.SmallThresholdPaginator(Client.objects.all(), 5)
+        self.assertEqual(len(paginator.page(2)), 5)
+        with self.assertRaises(EmptyPage):
+            paginator.page(3)
+        self.assertEqual((paginator.count, paginator.num_pages), (10, 2))
+        self.assertEqual(paginator.get_page(3).number, 2)
+
+    def test_filtered_or_small_querysets_are_counted_exactly(self):
+        seed_clients(15, seed=4)
+        active = Client.objects.filter(is_active=True)
+        self.assertEqual(self.SmallThresholdPaginator(active, 5).count, active.count())
+        self.assertEqual(EstimatedCountPaginator(Client.objects.all(), 5).count, Client.objects.count())
+
+
+class BulkClientActionsTests(TestCase):
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        events.reset()
+        self.ids = seed_clients(40, seed=6)
+        self.seeded = Client.objects.filter(id__in=self.ids)
+        self.premium = AccessLevel.objects.get(name='Премиум')
+
+    def tearDown(self):
+        events.reset()
+
+    def test_access_level_change_is_one_update_and_one_event(self):
+        expected = self.seeded.exclude(access_level=self.premium).count()
+        with self.assertNumQueries(1):
+            updated = bulk_set_access_level(self.seeded, self.premium)
+        self.assertEqual(updated, expected)
+        self.assertEqual(self.seeded.exclude(access_level=self.premium).count(), 0)
+        self.assertEqual(events.pending, 1)
+        # Повторный перевод ничего не меняет и не пишет событие
+        self.assertEqual(bulk_set_access_level(self.seeded, self.premium), 0)
+        self.assertEqual(events.pending, 1)
+
+    def test_statistics_cache_is_reset(self):
+        get_client_statistics()
+        bulk_set_active(self.seeded, False)
+        self.assertEqual(get_client_statistics()['active_clients'], Client.objects.filter(is_active=True).count())
+
+    def test_command_filters_and_dry_run(self):
+        city = self.seeded.values_list('city', flat=True).first()
+        in_city = self.seeded.filter(city=city)
+        expected = in_city.filter(is_active=True).count()
+        out = StringIO()
+        call_command('bulk_update_clients', deactivate=True, city=city, dry_run=True, stdout=out)
+        self.assertIn(f': {expected}', out.getvalue())
+        self.assertEqual(in_city.filter(is_active=True).count(), expected)
+
+        call_command('bulk_update_clients', deactivate=True, city=city, stdout=StringIO())
+        self.assertFalse(in_city.filter(is_active=True).exists())
+        self.assertTrue(self.seeded.exclude(city=city).filter(is_active=True).exists())
+
+    def test_admin_select_across_runs_single_update(self):
+        staff = User.objects.create_superuser('bulk-admin', 'bulk@example.com', 'secret')
+        self.client.force_login(staff)
+        response = self.client.post(reverse('fintrack_admin:accounts_client_changelist'), {
+            'action': f'set_access_level_{self.premium.pk}',
+            'select_across': '1',
+            '_selected_action': [self.ids[0]],
+            'index': '0',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Client.objects.exclude(access_level=self.premium).exists())
+
+    def test_view_only_staff_cannot_run_actions(self):
+        Client.objects.filter(pk=self.ids[0]).update(is_active=True)
+        staff = User.objects.create_user('bulk-viewer', password='secret', is_staff=True)
+        staff.user_permissions.add(Permission.objects.get(codename='view_client'))
+        self.client.force_login(staff)
+        url = reverse('admin:accounts_client_changelist')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('deactivate_clients', response.content.decode())
+        self.client.post(url, {'action': 'deactivate_clients', '_selected_action': [self.ids[0]], 'index': '0'})
+        self.assertTrue(Client.objects.get(pk=self.ids[0]).is_active)
+
+
+class ClientCSVImportTests(TestCase):
+    def setUp(self):
+        events.reset()
+        self.ids = seed_clients(40, seed=9)
+        self.upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.upload_dir.cleanup)
+
+    def tearDown(self):
+        events.reset()
+
+    def csv(self, header, rows):
+        return io.BytesIO('\n'.join([header] + rows).encode())
+
+    def test_dry_run_reports_diff_and_errors_without_writing(self):
+        first, second = Client.objects.filter(id__in=self.ids[:2]).order_by('id')
+        report = import_clients(self.csv('id,city,occupation,phone,email', [
+            f'{first.id},Иннополис,Аналитик,,',
+            f'{second.id},,,{first.phone},',
+            f'{self.ids[2]},,,,not-an-email',
+            '999999,Казань,,,',
+            f'{first.id},Уфа,,,',
+        ]))
+        self.assertEqual((report.rows, report.changed, report.error_count), (5, 1, 4))
+        self.assertEqual(report.changes[0]['fields'], [('city', first.city, 'Иннополис'), ('occupation', first.occupation, 'Аналитик')])
+        errors = {error['line']: error['message'] for error in report.errors}
+        self.assertEqual(sorted(errors), [3, 4, 5, 6])
+        self.assertIn('phone', errors[3])
+        self.assertIn('email', errors[4])
+        first.refresh_from_db()
+        self.assertNotEqual(first.city, 'Иннополис')
+        self.assertEqual(events.pending, 0)
+
+    def test_apply_uses_constant_queries_per_batch(self):
+        def run(ids):
+            rows = [f'seed{pk}@example.com;Альметьевск;Инженер-нефтяник' for pk in ids]
+            with CaptureQueriesContext(connection) as queries:
+                report = import_clients(self.csv('email;city;occupation', rows), dry_run=False)
+            self.assertEqual(report.changed, len(ids))
+            return len(queries)
+
+        self.assertEqual(run(self.ids[:5]), run(self.ids[5:40]))
+        self.assertEqual(Client.objects.filter(id__in=self.ids, city='Альметьевск').count(), 40)
+        self.assertEqual(events.pending, 2)
+
+    def test_admin_upload_previews_then_applies(self):
+        staff = User.objects.create_superuser('import-admin', 'import@example.com', 'secret')
+        self.client.force_login(staff)
+        url = reverse('fintrack_admin:accounts_client_import')
+        upload = SimpleUploadedFile('clients.csv', f'id,occupation\n{self.ids[0]},Актуарий\n'.encode(), content_type='text/csv')
+        with override_settings(CLIENT_IMPORT_DIR=self.upload_dir.name):
+            response = self.client.post(url, {'csv_file': upload})
+            self.assertContains(response, 'Актуарий')
+            # Ссылки ведут в ту админку, из которой открыт импорт
+            self.assertContains(response, f'href="{reverse("fintrack_admin:index")}"')
+            self.assertContains(response, f'href="{reverse("fintrack_admin:accounts_client_changelist")}"')
+            self.assertNotEqual(Client.objects.get(id=self.ids[0]).occupation, 'Актуарий')
+
+            response = self.client.post(url, {'apply': '1'})
+            self.assertRedirects(response, reverse('fintrack_admin:accounts_client_changelist'))
+        self.assertEqual(Client.objects.get(id=self.ids[0]).occupation, 'Актуарий')
+        self.assertEqual(os.listdir(self.upload_dir.name), [])
+
+    def test_stale_uploads_are_removed_on_next_upload(self):
+        stale = os.path.join(self.upload_dir.name, 'abandoned.csv')
+        fresh = os.path.join(self.upload_dir.name, 'pending.csv')
+        for path in (stale, fresh):
+            with open(path, 'w') as stashed:
+                stashed.write('id\n')
+        old = time.time() - 2 * 3600
+        os.utime(stale, (old, old))
+        with override_settings(CLIENT_IMPORT_DIR=self.upload_dir.name, CLIENT_IMPORT_MAX_AGE=3600):
+            name = stash_upload(SimpleUploadedFile('clients.csv', b'id\n'))
+        self.assertEqual(sorted(os.listdir(self.upload_dir.name)), sorted(['pending.csv', name]))
+
+
+class AvatarPipelineTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user('avatar-user', password='secret')
+        self.profile = Profile.objects.get_or_create(user=self.user)[0]
+
+    def photo(self, size=(800, 600), name='photo.jpg'):
+        image = Image.new('RGB', size, 'navy')
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        exif[0x0112] = 6  # повернуть на 90°
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def upload(self, photo):
+        form = ProfileExtendedForm(data={}, files={'avatar': photo}, instance=self.profile)
+        self.assertTrue(form.is_valid(), form.errors)
+        return form.save()
+
+    def test_upload_is_stripped_rotated_and_thumbnailed(self):
+        self.upload(self.photo())
+        self.profile.refresh_from_db()
+        digest = self.profile.avatar_hash
+        self.assertEqual(self.profile.avatar.name, master_name(digest))
+        with Image.open(self.profile.avatar.path) as master:
+            self.assertEqual(master.size, (600, 800))
+            self.assertEqual(dict(master.getexif()), {})
+        for size in AVATAR_SIZES:
+            with Image.open(os.path.join(self.media_root, thumbnail_name(digest, size, 'webp'))) as thumbnail:
+                self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (size, size)))
+        # Исходный файл с метаданными не сохраняется
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'avatars'))), 1 + len(AVATAR_SIZES) * 2)
+
+    def test_replacing_avatar_removes_previous_files(self):
+        self.upload(self.photo())
+        self.profile.refresh_from_db()
+        first = self.profile.avatar_hash
+        self.upload(self.photo(size=(400, 400)))
+        self.profile.refresh_from_db()
+        self.assertNotEqual(self.profile.avatar_hash, first)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, master_name(first))))
+
+    def test_oversized_upload_is_rejected(self):
+        with override_settings(AVATAR_MAX_UPLOAD_MB=0):
+            form = ProfileExtendedForm(data={}, files={'avatar': self.photo()}, instance=self.profile)
+            self.assertFalse(form.is_valid())
+        self.assertIn('avatar', form.errors)
+
+    @override_settings(AVATAR_WORKERS=1, AVATAR_MAX_PENDING=1)
+    def test_queue_holds_temp_files_and_overflow_runs_inline(self):
+        avatars._reset_after_fork()
+        self.addCleanup(avatars._reset_after_fork)
+        with mock.patch.object(avatars, 'ThreadPoolExecutor') as pool:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.upload(self.photo())
+            # Пул получает путь к копии файла, профиль пока прежний
+            (job, profile_id, path), _ = pool.return_value.submit.call_args
+            self.assertEqual((job, profile_id), (avatars._run_in_worker, self.profile.pk))
+            self.assertTrue(os.path.exists(path))
+            self.profile.refresh_from_db()
+            self.assertEqual(self.profile.avatar_hash, '')
+
+            # Очередь занята: следующий файл обрабатывается в запросе
+            with self.captureOnCommitCallbacks(execute=True):
+                self.upload(self.photo(size=(400, 400)))
+            self.assertEqual(pool.return_value.submit.call_count, 1)
+            self.profile.refresh_from_db()
+            inline = self.profile.avatar_hash
+            self.assertTrue(inline)
+
+            avatars._run_in_worker(profile_id, path)
+        self.assertFalse(os.path.exists(path))
+        self.profile.refresh_from_db()
+        self.assertNotEqual(self.profile.avatar_hash, inline)
+        # Место в очереди освободилось
+        self.assertTrue(avatars._pending.acquire(blocking=False))
+
+    def test_template_tag_renders_srcset(self):
+        self.upload(self.photo())
+        self.profile.refresh_from_db()
+        html = Template("{% load avatar_tags %}{% avatar profile 'avatar-image' %}").render(Context({'profile': self.profile}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn(f'{self.profile.avatar_hash}-200.webp 200w', html)
+        self.assertIn('class="avatar-image"', html)
+
+
+class NewsFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='secret')
+        base = timezone.now() - timedelta(days=1)
+        # Пары с одинаковым временем публикации проверяют порядок по id
+        NewsArticle.objects.bulk_create(
+            NewsArticle(title=f'Новость {index}', summary='Кратко', published_at=base + timedelta(hours=index // 2))
+            for index in range(7)
+        )
+        NewsArticle.objects.create(title='Черновик', summary='Не опубликовано')
+        NewsArticle.objects.create(title='Завтра', summary='Отложено', published_at=timezone.now() + timedelta(days=1))
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.client.force_login(self.user)
+
+    def test_cursor_walks_feed_without_gaps_or_repeats(self):
+        seen, cursor = [], ''
+        while True:
+            page = get_news_page(cursor, limit=3)
+            seen += [article['title'] for article in page['articles']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'Новость {index}' for index in (6, 5, 4, 3, 2, 1, 0)])
+
+    def test_feed_endpoint_caches_first_page_and_resets_on_publish(self):
+        first = self.client.get(reverse('news_feed')).json()
+        self.assertEqual(len(first['articles']), 7)
+        self.assertFalse(first['has_more'])
+        self.assertEqual(set(first['articles'][0]), {'id', 'title', 'summary', 'image', 'url', 'featured', 'date'})
+        with self.assertNumQueries(2):  # сессия и пользователь
+            self.client.get(reverse('news_feed'))
+
+        NewsArticle.objects.create(title='Свежая', summary='Только что', published_at=timezone.now())
+        self.assertEqual(self.client.get(reverse('news_feed')).json()['articles'][0]['title'], 'Свежая')
+
+    def test_pages_after_cursor_are_not_cached(self):
+        cursor = get_news_page(limit=3)['next_cursor']
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                get_news_page(cursor, limit=3)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('news_feed'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_news_page_renders_first_page(self):
+        response = self.client.get(reverse('news'))
+        self.assertContains(response, 'Новость 6')
+        self.assertNotContains(response, 'Черновик')
+
+    def fragment_count(self, kind):
+        return REGISTRY.get_sample_value(f'fintrack_fragment_cache_{kind}_total', {'fragment': 'news_grid'}) or 0
+
+    def test_news_grid_is_rendered_once_per_feed_version(self):
+        hits, misses = self.fragment_count('hits'), self.fragment_count('misses')
+        self.client.get(reverse('news'))
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'Новость 6')
+        self.assertEqual((self.fragment_count('hits') - hits, self.fragment_count('misses') - misses), (1, 1))
+
+        # Премиум-пользователь получает ту же сетку из кэша
+        premium = User.objects.create_user('premium-reader', 'premium-reader@example.com', 'secret')
+        upgrade_client_to_premium(premium.client)
+        self.client.force_login(premium)
+        self.assertContains(self.client.get(reverse('news')), 'Новость 6')
+        self.assertEqual((self.fragment_count('hits') - hits, self.fragment_count('misses') - misses), (2, 1))
+
+        NewsArticle.objects.create(title='Новая статья', summary='Свежее', published_at=timezone.now())
+        self.assertContains(self.client.get(reverse('news')), 'Новая статья')
+        self.assertEqual(self.fragment_count('misses') - misses, 2)
+
+
+class RateSnapshotTests(TestCase):
+    DATA = {
+        'base': 'USD',
+        'as_of': '2025-02-01T12:00:00+00:00',
+        'rates': {'USD': '1', 'EUR': '0.9', 'JPY': '150'},
+        'metals': {'XAU': '2000'},
+    }
+
+    class StubProvider(RateProvider):
+        def __init__(self, results):
+            self.results = list(results)
+            self.calls = 0
+
+        def fetch(self):
+            self.calls += 1
+            result = self.results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+    def test_conversion_rounds_to_target_minor_units(self):
+        snapshot = RateSnapshot.from_dict(self.DATA)
+        self.assertEqual(snapshot.convert(Decimal('10'), 'EUR', 'USD'), Decimal('11.11'))
+        self.assertEqual(snapshot.convert(Decimal('10'), 'USD', 'JPY'), Decimal('1500'))
+        self.assertEqual(snapshot.convert(Decimal('0.5'), 'XAU', 'EUR'), Decimal('900.00'))
+        self.assertEqual(snapshot.convert(Decimal('1000'), 'USD', 'XAU'), Decimal('0.5000'))
+
+    def test_malformed_data_is_rejected(self):
+        with self.assertRaises(InvalidSnapshot):
+            RateSnapshot.from_dict({**self.DATA, 'rates': {'USD': '1', 'EUR': '-1'}})
+        with self.assertRaises(InvalidSnapshot):
+            RateSnapshot.from_dict({'base': 'USD'})
+
+    def test_naive_as_of_is_taken_as_utc(self):
+        snapshot = RateSnapshot.from_dict({**self.DATA, 'as_of': '2025-02-01T12:00:00'})
+        self.assertEqual(snapshot.as_of, datetime(2025, 2, 1, 12, tzinfo=dt_timezone.utc))
+        store = RateStore(provider_factory=lambda: self.StubProvider([snapshot]), interval=0)
+        store.refresh()
+        self.assertGreater(store.age(), 0)
+
+    def test_store_serves_bootstrap_and_keeps_last_good_on_failure(self):
+        fresh = RateSnapshot.from_dict(self.DATA, source='stub')
+        provider = self.StubProvider([fresh, OSError('provider down')])
+        store = RateStore(provider_factory=lambda: provider, interval=0)
+
+        bootstrap = store.get()
+        self.assertEqual(provider.calls, 0)
+        self.assertTrue(bootstrap.source.startswith('file:'))
+        self.assertTrue(store.refresh())
+        self.assertIs(store.get(), fresh)
+        with self.assertLogs('FinTrack.rates.store', 'ERROR'):
+            self.assertFalse(store.refresh())
+        self.assertIs(store.get(), fresh)
+
+    def test_provider_without_fetch_fails_on_creation(self):
+        class Incomplete(RateProvider):
+            name = 'incomplete'
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_http_provider_parses_stubbed_response(self):
+        def opener(request, timeout):
+            self.assertEqual(request.full_url, 'https://rates.example.com/latest')
+            return io.BytesIO(json.dumps(self.DATA).encode())
+
+        snapshot = HttpRateProvider('https://rates.example.com/latest', opener=opener).fetch()
+        self.assertEqual(snapshot.rates['EUR'], Decimal('0.9'))
+        self.assertEqual(snapshot.source, 'http:https://rates.example.com/latest')
+
+    def test_file_provider_rereads_changed_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'rates.json')
+            with open(path, 'w') as target:
+                json.dump(self.DATA, target)
+            provider = FileRateProvider(path)
+            self.assertIs(provider.fetch(), provider.fetch())
+            with open(path, 'w') as target:
+                json.dump({**self.DATA, 'rates': {'USD': '1', 'EUR': '0.95'}}, target)
+            os.utime(path, ns=(0, 10 ** 18))
+            self.assertEqual(provider.fetch().rates['EUR'], Decimal('0.95'))
+
+    def test_converter_page_and_api_share_snapshot(self):
+        user = User.objects.create_user('rates-user', password='secret')
+        self.client.force_login(user)
+        snapshot = get_snapshot()
+        page = self.client.get(reverse('converter'))
+        self.assertContains(page, 'id="converter-rates"')
+        data = self.client.get(reverse('rates_api')).json()
+        self.assertEqual(data['rates']['EUR'], str(snapshot.rates['EUR']))
+        self.assertEqual(data['metals']['XAU'], str(snapshot.metals['XAU']))
+
+
+class BatchConvertTests(TestCase):
+    SNAPSHOT = RateSnapshot.from_dict({
+        'base': 'USD',
+        'as_of': '2025-02-01T12:00:00+00:00',
+        'rates': {'USD': '1', 'EUR': '0.93', 'RUB': '96.5', 'JPY': '148'},
+        'metals': {'XAU': '1930', 'XAG': '23.5'},
+    })
+
+    def test_matches_single_conversion(self):
+        items = [
+            (Decimal(amount), from_code, to_code)
+            for amount in ('0.01', '1', '-7.77', '12345.67')
+            for from_code in ('USD', 'EUR', 'RUB')
+            for to_code in ('USD', 'EUR', 'JPY', 'XAU')
+        ]
+        results, errors = convert_batch(self.SNAPSHOT, items)
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [self.SNAPSHOT.convert(*item) for item in items])
+
+    def test_metals_are_troy_ounces_and_rounding_is_half_up(self):
+        results, errors = convert_batch(self.SNAPSHOT, [
+            ('1.5', 'XAU', 'USD'),
+            ('1', 'XAG', 'XAU'),
+            ('0.005', 'USD', 'USD'),
+            ('0.50', 'USD', 'EUR'),
+            ('-0.50', 'USD', 'EUR'),
+        ])
+        self.assertEqual(results[:2], [Decimal('2895.00'), Decimal('0.0122')])
+        self.assertIsNone(results[2])
+        self.assertEqual(errors, [{'index': 2, 'error': 'USD allows 2 decimal places'}])
+        # 0.465 EUR: exactly half a cent, rounded away from zero.
+        self.assertEqual(results[3:], [Decimal('0.47'), Decimal('-0.47')])
+
+    def test_pair_factor_is_exact(self):
+        numerator, denominator = pair_factor(self.SNAPSHOT, 'USD', 'JPY')
+        self.assertEqual((numerator, denominator), (37, 25))
+
+    def test_api_reports_item_errors_by_index(self):
+        user = User.objects.create_user('convert-user', password='secret')
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse('convert_api'),
+            data='{"items": [["10", "USD", "USD"], [1.1, "USD", "XAU"], ["1", "ZZZ", "USD"], ["1"], '
+                 '[1e1000000, "USD", "EUR"], ["-1e1000000", "USD", "EUR"]]}',
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['results'][0], '10.00')
+        self.assertIsNotNone(data['results'][1])
+        self.assertEqual([error['index'] for error in data['errors']], [2, 3, 4, 5])
+        self.assertEqual(data['errors'][2]['error'], 'amount is too large')
+
+        self.assertEqual(self.client.post(reverse('convert_api'), data='[]', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.get(reverse('convert_api')).status_code, 405)
+
+
+class RateHistoryTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(RATES_HISTORY_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.history = RateHistory()
+        self.history.write('USD', {date(2025, 1, 1): Decimal('1')})
+        self.history.write('EUR', {date(2025, 1, 1): Decimal('0.9'), date(2025, 1, 10): Decimal('0.95')})
+        self.history.write('XAU', {date(2025, 1, 1): Decimal('2000')})
+
+    def test_rate_in_effect_is_found_by_date(self):
+        self.assertEqual(self.history.rate_at('EUR', date(2025, 1, 9)), Decimal('0.9'))
+        self.assertEqual(self.history.rate_at('EUR', date(2025, 1, 10)), Decimal('0.95'))
+        self.assertEqual(self.history.rate_at('EUR', date(2026, 1, 1)), Decimal('0.95'))
+        with self.assertRaises(LookupError):
+            self.history.rate_at('EUR', date(2024, 12, 31))
+
+    def test_write_merges_and_readers_see_new_file(self):
+        reader = RateHistory()
+        self.assertEqual(reader.rate_at('EUR', date(2025, 1, 5)), Decimal('0.9'))
+        self.assertTrue(self.history.write('EUR', {date(2025, 1, 5): Decimal('0.92')}))
+        self.assertFalse(self.history.write('EUR', {date(2025, 1, 5): Decimal('0.92')}))
+        self.assertEqual(reader.rate_at('EUR', date(2025, 1, 5)), Decimal('0.92'))
+        self.assertEqual(len(reader.get('EUR')), 3)
+
+    def test_convert_at_uses_each_items_date(self):
+        results, errors = self.history.convert_at([
+            ('9', 'EUR', 'USD', date(2025, 1, 2)),
+            ('9.50', 'EUR', 'USD', date(2025, 1, 12)),
+            ('0.5', 'XAU', 'EUR', date(2025, 1, 12)),
+            ('1', 'EUR', 'USD', date(2024, 6, 1)),
+            ('1', 'GBP', 'USD', date(2025, 1, 2)),
+            (Decimal('1e1000000'), 'EUR', 'USD', date(2025, 1, 2)),
+            ('0.5', 'xau', 'eur', date(2025, 1, 12)),
+        ])
+        self.assertEqual(results[:3], [Decimal('10.00'), Decimal('10.00'), Decimal('950.00')])
+        self.assertEqual([error['index'] for error in errors], [3, 4, 5])
+        self.assertEqual(errors[2]['error'], 'amount is too large')
+        # Код в нижнем регистре - тот же металл, а не валюта с двумя знаками
+        self.assertEqual(results[6], Decimal('950.00'))
+
+    def test_series_fills_gaps_for_charts(self):
+        series = self.history.series('EUR', days=3, end=date(2025, 1, 11))
+        self.assertEqual(series, [
+            (date(2025, 1, 9), Decimal('0.9')),
+            (date(2025, 1, 10), Decimal('0.95')),
+            (date(2025, 1, 11), Decimal('0.95')),
+        ])
+        self.assertEqual(self.history.series('GBP'), [])
+
+    def test_history_api_and_converter_sparklines(self):
+        today = timezone.localdate()
+        rate_history.write('EUR', {today - timedelta(days=1): Decimal('0.9'), today: Decimal('0.95')})
+        user = User.objects.create_user('history-user', password='secret')
+        self.client.force_login(user)
+        data = self.client.get(reverse('rates_history_api'), {'code': 'eur', 'days': 2}).json()
+        self.assertEqual(data['points'], [[(today - timedelta(days=1)).isoformat(), '0.9'], [today.isoformat(), '0.95']])
+        self.assertEqual(self.client.get(reverse('rates_history_api'), {'code': 'EUR', 'days': 1000}).status_code, 400)
+        self.assertContains(self.client.get(reverse('converter')), 'aria-label="EUR за 30 дней"')
+
+    def test_load_rate_history_command(self):
+        path = os.path.join(self.history.directory, 'rates.csv')
+        with open(path, 'w') as target:
+            target.write('date,code,rate\n2025-01-03,gbp,0.8\n2025-01-04,GBP,0.81\n')
+        call_command('load_rate_history', path, stdout=io.StringIO())
+        self.assertEqual(self.history.rate_at('GBP', date(2025, 1, 4)), Decimal('0.81'))
+
+
+@override_settings(
+    RATE_LIMIT_ENABLED=True,
+    RATE_LIMITS={
+        'login': [
+            {'key': 'ip', 'rate': '10/m', 'burst': 3},
+            {'key': 'post:username+ip', 'rate': '1/h', 'burst': 2},
+            {'key': 'post:username', 'rate': '1/h', 'burst': 4},
+        ],
+        'register': [{'key': 'ip', 'rate': '1/h', 'burst': 1}],
+    },
+)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['local'].clear()
+
+    def login(self, username, ip='10.0.0.1'):
+        return self.client.post(reverse('login'), {'username': username, 'password': 'wrong'}, REMOTE_ADDR=ip)
+
+    def test_username_bucket_rejects_before_authentication(self):
+        before = RATE_LIMITED.labels('login', 'post:username+ip')._value.get()
+        self.assertEqual(self.login('Victim', ip='10.0.0.1').status_code, 200)
+        self.assertEqual(self.login('victim', ip='10.0.0.1').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.login('victim', ip='10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 3000)
+        self.assertEqual(RATE_LIMITED.labels('login', 'post:username+ip')._value.get(), before + 1)
+        self.assertEqual(self.login('someone-else', ip='10.0.0.1').status_code, 200)
+        # Неудачные попытки с чужого адреса не блокируют владельца аккаунта
+        self.assertEqual(self.login('victim', ip='10.0.0.2').status_code, 200)
+
+    def test_loose_username_bucket_spans_addresses(self):
+        before = RATE_LIMITED.labels('login', 'post:username')._value.get()
+        statuses = [self.login('victim', ip=f'10.0.2.{index}').status_code for index in range(5)]
+        self.assertEqual(statuses, [200, 200, 200, 200, 429])
+        self.assertEqual(RATE_LIMITED.labels('login', 'post:username')._value.get(), before + 1)
+
+    def test_ip_bucket_and_get_requests(self):
+        statuses = [self.login(f'user{index}').status_code for index in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertEqual(self.client.get(reverse('login'), REMOTE_ADDR='10.0.0.1').status_code, 200)
+        self.assertEqual(self.login('user9', ip='10.0.0.9').status_code, 200)
+
+    def test_registration_is_limited_per_ip(self):
+        self.assertEqual(self.client.post(reverse('register'), {}, REMOTE_ADDR='10.0.1.1').status_code, 200)
+        self.assertEqual(self.client.post(reverse('register'), {}, REMOTE_ADDR='10.0.1.1').status_code, 429)
+
+    def test_local_buckets_when_shared_cache_fails(self):
+        before = RATE_LIMIT_FALLBACK._value.get()
+        with mock.patch.object(caches['default'], 'get_many', side_effect=ConnectionError), \
+                self.assertLogs('FinTrack.ratelimit', 'WARNING'):
+            statuses = [self.client.post(reverse('register'), {}, REMOTE_ADDR='10.0.1.2').status_code for _ in range(2)]
+        self.assertEqual(statuses, [200, 429])
+        self.assertEqual(RATE_LIMIT_FALLBACK._value.get(), before + 2)
+
+    @override_settings(RATE_LIMIT_PROXY_COUNT=1)
+    def test_client_ip_behind_proxy(self):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.1.1.1', HTTP_X_FORWARDED_FOR='6.6.6.6, 203.0.113.5')
+        self.assertEqual(client_ip(request), '203.0.113.5')
+        self.assertEqual(client_ip(RequestFactory().post('/', REMOTE_ADDR='10.1.1.1')), '10.1.1.1')
+
+
+class OverloadTests(TestCase):
+    def setUp(self):
+        limiter.reset()
+        self.addCleanup(limiter.reset)
+        self.user = User.objects.create_user('overload-user', password='secret')
+        self.client.force_login(self.user)
+
+    def test_limit_shrinks_when_latency_rises_and_recovers(self):
+        limit = AdaptiveLimit(initial=20, min_limit=1, max_limit=100)
+        limit.in_flight = 20
+        for _ in range(50):
+            limit._sample(0.05, in_flight=20)
+        steady = limit.limit
+        self.assertGreaterEqual(steady, 20)
+        for _ in range(30):
+            limit._sample(1.0, in_flight=20)
+        self.assertLess(limit.limit, steady / 2)
+        for _ in range(200):
+            limit._sample(0.05, in_flight=int(limit.limit))
+        self.assertGreater(limit.limit, steady / 2)
+
+    def test_low_priority_routes_are_shed_over_limit(self):
+        news = limiter.group('news')
+        news.limit = 2
+        news.in_flight = 2
+        before = REQUESTS_SHED.labels('news')._value.get()
+
+        response = self.client.get(reverse('news_feed'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertEqual(REQUESTS_SHED.labels('news')._value.get(), before + 1)
+
+        self.assertEqual(self.client.get(reverse('converter')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('health_check')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+        news.in_flight = 0
+        self.assertEqual(self.client.get(reverse('news_feed')).status_code, 200)
+        # Значения процесса - отдельная серия на каждый воркер
+        labels = {'group': 'news', 'pid': str(os.getpid())}
+        self.assertEqual(REGISTRY.get_sample_value('fintrack_in_flight_requests', labels), 0)
+        self.assertEqual(REGISTRY.get_sample_value('fintrack_concurrency_limit', labels), news.limit)
+
+    def test_normal_and_critical_groups(self):
+        default = limiter.group('default')
+        default.limit = 1
+        default.in_flight = 5
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+        self.assertEqual(default.in_flight, 5)
+        self.assertEqual(limiter.classify('health_check'), ('health', 'critical'))
+        self.assertEqual(limiter.classify('fintrack_admin:index'), ('admin_stats', 'low'))
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('async-user', password='secret', email='async@example.com')
+        self.factory = AsyncRequestFactory()
+
+    def test_wsgi_serves_sync_views(self):
+        for name in ('dashboard', 'converter', 'subscription_plans', 'health_check', 'metrics'):
+            self.assertFalse(asyncio.iscoroutinefunction(resolve(reverse(name)).func), name)
+
+    async def test_async_variants_render(self):
+        for view in (adashboard_view, aconverter_view, asubscription_plans_view, ahealth_check, ametrics_view):
+            request = self.factory.get('/')
+            request.user = self.user
+            response = await view(request)
+            self.assertEqual(response.status_code, 200, view.__name__)
+
+    async def test_anonymous_user_is_redirected(self):
+        request = self.factory.get(reverse('converter'))
+        request.user = AnonymousUser()
+        response = await aconverter_view(request)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response['Location'])
+
+
+class WorkerSizingTests(TestCase):
+    def cgroup_file(self, directory, name, content):
+        path = os.path.join(directory, name)
+        with open(path, 'w') as target:
+            target.write(content)
+        return path
+
+    def test_cpu_quota_caps_affinity(self):
+        affinity = len(os.sched_getaffinity(0))
+        with tempfile.TemporaryDirectory() as tmp:
+            missing = os.path.join(tmp, 'missing')
+            limited = self.cgroup_file(tmp, 'cpu.max', '150000 100000\n')
+            unlimited = self.cgroup_file(tmp, 'cpu.unlimited', 'max 100000\n')
+            quota = self.cgroup_file(tmp, 'cfs_quota_us', '50000\n')
+            period = self.cgroup_file(tmp, 'cfs_period_us', '100000\n')
+
+            self.assertEqual(available_cpus(limited, missing, missing), min(affinity, 2))
+            self.assertEqual(available_cpus(unlimited, missing, missing), affinity)
+            self.assertEqual(available_cpus(missing, quota, period), 1)
+            self.assertEqual(available_cpus(missing, missing, missing), affinity)
+
+    def test_default_workers_by_class(self):
+        self.assertEqual(default_workers('sync', 2), 5)
+        self.assertEqual(default_workers('gthread', 2), 3)
+        self.assertEqual(default_workers('uvicorn', 1), 2)
+
+    def test_watchdog_recycles_over_limit(self):
+        self.assertGreater(current_rss(), 0)
+        self.assertGreater(REGISTRY.get_sample_value('fintrack_worker_rss_bytes', {'pid': str(os.getpid())}), 0)
+        recycled = []
+        before = WORKER_RECYCLES.labels('rss')._value.get()
+
+        watchdog = RssWatchdog(100 * 2 ** 20, 1, on_exceed=recycled.append, rss=lambda: 50 * 2 ** 20)
+        self.assertFalse(watchdog.check())
+        watchdog.rss = lambda: 200 * 2 ** 20
+        self.assertTrue(watchdog.check())
+        self.assertEqual(recycled, [200 * 2 ** 20])
+        self.assertEqual(WORKER_RECYCLES.labels('rss')._value.get(), before + 1)
+
+        self.assertFalse(RssWatchdog(0, 1, on_exceed=recycled.append).check())
+
+
+class StartupTests(TestCase):
+    def test_parse_importtime(self):
+        records = parse_importtime(
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       100 |        100 |     django.utils\n'
+            'import time:       400 |        500 |   django\n'
+            'import time:      2000 |       2000 | PIL.Image\n'
+            'unrelated line\n'
+        )
+        self.assertEqual([record.module for record in records], ['django.utils', 'django', 'PIL.Image'])
+        self.assertEqual(records[1].depth, 1)
+        self.assertEqual(total_ms(records), 2.0)
+        self.assertEqual(by_package(records), {'PIL': 2.0, 'django': 0.5})
+
+    def test_worker_boot_stays_within_import_budget(self):
+        records = profile_imports()
+        modules = {record.module for record in records}
+        # Imported by the URLconf (itself loaded with import_module, which
+        # -X importtime does not report).
+        self.assertIn('accounts.admin_site', modules)
+        for package in LAZY_MODULES:
+            self.assertFalse([module for module in modules if module.split('.')[0] == package], package)
+        self.assertLess(total_ms(records), IMPORT_BUDGET_MS)
+
+    def test_warm_up_compiles_project_templates(self):
+        with self.assertLogs('FinTrack.startup', 'INFO'):
+            result = warm_up()
+        self.assertGreater(result['urls'], 50)
+        self.assertGreaterEqual(result['templates'], 20)
+
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertIn('accounts/login.html', loader.get_template_cache)
+        self.assertIn('admin/index.html', loader.get_template_cache)
+        with self.assertNumQueries(0), self.assertLogs('FinTrack.startup', 'INFO'):
+            self.assertEqual(warm_up(), result)
+
+
+def tearDownModule():
+    # Буферы, наполненные тестами, не должны записываться при выходе из процесса
+    tracker.reset()
+    events.reset()
@@ -1,12 +1,17 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from .views import (
-    register_view, dashboard_view, login_view, profile_view, 
-    converter_view, about_view, client_list_view, client_detail_view,
+    register_view, dashboard_view, news_feed_view, login_view, profile_view, 
+    converter_view, rates_api_view, rates_history_api_view, convert_api_view, about_view, client_list_view, client_detail_view,
     client_edit_view, access_level_list_view, access_level_edit_view,
-    subscription_plans_view
+    subscription_plans_view, adashboard_view, aconverter_view, asubscription_plans_view
 )
 
+# Под ASGI страницы только для чтения обслуживают async-варианты
+if settings.ASYNC_VIEWS:
+    dashboard_view, converter_view, subscription_plans_view = adashboard_view, aconverter_view, asubscription_plans_view
+
 
 urlpatterns = [
     # Основные страницы
@@ -15,8 +20,12 @@ urlpatterns = [
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('dashboard/', dashboard_view, name='dashboard'),
     path('news/', dashboard_view, name='news'),
+    path('news/feed/', news_feed_view, name='news_feed'),
     path('profile/', profile_view, name='profile'),
     path('converter/', converter_view, name='converter'),
+    path('api/rates/', rates_api_view, name='rates_api'),
+    path('api/rates/history/', rates_history_api_view, name='rates_history_api'),
+    path('api/convert/', convert_api_view, name='convert_api'),
     path('about/', about_view, name='about'),
     path('subscription/', subscription_plans_view, name='subscription_plans'),
     
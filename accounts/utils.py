@@ -2,10 +2,34 @@
 Утилиты для работы с клиентами и уровнями доступа
 """
 import time
-from datetime import date
+from datetime import date, timedelta
 
 from django.contrib.auth.models import User
-from .models import Client, AccessLevel, Profile
+from django.db.models import Count, Q
+from django.utils import timezone
+from prometheus_client import Counter
+
+from FinTrack.cache import bump_version, cached
+from .activity import events
+from .models import ActivityEvent, Client, ClientDailyStats, AccessLevel, Profile
+
+# Пространства имен кэша; версии сбрасываются сигналами в accounts.signals,
+# ленту событий сбрасывает запись пачки событий (accounts.activity)
+CLIENT_STATS_NAMESPACE = 'client_stats'
+ACCESS_LEVELS_NAMESPACE = 'access_levels'
+ACTIVITY_FEED_NAMESPACE = 'activity_feed'
+# Снимки по дням сбрасывает команда snapshot_client_stats
+DAILY_STATS_NAMESPACE = 'daily_stats'
+# Значения фильтров админки живут по TTL: новый город появится в фильтре с задержкой
+CLIENT_FILTERS_NAMESPACE = 'client_filters'
+# Страницы ленты новостей (accounts.news); сбрасываются при изменении новостей
+NEWS_NAMESPACE = 'news'
+
+CLIENTS_BULK_UPDATED = Counter(
+    'fintrack_clients_bulk_updated_total',
+    'Clients changed by set-based bulk actions',
+    ['action'],
+)
 
 
 def create_client_from_user(user, access_level_name='Базовый', **client_data):
@@ -76,6 +100,7 @@ def upgrade_client_to_premium(client):
         premium_level = AccessLevel.objects.get(name='Премиум')
         client.access_level = premium_level
         client.save()
+        record_access_level_change(client)
         return True
     except AccessLevel.DoesNotExist:
         return False
@@ -95,11 +120,60 @@ def downgrade_client_to_basic(client):
         basic_level = AccessLevel.objects.get(name='Обычный')
         client.access_level = basic_level
         client.save()
+        record_access_level_change(client)
         return True
     except AccessLevel.DoesNotExist:
         return False
 
 
+def bulk_set_access_level(queryset, access_level):
+    """
+    Переводит всех клиентов из queryset на уровень access_level одним UPDATE
+
+    Сигналы post_save не вызываются, поэтому кэш статистики сбрасывается здесь,
+    а в ленту попадает одно событие на всю операцию.
+
+    Args:
+        queryset: QuerySet клиентов (можно с фильтрами)
+        access_level: Объект AccessLevel
+
+    Returns:
+        int: Число клиентов, у которых уровень изменился
+    """
+    updated = queryset.exclude(access_level=access_level).update(
+        access_level=access_level,
+        updated_at=timezone.now(),
+    )
+    if updated:
+        bump_version(CLIENT_STATS_NAMESPACE)
+        CLIENTS_BULK_UPDATED.labels('premium' if access_level.is_premium else 'access_level').inc(updated)
+        if access_level.is_premium:
+            events.emit(ActivityEvent.PREMIUM, f'Премиум подписка активирована для {updated} клиентов')
+        else:
+            events.emit(ActivityEvent.ACCESS_LEVEL, f'{updated} клиентов переведены на уровень «{access_level.name}»')
+    return updated
+
+
+def bulk_set_active(queryset, is_active):
+    """
+    Активирует или деактивирует всех клиентов из queryset одним UPDATE
+
+    Args:
+        queryset: QuerySet клиентов (можно с фильтрами)
+        is_active: Новое значение is_active
+
+    Returns:
+        int: Число клиентов, у которых статус изменился
+    """
+    updated = queryset.exclude(is_active=is_active).update(is_active=is_active, updated_at=timezone.now())
+    if updated:
+        bump_version(CLIENT_STATS_NAMESPACE)
+        CLIENTS_BULK_UPDATED.labels('activate' if is_active else 'deactivate').inc(updated)
+        action = 'активированы' if is_active else 'деактивированы'
+        events.emit(ActivityEvent.PROFILE_UPDATE, f'{updated} клиентов {action}')
+    return updated
+
+
 def get_client_by_user(user):
     """
     Получает клиента по пользователю
@@ -116,6 +190,22 @@ def get_client_by_user(user):
         return None
 
 
+async def aget_client_by_user(user):
+    """
+    Асинхронный вариант get_client_by_user для async-представлений
+
+    Уровень доступа загружается тем же запросом, чтобы шаблоны и
+    client.is_premium не обращались к БД вне потока.
+
+    Args:
+        user: Объект User Django
+
+    Returns:
+        Client или None
+    """
+    return await Client.objects.select_related('access_level').filter(user_id=user.pk).afirst()
+
+
 def is_premium_client(user):
     """
     Проверяет, является ли пользователь премиум-клиентом
@@ -155,22 +245,147 @@ def can_perform_action(user, action_type):
     return False
 
 
+def aggregate_client_counts(day_start=None):
+    """
+    Считает клиентов одним проходом по таблице (COUNT ... FILTER)
+
+    Args:
+        day_start: Начало суток (aware datetime); если задано, дополнительно
+            считает клиентов, зарегистрированных в эти сутки
+
+    Returns:
+        dict: total_clients, active_clients, premium_clients, active_premium_clients[, new_clients]
+    """
+    premium = Q(access_level__is_premium=True)
+    counts = {
+        'total_clients': Count('id'),
+        'active_clients': Count('id', filter=Q(is_active=True)),
+        'premium_clients': Count('id', filter=premium),
+        'active_premium_clients': Count('id', filter=premium & Q(is_active=True)),
+    }
+    if day_start is not None:
+        counts['new_clients'] = Count('id', filter=Q(
+            registration_date__gte=day_start,
+            registration_date__lt=day_start + timedelta(days=1),
+        ))
+    return Client.objects.aggregate(**counts)
+
+
+@cached(CLIENT_STATS_NAMESPACE, timeout=60)
 def get_client_statistics():
     """
     Возвращает статистику по клиентам
+    Результат кэшируется и сбрасывается при изменении клиентов или уровней доступа
     
     Returns:
         dict: Словарь со статистикой
     """
-    total_clients = Client.objects.count()
-    active_clients = Client.objects.filter(is_active=True).count()
-    premium_clients = Client.objects.filter(access_level__is_premium=True).count()
-    basic_clients = Client.objects.filter(access_level__is_premium=False).count()
-    
-    return {
-        'total_clients': total_clients,
-        'active_clients': active_clients,
-        'premium_clients': premium_clients,
-        'basic_clients': basic_clients,
-        'inactive_clients': total_clients - active_clients,
-    }
+    stats = aggregate_client_counts()
+    stats['basic_clients'] = stats['total_clients'] - stats['premium_clients']
+    stats['inactive_clients'] = stats['total_clients'] - stats['active_clients']
+    stats['total_users'] = User.objects.count()
+    return stats
+
+
+@cached(CLIENT_FILTERS_NAMESPACE, timeout=600)
+def get_client_field_choices(field_name):
+    """
+    Различные значения поля клиента для фильтров админки
+
+    Args:
+        field_name: Имя поля Client (city, country)
+
+    Returns:
+        list: Отсортированные значения
+    """
+    return list(Client.objects.order_by(field_name).values_list(field_name, flat=True).distinct())
+
+
+@cached(ACCESS_LEVELS_NAMESPACE, alias='local')
+def get_access_levels():
+    """
+    Возвращает список всех уровней доступа
+    Кэшируется в памяти процесса; изменения уровней сбрасывают кэш во всех воркерах
+    
+    Returns:
+        list: Список объектов AccessLevel
+    """
+    return list(AccessLevel.objects.all())
+
+
+def record_access_level_change(client):
+    """
+    Добавляет в ленту событие о смене уровня доступа клиента
+
+    Args:
+        client: Объект Client с уже сохраненным новым уровнем
+    """
+    if client.access_level.is_premium:
+        events.emit(ActivityEvent.PREMIUM, f'Премиум подписка активирована: {client.full_name}', client.user_id)
+    else:
+        events.emit(
+            ActivityEvent.ACCESS_LEVEL,
+            f'{client.full_name}: уровень доступа «{client.access_level.name}»',
+            client.user_id,
+        )
+
+
+@cached(ACTIVITY_FEED_NAMESPACE, timeout=30)
+def get_recent_events(limit=8):
+    """
+    Последние события для ленты админки
+
+    Запрос ограничен limit строками и идет по индексу (created_at DESC);
+    результат кэшируется до записи следующей пачки событий.
+
+    Args:
+        limit: Сколько событий вернуть
+
+    Returns:
+        list: Словари с ключами icon, description, time
+    """
+    return [
+        {'icon': event.icon, 'description': event.description, 'time': event.created_at}
+        for event in ActivityEvent.objects.order_by('-created_at')[:limit]
+    ]
+
+
+@cached(DAILY_STATS_NAMESPACE, timeout=3600)
+def get_daily_stats(days=30):
+    """
+    Снимки статистики за последние days дней, от старых к новым
+
+    Returns:
+        list: Словари с полями ClientDailyStats
+    """
+    # Тот же календарный день, что и у snapshot_client_stats
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        ClientDailyStats.objects.filter(date__gte=since).order_by('date').values(
+            'date', 'total_users', 'total_clients', 'active_clients', 'premium_clients', 'new_clients'
+        )
+    )
+
+
+def sparkline_points(values, width=120, height=28):
+    """
+    Координаты для <polyline> мини-графика
+
+    Args:
+        values: Последовательность чисел
+        width: Ширина области рисования
+        height: Высота области рисования
+
+    Returns:
+        str: Точки "x,y x,y ..." или пустая строка, если точек меньше двух
+    """
+    values = list(values)
+    if len(values) < 2:
+        return ''
+    low, high = min(values), max(values)
+    spread = (high - low) or 1
+    step = width / (len(values) - 1)
+    return ' '.join(
+        f'{index * step:.1f},{height - (value - low) / spread * height:.1f}'
+        for index, value in enumerate(values)
+    )
@@ -1,19 +1,49 @@
+import functools
+import json
 from datetime import date
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
 from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
 from django.db.models import Q
 
+from FinTrack.rates import get_snapshot
+from FinTrack.rates.batch import MAX_ITEMS, convert_batch
+from FinTrack.rates.history import MAX_SERIES_DAYS, history
 from .forms import (
     RegisterForm, LoginForm, ProfileForm, ProfileExtendedForm, 
     ClientForm, AccessLevelForm, ClientSearchForm
 )
-from .models import Profile, Client, AccessLevel
-from .utils import create_client_from_user, get_client_by_user, is_premium_client
+from .activity import events
+from .models import ActivityEvent, Profile, Client, AccessLevel
+from .news import InvalidCursor, get_news_grid, get_news_page
+from .utils import (
+    aget_client_by_user, create_client_from_user, get_access_levels, get_client_by_user, is_premium_client,
+    sparkline_points,
+)
+
+
+def async_login_required(view_func):
+    """
+    login_required для async-представлений (в Django 4.2 он их не поддерживает)
+
+    Пользователь загружается из сессии в потоке, после этого request.user
+    можно читать в event loop без обращений к БД.
+    """
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
 
 
 def register_view(request):
@@ -72,56 +102,43 @@ def login_view(request):
 def dashboard_view(request):
     # Landing page is news
     client = get_client_by_user(request.user)
-    
-    # Затычки для новостей (в режиме разработки)
-    news_articles = [
-        {
-            'id': 1,
-            'title': 'Ты неправильно копишь деньги.',
-            'content': 'Просто много бессмысленного текста для визуала. Я не знаю где мы найдем столько статей.',
-            'image': None,
-            'featured': False,
-            'url': '#',
-            'date': '2025-01-28'
-        },
-        {
-            'id': 2,
-            'title': 'Научить зарабатывать?',
-            'content': 'Мы прям как инфо-цигане. Я вообще не представляю какие статьи тут могут быть. И новости тоже. Интересно, конечно.',
-            'image': None,
-            'featured': False,
-            'url': '#',
-            'date': '2025-01-28'
-        },
-        {
-            'id': 3,
-            'title': 'Ты не умеешь экономить!',
-            'content': 'Очень интересная статья с безумно длинным и бессмысленным вступлением, которое нужно чисто для примера.',
-            'image': 'https://images.unsplash.com/photo-1554224155-6726b3ff858f?w=400&h=300&fit=crop',
-            'featured': True,
-            'url': '#',
-            'date': '2025-01-28'
-        },
-        {
-            'id': 4,
-            'title': 'Ты неправильно копишь деньги.',
-            'content': 'Просто много бессмысленного текста для визуала. Я не знаю где мы найдем столько статей.',
-            'image': None,
-            'featured': False,
-            'url': '#',
-            'date': '2025-01-28'
-        }
-    ]
-    
+    is_premium = is_premium_client(request.user)
+
+    context = {
+        'client': client,
+        'is_premium': is_premium,
+        # Сетка новостей одинакова для всех пользователей
+        'news_grid': get_news_grid(),
+    }
+    return render(request, 'pages/news.html', context)
+
+
+@async_login_required
+async def adashboard_view(request):
+    """dashboard_view для ASGI (settings.ASYNC_VIEWS): клиент загружается async ORM"""
+    client = await aget_client_by_user(request.user)
     context = {
         'client': client,
-        'is_premium': is_premium_client(request.user),
-        'news_articles': news_articles,
-        'is_development': True  # Флаг для режима разработки
+        'is_premium': bool(client and client.is_premium),
+        'news_grid': await sync_to_async(get_news_grid)(),
     }
     return render(request, 'pages/news.html', context)
 
 
+@login_required
+def news_feed_view(request):
+    """Страница ленты новостей в JSON для бесконечной прокрутки"""
+    try:
+        page = get_news_page(request.GET.get('cursor', ''))
+    except InvalidCursor:
+        return JsonResponse({'error': 'invalid cursor'}, status=400)
+    return JsonResponse({
+        'articles': page['articles'],
+        'next_cursor': page['next_cursor'],
+        'has_more': page['next_cursor'] is not None,
+    })
+
+
 @login_required
 def profile_view(request):
     profile, created = Profile.objects.get_or_create(user=request.user)
@@ -148,6 +165,7 @@ def profile_view(request):
                     client_data = client_form.cleaned_data
                     create_client_from_user(request.user, **client_data)
                 
+                events.emit(ActivityEvent.PROFILE_UPDATE, f'{request.user.username} обновил профиль', request.user.pk)
                 messages.success(request, 'Профиль успешно обновлен!')
                 return redirect('profile')
     else:
@@ -178,7 +196,7 @@ def client_list_view(request):
         return redirect('dashboard')
     
     search_form = ClientSearchForm(request.GET)
-    clients = Client.objects.all()
+    clients = Client.objects.select_related('access_level')
     
     if search_form.is_valid():
         search_query = search_form.cleaned_data.get('search_query')
@@ -210,7 +228,7 @@ def client_list_view(request):
     context = {
         'clients': page_obj,
         'search_form': search_form,
-        'access_levels': AccessLevel.objects.all(),
+        'access_levels': get_access_levels(),
     }
     return render(request, 'accounts/client_list.html', context)
 
@@ -222,7 +240,7 @@ def client_detail_view(request, client_id):
         messages.error(request, 'У вас нет прав для просмотра этого раздела')
         return redirect('dashboard')
     
-    client = get_object_or_404(Client, id=client_id)
+    client = get_object_or_404(Client.objects.select_related('user', 'access_level'), id=client_id)
     
     context = {
         'client': client,
@@ -243,6 +261,8 @@ def client_edit_view(request, client_id):
         form = ClientForm(request.POST, instance=client)
         if form.is_valid():
             form.save()
+            if form.has_changed():
+                events.emit(ActivityEvent.PROFILE_UPDATE, f'Администратор обновил данные клиента {client.full_name}', client.user_id)
             messages.success(request, 'Данные клиента успешно обновлены!')
             return redirect('client_detail', client_id=client.id)
     else:
@@ -262,10 +282,8 @@ def access_level_list_view(request):
         messages.error(request, 'У вас нет прав для просмотра этого раздела')
         return redirect('dashboard')
     
-    access_levels = AccessLevel.objects.all()
-    
     context = {
-        'access_levels': access_levels,
+        'access_levels': get_access_levels(),
     }
     return render(request, 'accounts/access_level_list.html', context)
 
@@ -295,41 +313,103 @@ def access_level_edit_view(request, level_id):
     return render(request, 'accounts/access_level_edit.html', context)
 
 
+def _converter_context(is_premium):
+    snapshot = get_snapshot()
+    return {
+        'rates': snapshot.rates,
+        # Мини-графики за 30 дней из файлов истории курсов
+        'rate_rows': [
+            (code, rate, sparkline_points(value for _, value in history.series(code)))
+            for code, rate in snapshot.rates.items()
+        ],
+        'metals': snapshot.metals,
+        'base_currency': snapshot.base,
+        'rates_as_of': snapshot.as_of,
+        # Для пересчета в браузере: числа, а не строки Decimal
+        'converter_rates': {code: float(rate) for code, rate in snapshot.rates.items()},
+        'is_premium': is_premium,
+    }
+
+
 @login_required
 def converter_view(request):
-    currency_rates = {
-        'USD': 1.00,
-        'EUR': 0.93,
-        'RUB': 96.50,
-        'GBP': 0.80,
-        'CNY': 7.10,
-        'JPY': 148.0,
-        'KZT': 488.0,
-    }
-    metal_prices_usd = {
-        'XAU': 1930.00,  # Gold per troy ounce in USD (static)
-        'XAG': 23.50,    # Silver per troy ounce in USD (static)
-        'XPT': 910.00,   # Platinum
-        'XPD': 1250.00,  # Palladium
-    }
-    context = {
-        'rates': currency_rates,
-        'metals': metal_prices_usd,
-        'base_currency': 'USD',
-        'is_premium': is_premium_client(request.user)
-    }
+    return render(request, 'pages/converter.html', _converter_context(is_premium_client(request.user)))
+
+
+@async_login_required
+async def aconverter_view(request):
+    """
+    converter_view для ASGI (settings.ASYNC_VIEWS)
+
+    Снимок курсов (при первом обращении - загрузка) и файлы истории читаются
+    в потоке, а не в event loop.
+    """
+    client = await aget_client_by_user(request.user)
+    context = await sync_to_async(_converter_context)(bool(client and client.is_premium))
     return render(request, 'pages/converter.html', context)
 
 
+@login_required
+def rates_api_view(request):
+    """Текущий снимок курсов в JSON (значения - строки Decimal)"""
+    snapshot = get_snapshot()
+    return JsonResponse(snapshot.to_dict())
+
+
+@login_required
+def rates_history_api_view(request):
+    """
+    Дневной ряд курса валюты для графиков: ?code=EUR&days=90 (не больше MAX_SERIES_DAYS дней)
+    """
+    code = request.GET.get('code', '').upper()
+    try:
+        days = int(request.GET.get('days', 30))
+    except ValueError:
+        days = 0
+    if not code.isalpha() or not 1 <= days <= MAX_SERIES_DAYS:
+        return JsonResponse({'error': f'expected ?code=XXX&days=1..{MAX_SERIES_DAYS}'}, status=400)
+    return JsonResponse({
+        'code': code,
+        'points': [[day.isoformat(), str(value)] for day, value in history.series(code, days)],
+    })
+
+
+@login_required
+@require_POST
+def convert_api_view(request):
+    """
+    Пакетная конвертация сумм по текущему снимку курсов
+
+    Тело запроса: {"items": [["10.50", "EUR", "USD"], ...]}, не больше
+    MAX_ITEMS элементов. Суммы - строки или числа, металлы - в тройских унциях.
+    Ответ: results[i] - строка с результатом или null, если элемент
+    с индексом i попал в errors.
+    """
+    try:
+        items = json.loads(request.body, parse_float=Decimal)['items']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'expected {"items": [[amount, from, to], ...]}'}, status=400)
+    if not isinstance(items, list):
+        return JsonResponse({'error': 'items must be a list'}, status=400)
+    if len(items) > MAX_ITEMS:
+        return JsonResponse({'error': f'at most {MAX_ITEMS} items per request'}, status=400)
+
+    snapshot = get_snapshot()
+    results, errors = convert_batch(snapshot, items)
+    return JsonResponse({
+        'base': snapshot.base,
+        'as_of': snapshot.as_of.isoformat(),
+        'results': [None if value is None else str(value) for value in results],
+        'errors': errors,
+    })
+
+
 @login_required
 def about_view(request):
     return render(request, 'pages/about.html')
 
 
-@login_required
-def subscription_plans_view(request):
-    """Страница выбора планов подписки"""
-    client = get_client_by_user(request.user)
+def _subscription_context(client):
     current_plan = client.access_level if client else None
     
     # Определяем планы подписки
@@ -373,8 +453,22 @@ def subscription_plans_view(request):
     context = {
         'plans': plans,
         'current_plan': current_plan,
-        'is_premium': is_premium_client(request.user)
+        'is_premium': bool(client and client.is_premium),
     }
-    return render(request, 'accounts/subscription_plans.html', context)
+    return context
+
+
+@login_required
+def subscription_plans_view(request):
+    """Страница выбора планов подписки"""
+    client = get_client_by_user(request.user)
+    return render(request, 'accounts/subscription_plans.html', _subscription_context(client))
+
+
+@async_login_required
+async def asubscription_plans_view(request):
+    """subscription_plans_view для ASGI (settings.ASYNC_VIEWS)"""
+    client = await aget_client_by_user(request.user)
+    return render(request, 'accounts/subscription_plans.html', _subscription_context(client))
 
 # Create your views here.
@@ -0,0 +1,80 @@
+"""
+Gunicorn configuration; loaded automatically from the working directory.
+
+Everything can be overridden with environment variables:
+
+* ``GUNICORN_WORKER_CLASS`` - ``gthread`` (default), ``sync`` or ``uvicorn``
+  (ASGI, serves ``FinTrack.asgi``);
+* ``GUNICORN_WORKERS`` / ``GUNICORN_THREADS`` - processes and threads per
+  process; workers default to a count derived from the CPUs available to the
+  container;
+* ``GUNICORN_MAX_REQUESTS`` / ``GUNICORN_MAX_REQUESTS_JITTER`` - recycle each
+  worker after this many requests (plus up to jitter, so they do not restart
+  together);
+* ``WORKER_MAX_RSS_MB`` / ``WORKER_RSS_CHECK_SECONDS`` - recycle a worker
+  whose resident memory exceeds the limit (0 disables).
+
+URLs, templates and translations are warmed up (``FinTrack.startup``) before
+any worker accepts connections.
+"""
+import os
+
+from FinTrack.workers import RssWatchdog, available_cpus, default_workers
+
+_worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+if _worker_class == 'uvicorn':
+    wsgi_app = 'FinTrack.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'FinTrack.wsgi:application'
+    worker_class = _worker_class
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv('GUNICORN_WORKERS', '0')) or default_workers(_worker_class, available_cpus())
+threads = int(os.getenv('GUNICORN_THREADS', '4')) if _worker_class == 'gthread' else 1
+
+# Import Django and the app once in the master; workers share those pages
+# copy-on-write. Background threads and connections are created lazily in
+# each worker (and reset by os.register_at_fork hooks), never in the master.
+preload_app = True
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+_max_rss = int(os.getenv('WORKER_MAX_RSS_MB', '512')) * 2 ** 20
+_rss_interval = float(os.getenv('WORKER_RSS_CHECK_SECONDS', '10'))
+
+
+def when_ready(server):
+    # The preloaded app lives in the master: warm it once here and every
+    # worker forked from it, including recycled ones, starts warm.
+    if server.cfg.preload_app:
+        from FinTrack.startup import warm_up
+
+        warm_up()
+
+
+def pre_fork(server, worker):
+    from django.db import connections
+
+    # Nothing should connect in the master, but a connection inherited across
+    # fork would be shared by every worker.
+    connections.close_all()
+
+
+def post_fork(server, worker):
+    RssWatchdog(_max_rss, _rss_interval).start()
+
+
+def post_worker_init(worker):
+    from FinTrack.startup import warm_up
+
+    # Near-free after the master's warm-up; does the work when not preloading.
+    warm_up()
@@ -1,201 +1,134 @@
 (function() {
   'use strict';
 
-  // Система управления новостями
+  // Лента новостей: первая страница приходит в HTML, следующие -
+  // из JSON-ленты по курсору (next_cursor предыдущей страницы)
   var NewsManager = {
-    config: window.NEWS_CONFIG || {},
+    config: {},
     isLoading: false,
-    currentPage: 1,
-    hasMoreNews: true,
-    
+    nextCursor: '',
+
     init: function() {
+      this.config = window.NEWS_CONFIG || {};
+      this.nextCursor = this.config.nextCursor || '';
       this.setupInfiniteScroll();
-      this.setupNewsCards();
+      this.setupNewsCards(document.querySelectorAll('.news-card'));
     },
-    
+
     setupInfiniteScroll: function() {
       var self = this;
-      
+
       // Обработчик прокрутки
       window.addEventListener('scroll', function() {
-        if (self.isLoading || !self.hasMoreNews) return;
-        
+        if (self.isLoading || !self.nextCursor) return;
+
         var scrollTop = window.pageYOffset || document.documentElement.scrollTop;
         var windowHeight = window.innerHeight;
         var documentHeight = document.documentElement.scrollHeight;
-        
+
         // Загружаем новые новости когда пользователь прокрутил на 80% страницы
         if (scrollTop + windowHeight >= documentHeight * 0.8) {
           self.loadMoreNews();
         }
-      });
+      }, { passive: true });
     },
-    
-    setupNewsCards: function() {
-      var newsCards = document.querySelectorAll('.news-card');
-      
-      newsCards.forEach(function(card) {
+
+    setupNewsCards: function(newsCards) {
+      Array.prototype.forEach.call(newsCards, function(card) {
         card.addEventListener('click', function() {
-          var articleId = this.dataset.articleId;
-          var title = this.querySelector('h3').textContent;
-          
-          // В режиме разработки просто показываем алерт
-          if (NewsManager.config.isDevelopment) {
-            alert('Переход к статье: ' + title + ' (ID: ' + articleId + ')');
-          } else {
-            // В продакшене здесь будет переход к реальной статье
-            window.open(this.dataset.url || '#', '_blank');
+          if (this.dataset.url) {
+            window.open(this.dataset.url, '_blank', 'noopener');
           }
         });
       });
     },
-    
+
     loadMoreNews: function() {
-      if (this.isLoading || !this.hasMoreNews) return;
-      
+      if (this.isLoading || !this.nextCursor) return;
+
       this.isLoading = true;
       this.showLoadingSpinner();
-      
-      var self = this;
-      
-      // В режиме разработки генерируем дополнительные затычки
-      if (this.config.isDevelopment) {
-        setTimeout(function() {
-          self.generateMockNews();
-          self.hideLoadingSpinner();
-          self.isLoading = false;
-        }, 1500); // Имитируем задержку сети
-      } else {
-        // В продакшене здесь будет AJAX запрос к серверу
-        this.loadNewsFromServer();
-      }
-    },
-    
-    generateMockNews: function() {
-      var mockArticles = [
-        {
-          id: Date.now() + Math.random(),
-          title: 'Новые инвестиционные возможности',
-          content: 'Анализ рынка показывает перспективные направления для инвестиций в 2025 году.',
-          image: null,
-          featured: false,
-          date: new Date().toISOString().split('T')[0]
-        },
-        {
-          id: Date.now() + Math.random() + 1,
-          title: 'Криптовалюты: что ждет рынок?',
-          content: 'Эксперты прогнозируют изменения в регулировании цифровых активов.',
-          image: 'https://images.unsplash.com/photo-1621761191319-c6fb62004040?w=400&h=300&fit=crop',
-          featured: true,
-          date: new Date().toISOString().split('T')[0]
-        },
-        {
-          id: Date.now() + Math.random() + 2,
-          title: 'Финансовое планирование на год',
-          content: 'Рекомендации по составлению личного бюджета и достижению финансовых целей.',
-          image: null,
-          featured: false,
-          date: new Date().toISOString().split('T')[0]
-        },
-        {
-          id: Date.now() + Math.random() + 3,
-          title: 'Налоговые изменения 2025',
-          content: 'Обзор новых налоговых правил и их влияние на частных инвесторов.',
-          image: null,
-          featured: false,
-          date: new Date().toISOString().split('T')[0]
-        }
-      ];
-      
-      var newsGrid = document.getElementById('newsGrid');
-      var loadingSpinner = document.getElementById('loadingSpinner');
-      
-      // Добавляем новые карточки
-      mockArticles.forEach(function(article) {
-        var cardHtml = this.createNewsCardHtml(article);
-        newsGrid.insertAdjacentHTML('beforeend', cardHtml);
-      }.bind(this));
-      
-      // Настраиваем обработчики для новых карточек
-      this.setupNewsCards();
-      
-      // Ограничиваем количество загруженных новостей в режиме разработки
-      var totalCards = document.querySelectorAll('.news-card').length;
-      if (totalCards >= 20) {
-        this.hasMoreNews = false;
-        this.hideLoadingSpinner();
-      }
-    },
-    
-    createNewsCardHtml: function(article) {
-      var imageHtml = article.image ? 
-        '<img src="' + article.image + '" alt="' + article.title + '" loading="lazy">' : '';
-      
-      var featuredClass = article.featured ? 'featured' : '';
-      
-      return '<div class="news-card ' + featuredClass + '" data-article-id="' + article.id + '">' +
-               imageHtml +
-               '<h3>' + article.title + '</h3>' +
-               '<p>' + article.content + '</p>' +
-               '<div style="margin-top: 12px; font-size: 12px; color: #9aa8c7;">' +
-                 article.date +
-               '</div>' +
-             '</div>';
-    },
-    
-    loadNewsFromServer: function() {
+
       var self = this;
       var xhr = new XMLHttpRequest();
-      
-      xhr.open('GET', this.config.loadMoreUrl + '?page=' + (this.currentPage + 1), true);
+
+      xhr.open('GET', this.config.feedUrl + '?cursor=' + encodeURIComponent(this.nextCursor), true);
       xhr.onreadystatechange = function() {
         if (xhr.readyState === 4) {
           self.hideLoadingSpinner();
           self.isLoading = false;
-          
+
           if (xhr.status === 200) {
             try {
-              var response = JSON.parse(xhr.responseText);
-              self.displayNewsFromServer(response);
+              self.displayNews(JSON.parse(xhr.responseText));
             } catch (e) {
               console.error('Ошибка парсинга ответа сервера:', e);
             }
           } else {
             console.error('Ошибка загрузки новостей:', xhr.status);
+            // Не повторяем запрос на каждое событие прокрутки
+            self.nextCursor = '';
           }
         }
       };
-      
+
       xhr.send();
     },
-    
-    displayNewsFromServer: function(response) {
+
+    displayNews: function(response) {
       var newsGrid = document.getElementById('newsGrid');
-      
-      if (response.articles && response.articles.length > 0) {
-        response.articles.forEach(function(article) {
-          var cardHtml = this.createNewsCardHtml(article);
-          newsGrid.insertAdjacentHTML('beforeend', cardHtml);
-        }.bind(this));
-        
-        this.setupNewsCards();
-        this.currentPage++;
-        
-        if (!response.hasMore) {
-          this.hasMoreNews = false;
-        }
-      } else {
-        this.hasMoreNews = false;
+      var fragment = document.createDocumentFragment();
+      var cards = [];
+
+      (response.articles || []).forEach(function(article) {
+        var card = this.createNewsCard(article);
+        cards.push(card);
+        fragment.appendChild(card);
+      }.bind(this));
+
+      newsGrid.appendChild(fragment);
+      this.setupNewsCards(cards);
+      this.nextCursor = response.next_cursor || '';
+    },
+
+    createNewsCard: function(article) {
+      // Текст вставляется через textContent: данные ленты не интерпретируются как HTML
+      var card = document.createElement('div');
+      card.className = 'news-card' + (article.featured ? ' featured' : '');
+      card.dataset.articleId = article.id;
+      card.dataset.url = article.url || '';
+
+      if (article.image) {
+        var image = document.createElement('img');
+        image.src = article.image;
+        image.alt = article.title;
+        image.loading = 'lazy';
+        card.appendChild(image);
       }
+
+      var title = document.createElement('h3');
+      title.textContent = article.title;
+      card.appendChild(title);
+
+      var summary = document.createElement('p');
+      summary.textContent = article.summary;
+      card.appendChild(summary);
+
+      var date = document.createElement('div');
+      date.style.cssText = 'margin-top: 12px; font-size: 12px; color: #9aa8c7;';
+      date.textContent = article.date;
+      card.appendChild(date);
+
+      return card;
     },
-    
+
     showLoadingSpinner: function() {
       var spinner = document.getElementById('loadingSpinner');
       if (spinner) {
         spinner.style.display = 'flex';
       }
     },
-    
+
     hideLoadingSpinner: function() {
       var spinner = document.getElementById('loadingSpinner');
       if (spinner) {
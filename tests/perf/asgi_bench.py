@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""
+Concurrent throughput of the WSGI and ASGI deployments under a slow database.
+
+Builds a scratch SQLite database with one logged-in client, then starts
+gunicorn three ways on a local port and drives the same pages with
+``--concurrency`` parallel keep-alive connections:
+
+* ``wsgi-sync``    - ``FinTrack.wsgi``, sync workers (one request per worker);
+* ``wsgi-gthread`` - ``FinTrack.wsgi``, ``--threads`` threads per worker;
+* ``asgi``         - ``FinTrack.asgi`` with ``uvicorn.workers.UvicornWorker``
+  (skipped when uvicorn is not installed).
+
+Every SQL statement sleeps ``--db-latency-ms`` (see ``slow_db_settings.py``),
+so the run shows how many requests each setup keeps in flight while the
+database is slow rather than how fast Python renders a page:
+
+    python tests/perf/asgi_bench.py --db-latency-ms 30 --concurrency 50 --requests 600
+"""
+import argparse
+import http.client
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+PERF_DIR = Path(__file__).resolve().parent
+PASSWORD = 'bench-pass-123'
+DEFAULT_PATHS = ['/dashboard/', '/converter/', '/subscription/', '/health/']
+
+
+def server_env(database_path, latency_ms):
+    env = dict(os.environ)
+    env.update({
+        'DJANGO_SETTINGS_MODULE': 'slow_db_settings',
+        'PYTHONPATH': os.pathsep.join([str(PERF_DIR), str(BASE_DIR), env.get('PYTHONPATH', '')]),
+        'DATABASE_URL': f'sqlite:///{database_path}',
+        'DJANGO_DEBUG': 'False',
+        'DJANGO_ALLOWED_HOSTS': '127.0.0.1,localhost',
+        'CACHE_URL': 'locmem://',
+        'RATES_REFRESH_SECONDS': '0',
+        # Measure raw concurrency: no shedding or rate limiting in the way.
+        'OVERLOAD_ENABLED': 'False',
+        'RATE_LIMIT_ENABLED': 'False',
+        'BENCH_DB_LATENCY_MS': str(latency_ms),
+    })
+    return env
+
+
+def prepare_database(env):
+    """Migrate the scratch database and return a session cookie for a client."""
+    script = (
+        'import django; django.setup()\n'
+        'from django.core.management import call_command\n'
+        'from django.contrib.auth.models import User\n'
+        'from django.contrib.sessions.backends.db import SessionStore\n'
+        'from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY\n'
+        'from accounts.utils import create_client_from_user\n'
+        'call_command("migrate", verbosity=0)\n'
+        f'user = User.objects.create_user("bench-user", "bench@example.com", "{PASSWORD}")\n'
+        'if not hasattr(user, "client"):\n'
+        '    create_client_from_user(user)\n'
+        'session = SessionStore()\n'
+        'session[SESSION_KEY] = str(user.pk)\n'
+        'session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"\n'
+        'session[HASH_SESSION_KEY] = user.get_session_auth_hash()\n'
+        'session.create()\n'
+        'print(session.session_key)\n'
+    )
+    # Latency only matters for the servers; setup runs at full speed.
+    setup_env = dict(env, BENCH_DB_LATENCY_MS='0')
+    result = subprocess.run(
+        [sys.executable, '-c', script], env=setup_env, cwd=BASE_DIR, check=True, capture_output=True, text=True,
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(profile, port, workers, threads):
+    # Flags override gunicorn.conf.py, which is picked up from the working directory.
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers)]
+    if profile == 'wsgi-sync':
+        return command + ['--worker-class', 'sync', 'FinTrack.wsgi:application']
+    if profile == 'wsgi-gthread':
+        return command + ['--worker-class', 'gthread', '--threads', str(threads), 'FinTrack.wsgi:application']
+    return command + ['--worker-class', 'uvicorn.workers.UvicornWorker', 'FinTrack.asgi:application']
+
+
+def wait_until_ready(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with code {process.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/health/')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not become ready')
+
+
+def drive(port, paths, cookie, concurrency, total):
+    """Issue ``total`` GETs over ``concurrency`` connections; returns latencies and errors."""
+    latencies, errors = [], []
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def worker():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                break
+            path = paths[index % len(paths)]
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers={'Cookie': f'sessionid={cookie}'})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            elapsed = time.perf_counter() - start
+            with lock:
+                (latencies if ok else errors).append(elapsed)
+        connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_profile(profile, args, env, cookie):
+    port = free_port()
+    process = subprocess.Popen(
+        server_command(profile, port, args.workers, args.threads),
+        env=env, cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(port, process)
+        drive(port, args.paths, cookie, args.concurrency, args.warmup)
+        latencies, errors, elapsed = drive(port, args.paths, cookie, args.concurrency, args.requests)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    latencies.sort()
+    return {
+        'profile': profile,
+        'ok': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p95_ms': _percentile(latencies, 0.95) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-latency-ms', type=float, default=30, help='sleep before every SQL statement')
+    parser.add_argument('--concurrency', type=int, default=50, help='parallel client connections')
+    parser.add_argument('--requests', type=int, default=600, help='measured requests per profile')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers for every profile')
+    parser.add_argument('--threads', type=int, default=8, help='threads per worker for wsgi-gthread')
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+    parser.add_argument('--profiles', nargs='+', default=['wsgi-sync', 'wsgi-gthread', 'asgi'])
+    args = parser.parse_args(argv)
+
+    profiles = list(args.profiles)
+    if 'asgi' in profiles and importlib.util.find_spec('uvicorn') is None:
+        print('uvicorn is not installed, skipping the asgi profile (pip install -r requirements.txt)')
+        profiles.remove('asgi')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = server_env(os.path.join(tmp, 'bench.sqlite3'), args.db_latency_ms)
+        cookie = prepare_database(env)
+        rows = [run_profile(profile, args, env, cookie) for profile in profiles]
+
+    print(f'db latency {args.db_latency_ms:g} ms/query, {args.concurrency} connections, {args.workers} workers')
+    print(f"{'profile':<14}{'ok':>7}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for row in rows:
+        print(
+            f"{row['profile']:<14}{row['ok']:>7}{row['errors']:>8}{row['rps']:>10.1f}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+        )
+    baseline = next((row for row in rows if row['profile'] == 'wsgi-sync'), None)
+    if baseline and baseline['rps']:
+        for row in rows:
+            if row is not baseline:
+                print(f"{row['profile']}: {row['rps'] / baseline['rps']:.1f}x wsgi-sync throughput")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+"""
+Offline benchmark of every page in accounts/urls.py and the admin changelists.
+
+Builds a throwaway test database, seeds a synthetic dataset, logs in a regular
+client and a superuser, and drives each route through Django's WSGI test
+client. For every route it records p50/p95/p99 latency, throughput and SQL
+queries per request, then compares the run with a stored baseline:
+
+    python tests/perf/bench_views.py --clients 2000 --requests 50
+    python tests/perf/bench_views.py --update-baseline
+
+The run fails (exit code 1) when a route's p95 latency grows by more than
+``--threshold`` (and by more than ``--min-delta-ms``, to ignore jitter on
+millisecond-fast pages) over the baseline, or when it issues more queries.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FinTrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client as TestClient, override_settings  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse  # noqa: E402
+
+from accounts.models import AccessLevel  # noqa: E402
+from accounts.seeding import seed_clients  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).with_name('baseline.json')
+PASSWORD = 'bench-pass-123'
+
+
+def seed_dataset(clients, seed):
+    """Insert ``clients`` synthetic clients; returns (client, staff) users."""
+    ids = seed_clients(clients, seed)
+    staff = User.objects.create_superuser('bench-admin', 'admin@example.com', PASSWORD)
+    return User.objects.get(id=ids[0]), staff
+
+
+def build_routes(regular, staff):
+    """Routes as (name, session, method, url, data)."""
+    client_id = regular.client.id
+    level_id = AccessLevel.objects.values_list('id', flat=True).first()
+    routes = [
+        ('register', 'anonymous', 'get', reverse('register'), None),
+        ('login', 'anonymous', 'get', reverse('login'), None),
+        ('logout', 'logout', 'post', reverse('logout'), None),
+        ('dashboard', 'regular', 'get', reverse('dashboard'), None),
+        ('news', 'regular', 'get', reverse('news'), None),
+        ('profile', 'regular', 'get', reverse('profile'), None),
+        ('converter', 'regular', 'get', reverse('converter'), None),
+        ('about', 'regular', 'get', reverse('about'), None),
+        ('subscription_plans', 'regular', 'get', reverse('subscription_plans'), None),
+        ('client_list', 'staff', 'get', reverse('client_list'), None),
+        ('client_list_search', 'staff', 'get', reverse('client_list'), {'city': 'Казань', 'is_active': 'true'}),
+        ('client_detail', 'staff', 'get', reverse('client_detail', args=[client_id]), None),
+        ('client_edit', 'staff', 'get', reverse('client_edit', args=[client_id]), None),
+        ('access_level_list', 'staff', 'get', reverse('access_level_list'), None),
+        ('access_level_edit', 'staff', 'get', reverse('access_level_edit', args=[level_id]), None),
+        ('admin_index', 'staff', 'get', reverse('fintrack_admin:index'), None),
+    ]
+    for model in ('accounts_client', 'accounts_profile', 'accounts_accesslevel', 'auth_user'):
+        routes.append((f'admin_{model}', 'staff', 'get', reverse(f'fintrack_admin:{model}_changelist'), None))
+    return routes
+
+
+def _percentile(sorted_values, fraction):
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure(routes, sessions, regular, requests, warmup):
+    results = {}
+    for name, session, method, url, data in routes:
+        latencies = []
+        queries = 0
+        for iteration in range(warmup + requests):
+            client = sessions.get(session)
+            if session == 'logout':
+                client = TestClient()
+                client.force_login(regular)
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                raise RuntimeError(f'{name}: {method.upper()} {url} returned {response.status_code}')
+            if iteration >= warmup:
+                latencies.append(elapsed)
+                queries = max(queries, len(captured.captured_queries))
+        latencies.sort()
+        results[name] = {
+            'p50_ms': round(_percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(_percentile(latencies, 0.99) * 1000, 3),
+            'rps': round(len(latencies) / sum(latencies), 1),
+            'queries': queries,
+        }
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Return human-readable regressions against ``baseline``."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: {current['queries']} queries, baseline {previous['queries']}")
+        growth = current['p95_ms'] - previous['p95_ms']
+        if growth > previous['p95_ms'] * threshold and growth > min_delta_ms:
+            regressions.append(
+                f"{name}: p95 {current['p95_ms']:.1f} ms, baseline {previous['p95_ms']:.1f} ms (+{threshold:.0%} allowed)"
+            )
+    return regressions
+
+
+def print_table(results):
+    print(f"{'route':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}")
+    for name, row in results.items():
+        print(
+            f"{name:<28}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+            f"{row['rps']:>9.1f}{row['queries']:>9}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=1000, help='synthetic clients to seed')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=30, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed requests per route')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed p95 growth, 0.25 = +25%%')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help='ignore p95 growth below this many ms')
+    parser.add_argument('--update-baseline', action='store_true', help='write this run as the new baseline')
+    parser.add_argument('--output', type=Path, help='also write results as JSON here')
+    args = parser.parse_args(argv)
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+    try:
+        # Manifest storage needs collectstatic; the benchmark measures views, not static lookups.
+        with override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'):
+            for cache in caches.all():
+                cache.clear()
+            regular, staff = seed_dataset(args.clients, args.seed)
+            sessions = {'anonymous': TestClient(), 'regular': TestClient(), 'staff': TestClient()}
+            sessions['regular'].force_login(regular)
+            sessions['staff'].force_login(staff)
+            results = measure(build_routes(regular, staff), sessions, regular, args.requests, args.warmup)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+    print_table(results)
+    report = {'clients': args.clients, 'requests': args.requests, 'routes': results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False) + '\n')
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2, ensure_ascii=False) + '\n')
+        print(f'Baseline written to {args.baseline}')
+        return 0
+    if not args.baseline.exists():
+        print(f'No baseline at {args.baseline}; run with --update-baseline first')
+        return 0
+
+    regressions = compare(results, json.loads(args.baseline.read_text())['routes'], args.threshold, args.min_delta_ms)
+    for line in regressions:
+        print(f'REGRESSION {line}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""
+Settings for benchmarks that simulate a slow database.
+
+Every SQL statement sleeps ``BENCH_DB_LATENCY_MS`` before it runs, so pages
+spend most of their time waiting on I/O the way they do when a remote
+PostgreSQL is under load. Used by ``tests/perf/asgi_bench.py``; never in
+production.
+"""
+import os
+import time
+
+from django.db.backends.signals import connection_created
+
+from FinTrack.settings import *  # noqa: F401,F403
+
+# Pages render {% static %} without a collectstatic manifest.
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+BENCH_DB_LATENCY = float(os.getenv('BENCH_DB_LATENCY_MS', '0')) / 1000
+
+
+def _slow_execute(execute, sql, params, many, context):
+    time.sleep(BENCH_DB_LATENCY)
+    return execute(sql, params, many, context)
+
+
+def _install_latency(sender, connection, **kwargs):
+    if BENCH_DB_LATENCY and _slow_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_slow_execute)
+
+
+connection_created.connect(_install_latency)
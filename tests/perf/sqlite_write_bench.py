@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Concurrent write benchmark for the SQLite connection profile.
+
+Runs the same workload twice against a scratch database file: once with the
+stock Django settings (rollback journal, synchronous=FULL, deferred BEGIN)
+and once with the production profile from ``FinTrack.db.sqlite3``. Each
+worker process mimics a Django request that reads a row and then writes
+(``get()`` followed by ``save()``), the pattern that fails with
+"database is locked" when several gunicorn workers write at once.
+
+    python tests/perf/sqlite_write_bench.py --workers 8 --transactions 300
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from FinTrack.db.sqlite3.pragmas import DEFAULT_PRAGMAS, apply_pragmas  # noqa: E402
+
+PROFILES = {
+    # What Django 4.2 does out of the box: sqlite3's 5 s timeout, no pragmas.
+    'default': {'pragmas': {}, 'begin': 'BEGIN'},
+    'tuned': {'pragmas': DEFAULT_PRAGMAS, 'begin': 'BEGIN IMMEDIATE'},
+}
+
+
+def _connect(path, profile):
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+    apply_pragmas(conn, PROFILES[profile]['pragmas'])
+    return conn
+
+
+def _prepare(path, profile):
+    conn = _connect(path, profile)
+    conn.execute('CREATE TABLE counters (id INTEGER PRIMARY KEY, value INTEGER NOT NULL, payload TEXT)')
+    conn.executemany('INSERT INTO counters (id, value, payload) VALUES (?, 0, ?)', [(i, 'x' * 200) for i in range(1000)])
+    conn.close()
+
+
+def _worker(path, profile, worker_id, transactions, results):
+    conn = _connect(path, profile)
+    begin = PROFILES[profile]['begin']
+    committed = locked = 0
+    for n in range(transactions):
+        row_id = (worker_id * 7919 + n) % 1000
+        try:
+            conn.execute(begin)
+            value = conn.execute('SELECT value FROM counters WHERE id = ?', (row_id,)).fetchone()[0]
+            conn.execute('UPDATE counters SET value = ?, payload = ? WHERE id = ?', (value + 1, 'y' * 200, row_id))
+            conn.execute('COMMIT')
+            committed += 1
+        except sqlite3.OperationalError as exc:
+            if 'locked' not in str(exc) and 'busy' not in str(exc):
+                raise
+            locked += 1
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+    conn.close()
+    results.put((committed, locked))
+
+
+def run_profile(profile, workers, transactions):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite3')
+        _prepare(path, profile)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=_worker, args=(path, profile, i, transactions, results))
+            for i in range(workers)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+    committed = sum(item[0] for item in totals)
+    locked = sum(item[1] for item in totals)
+    return {
+        'profile': profile,
+        'committed': committed,
+        'locked_errors': locked,
+        'seconds': elapsed,
+        'writes_per_second': committed / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--transactions', type=int, default=300, help='write transactions per worker')
+    args = parser.parse_args(argv)
+
+    rows = [run_profile(profile, args.workers, args.transactions) for profile in PROFILES]
+    print(f"{'profile':<10}{'committed':>10}{'locked':>8}{'seconds':>10}{'writes/s':>12}")
+    for row in rows:
+        print(
+            f"{row['profile']:<10}{row['committed']:>10}{row['locked_errors']:>8}"
+            f"{row['seconds']:>10.2f}{row['writes_per_second']:>12.1f}"
+        )
+    baseline, tuned = rows
+    if baseline['writes_per_second']:
+        print(f"speedup: {tuned['writes_per_second'] / baseline['writes_per_second']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()